@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.api.deps import get_gateway_tenant
 from pydantic import BaseModel
 from typing import List, Optional
-from app.services.ai_service import suggest_evidence, analyze_gap 
+from app.services.ai_service import suggest_evidence_async, analyze_gap_async
 
 router = APIRouter()
 
@@ -19,12 +20,13 @@ class JustificationRequest(BaseModel):
     title: str
     category: str
     scope_description: Optional[str] = "Standard ISO 27001 Scope"
+    regenerate: Optional[bool] = False # Bypass the LLM response cache
 
 # ...
 
 @router.post("/suggest-evidence")
-def suggest_evidence_endpoint(req: EvidenceSuggestionRequest, db: Session = Depends(get_db)):
-    return suggest_evidence(req.title, req.description, req.category, req.control_id, db, req.regenerate)
+async def suggest_evidence_endpoint(req: EvidenceSuggestionRequest, db: Session = Depends(get_db), tenant_id: str = Depends(get_gateway_tenant)):
+    return await suggest_evidence_async(req.title, req.description, req.category, req.control_id, db, req.regenerate, tenant_id=tenant_id)
 
 class GapAnalysisRequest(BaseModel):
     control_title: str
@@ -41,13 +43,13 @@ class DocumentReviewRequest(BaseModel):
     evidence_id: int
 
 @router.post("/gap-analysis")
-def gap_analysis_endpoint(req: GapAnalysisRequest):
-    return analyze_gap(req.control_title, req.requirements, req.uploaded_files)
+async def gap_analysis_endpoint(req: GapAnalysisRequest, tenant_id: str = Depends(get_gateway_tenant)):
+    return await analyze_gap_async(req.control_title, req.requirements, req.uploaded_files, tenant_id=tenant_id)
 
 @router.post("/generate-artifact")
-def generate_artifact_endpoint(req: ArtifactGenerationRequest):
-    from app.services.ai_service import generate_artifact_content
-    content = generate_artifact_content(req.control_title, req.artifact_name, req.context)
+async def generate_artifact_endpoint(req: ArtifactGenerationRequest, tenant_id: str = Depends(get_gateway_tenant)):
+    from app.services.ai_service import generate_artifact_content_async
+    content = await generate_artifact_content_async(req.control_title, req.artifact_name, req.context, tenant_id=tenant_id)
     return {"content": content}
 
 @router.post("/review-document")
@@ -56,9 +58,9 @@ def review_document_endpoint(req: DocumentReviewRequest, db: Session = Depends(g
     return review_document(req.control_id, req.evidence_id, db)
 
 @router.post("/suggest-justification")
-def suggest_justification_endpoint(req: JustificationRequest):
-    from app.services.ai_service import suggest_justification
-    return suggest_justification(req.title, req.control_id, req.category, req.scope_description)
+async def suggest_justification_endpoint(req: JustificationRequest, tenant_id: str = Depends(get_gateway_tenant)):
+    from app.services.ai_service import suggest_justification_async
+    return await suggest_justification_async(req.title, req.control_id, req.category, req.scope_description, regenerate=req.regenerate, tenant_id=tenant_id)
 
 class PolicyRequest(BaseModel):
     title: str
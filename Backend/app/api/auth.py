@@ -7,6 +7,7 @@ from app.models.user import User
 from app.models.tenant import Tenant
 from app.schemas.user import UserCreate, User as UserSchema, Token
 from app.utils.security import verify_password, get_password_hash, create_access_token, decode_access_token
+from app.api.deps import resolve_identity
 from app.config import settings
 
 router = APIRouter()
@@ -25,37 +26,24 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = decode_access_token(token)
+    # Reuse the claims decoded by verify_tenant when it's the same bearer token
+    payload = getattr(request.state, "token_payload", None)
+    auth_header = request.headers.get("Authorization") or ""
+    if payload is None or auth_header.split(" ")[-1] != token:
+        payload = decode_access_token(token)
     if payload is None:
         raise credentials_exception
     
-    username: str = payload.get("sub")
-    token_tenant_id: str = payload.get("tenant_id")
-    mode: str = payload.get("mode", "standard")
-    
-    # --- MASQUERADING LOGIC (HEADER BASED) ---
-    # Prioritize the header if present and user is admin
-    target_tenant_id = request.headers.get("X-Target-Tenant-ID")
-    effective_tenant_id = token_tenant_id
-    
-    print(f"DEBUG: Auth Header Check. User={username}, MsgHeader={target_tenant_id}, TokenTenant={token_tenant_id}")
-
-    if username == "admin" and target_tenant_id:
-        effective_tenant_id = target_tenant_id
-        print(f"DEBUG: Masquerading as {effective_tenant_id} (Admin Override)")
-    
-    # ... (RLS Logic)
+    # Tenant/user resolution is shared with the global dependencies and cached per token
+    identity = resolve_identity(request, db, payload=payload)
+    if identity is None or identity.user_id is None:
+        raise credentials_exception
 
+    username = identity.username
+    effective_tenant_id = identity.tenant_slug
     
-    # Fetch User
-    # Note: We must join with Tenant if we want to be strict, but username is unique per tenant
-    # However, the Token contains the specific tenant_id claim.
-    # For now, simplistic fetch by username (assuming unique globally or filtered later)
-    # Actually, we should filter by the token's tenant_id if we want to be safe, 
-    # BUT admin might be masquerading.
-    
-    # Original Logic:
-    user = db.query(User).filter(User.username == username).first()
+    # Primary-key lookup; hits the session identity map if already loaded this request
+    user = db.get(User, identity.user_id)
     
     if user is None:
         raise credentials_exception
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
+from fastapi import APIRouter, Depends, BackgroundTasks, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.services.mapping_engine import MappingEngine
+from app.services.mapping_engine import MappingEngine, remap_in_background
 from app.services.report_generator_v2 import ReportGeneratorV2
 from app.models.requirement import RequirementMaster, RequirementStatus
+from typing import List, Optional
 import os
 
 router = APIRouter(
@@ -12,9 +13,17 @@ router = APIRouter(
 )
 
 @router.post("/scan")
-def trigger_compliance_scan(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    engine = MappingEngine(db)
+def trigger_compliance_scan(
+    background_tasks: BackgroundTasks,
+    policy_ids: Optional[List[int]] = Query(None, description="Only re-map against these policies"),
+    requirement_ids: Optional[List[int]] = Query(None, description="Only re-map these requirements"),
+    db: Session = Depends(get_db)
+):
     # Run in background to avoid timeout
+    if policy_ids or requirement_ids:
+        background_tasks.add_task(remap_in_background, policy_ids=policy_ids, requirement_ids=requirement_ids)
+        return {"message": "Incremental Compliance Scan initiated in background."}
+    engine = MappingEngine(db)
     background_tasks.add_task(engine.run_global_scan)
     return {"message": "Compliance Scan initiated in background."}
 
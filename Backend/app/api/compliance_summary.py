@@ -5,11 +5,13 @@ from typing import Dict, List, Any
 
 from app.database import get_db
 from app.models.compliance_result import ComplianceResult
+from app.models.compliance_rollup import ComplianceRollup
 from app.models.control import Control
 from app.models.tenant import Tenant
 from app.models.tenant_framework import TenantFramework
 from app.api.auth import get_current_user
 from app.utils.encryption import SecurityManager
+import app.services.compliance_rollup  # noqa: F401  (registers incremental rollup maintenance)
 
 router = APIRouter(prefix="/compliance", tags=["Compliance"])
 
@@ -61,14 +63,17 @@ def _get_summary_for_tenant(db: Session, tenant_id: str, framework_id: int = Non
         if not active_fw_ids:
             return {"summary": []}
 
-    # Query: Get Scanned Results mapped to Control Domains
-    query = db.query(ComplianceResult, Control.domain)\
-        .join(Control, ComplianceResult.control_id == Control.control_id)\
-        .filter(ComplianceResult.tenant_id == tenant_id)
+    # Query: Read the materialized (tenant, framework, domain) rollup - O(domains), not O(results)
+    query = db.query(
+        ComplianceRollup.domain,
+        func.sum(ComplianceRollup.total_count),
+        func.sum(ComplianceRollup.pass_count),
+        func.sum(ComplianceRollup.fail_count)
+    ).filter(ComplianceRollup.tenant_id == tenant_id)
         
     # Enforce Framework Entitlement
     if tenant_id != "default_tenant":
-        query = query.filter(Control.framework_id.in_(active_fw_ids))
+        query = query.filter(ComplianceRollup.framework_id.in_(active_fw_ids))
         
     if framework_id:
         # Additional user filter
@@ -76,30 +81,14 @@ def _get_summary_for_tenant(db: Session, tenant_id: str, framework_id: int = Non
         if tenant_id != "default_tenant" and framework_id not in active_fw_ids:
              return {"summary": []}
              
-        query = query.filter(Control.framework_id == framework_id)
+        query = query.filter(ComplianceRollup.framework_id == framework_id)
         
-    if framework_id:
-        query = query.filter(Control.framework_id == framework_id)
-        
-    results = query.all()
-    
-    # Process Results
-    domain_stats = {} 
+    rows = query.group_by(ComplianceRollup.domain).order_by(ComplianceRollup.domain).all()
     
-    for result, domain in results:
-        if not domain: domain = "Uncategorized"
-        if domain not in domain_stats:
-            domain_stats[domain] = {"total": 0, "pass": 0, "fail": 0}
-            
-        domain_stats[domain]["total"] += 1
-        if result.status == "PASS":
-            domain_stats[domain]["pass"] += 1
-        elif result.status == "FAIL":
-            domain_stats[domain]["fail"] += 1
-            
     # Calculate Percentages
     summary = []
-    for domain, stats in domain_stats.items():
+    for domain, total, passed, failed in rows:
+        stats = {"total": int(total or 0), "pass": int(passed or 0), "fail": int(failed or 0)}
         total = stats["total"]
         percentage = round((stats["pass"] / total) * 100, 1) if total > 0 else 0.0
         summary.append({
@@ -10,6 +10,9 @@ from app.models.control_mapping import ControlMapping
 from app.schemas.control import Control as ControlSchema, ControlCreate, ControlUpdate, ControlWithFramework, SoAUpdate
 from app.schemas.control import ControlStatus
 from app.api.auth import get_current_user
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
+from app.services.search_index import search_ids
 
 router = APIRouter(
     tags=["controls"]
@@ -19,14 +22,12 @@ router = APIRouter(
 def create_control(
     control: ControlCreate,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    identity: ResolvedIdentity = Depends(get_identity)
 ):
     """Create a new control"""
-    """Create a new control"""
-    # Resolve Tenant UUID if current_user.tenant_id is a slug
-    from app.models.tenant import Tenant
-    tenant = db.query(Tenant).filter(Tenant.slug == current_user.tenant_id).first()
-    tenant_uuid = tenant.internal_tenant_id if tenant else current_user.tenant_id
+    # Tenant UUID resolved once per request (slug -> internal_tenant_id)
+    tenant_uuid = identity.tenant_uuid
 
     # Check if control_id already exists for this tenant
     if db.query(Control).filter(Control.control_id == control.control_id, Control.tenant_id == tenant_uuid).first():
@@ -57,17 +58,13 @@ def list_controls(
     status: Optional[ControlStatus] = Query(None),
     search: Optional[str] = Query(None),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    identity: ResolvedIdentity = Depends(get_identity)
 ):
     """Get all controls with optional filters"""
-    # Resolve Tenant UUID if current_user.tenant_id is a slug
-    from app.models.tenant import Tenant
-    tenant = db.query(Tenant).filter(Tenant.slug == current_user.tenant_id).first()
-    tenant_uuid = tenant.internal_tenant_id if tenant else current_user.tenant_id
-
-    # Get Default Tenant UUID
-    default_tenant = db.query(Tenant).filter(Tenant.slug == "default_tenant").first()
-    default_tenant_uuid = default_tenant.internal_tenant_id if default_tenant else "default_tenant"
+    # Tenant and Default Tenant UUIDs resolved once per request
+    tenant_uuid = identity.tenant_uuid
+    default_tenant_uuid = identity.default_tenant_uuid
 
     # Use UUID for query - Include "default_tenant" for shared controls
     query = db.query(Control).filter(
@@ -86,12 +83,22 @@ def list_controls(
     if status:
         query = query.filter(Control.status == status)
     if search:
-        query = query.filter(
-            or_(
-                Control.control_id.ilike(f"%{search}%"),
-                Control.title.ilike(f"%{search}%")
+        # Full-text index (title, description, AI explanation); control ids still match by prefix
+        matched_ids = search_ids(db, "control", search, [tenant_uuid, default_tenant_uuid])
+        if matched_ids is None:
+            query = query.filter(
+                or_(
+                    Control.control_id.ilike(f"%{search}%"),
+                    Control.title.ilike(f"%{search}%")
+                )
+            )
+        else:
+            query = query.filter(
+                or_(
+                    Control.id.in_(matched_ids),
+                    Control.control_id.ilike(f"{search}%")
+                )
             )
-        )
     
     
     
@@ -195,17 +202,13 @@ def list_controls(
 async def get_control_mappings(
     control_id: int,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    identity: ResolvedIdentity = Depends(get_identity)
 ):
     """Get all controls that map to/from this control"""
-    # Resolve Tenant UUID if current_user.tenant_id is a slug
-    from app.models.tenant import Tenant
-    tenant = db.query(Tenant).filter(Tenant.slug == current_user.tenant_id).first()
-    tenant_uuid = tenant.internal_tenant_id if tenant else current_user.tenant_id
-
-    # Get Default Tenant UUID
-    default_tenant = db.query(Tenant).filter(Tenant.slug == "default_tenant").first()
-    default_tenant_uuid = default_tenant.internal_tenant_id if default_tenant else "default_tenant"
+    # Tenant and Default Tenant UUIDs resolved once per request
+    tenant_uuid = identity.tenant_uuid
+    default_tenant_uuid = identity.default_tenant_uuid
 
     control = db.query(Control).filter(
         Control.id == control_id,
@@ -492,6 +495,7 @@ def bulk_link_evidence(
             file_path=original_evidence.file_path,
             file_size=original_evidence.file_size,
             file_type=original_evidence.file_type,
+            content_hash=original_evidence.content_hash,
             tenant_id=c.tenant_id, # Inherit control's tenant
             title=original_evidence.title,
             description=original_evidence.description,
@@ -1,6 +1,8 @@
 
 from fastapi import Request, HTTPException, status
+from typing import Optional
 from app.utils.security import decode_access_token
+from app.utils.identity_cache import ResolvedIdentity, identity_cache
 import logging
 
 logger = logging.getLogger("uvicorn")
@@ -76,6 +78,8 @@ async def verify_tenant(request: Request):
             
         # Set tenant in request state provided by Starlette
         request.state.tenant_id = tenant_id
+        # Keep the decoded claims so downstream dependencies don't decode the JWT again
+        request.state.token_payload = payload
     except HTTPException:
         raise
     except Exception as e:
@@ -83,7 +87,7 @@ async def verify_tenant(request: Request):
         # raise HTTPException(status_code=500, detail="Internal Server Error during Tenant Verification")
         raise
         
-# --- ENTITLEMENT GUARDS ---
+# --- RESOLVED IDENTITY (computed once per request) ---
 
 from fastapi import Depends
 from sqlalchemy.orm import Session
@@ -91,6 +95,104 @@ from app.database import get_db
 from app.models.tenant_feature import TenantFeature
 from app.models.tenant_framework import TenantFramework
 
+
+def _load_identity(db: Session, payload: dict, effective_tenant: str, masquerade_target: Optional[str]) -> ResolvedIdentity:
+    from app.models.user import User
+    from app.models.tenant import Tenant
+
+    username = payload.get("sub")
+
+    # One round trip for both the effective tenant and the shared default tenant
+    slugs = {"default_tenant"}
+    if effective_tenant:
+        slugs.add(effective_tenant)
+    tenants = {t.slug: t for t in db.query(Tenant).filter(Tenant.slug.in_(slugs)).all()}
+
+    tenant = tenants.get(effective_tenant)
+    default_tenant = tenants.get("default_tenant")
+
+    # Same lookup as get_current_user (username is the JWT subject)
+    user = db.query(User).filter(User.username == username).first() if username else None
+
+    return ResolvedIdentity(
+        username=username,
+        tenant_slug=effective_tenant,
+        tenant_uuid=tenant.internal_tenant_id if tenant else effective_tenant,
+        tenant_exists=tenant is not None,
+        default_tenant_uuid=default_tenant.internal_tenant_id if default_tenant else "default_tenant",
+        token_tenant_id=payload.get("tenant_id"),
+        masquerade_target=masquerade_target,
+        user_id=user.id if user else None,
+        user_tenant_id=user.tenant_id if user else None,
+        role=user.role if user else None,
+        is_superuser=bool(user.is_superuser) if user else False,
+        is_active=bool(user.is_active) if user else False,
+    )
+
+
+def resolve_identity(request: Request, db: Session, payload: Optional[dict] = None) -> Optional[ResolvedIdentity]:
+    """
+    Resolve tenant UUID, default-tenant UUID, user and role for this request.
+    The result is memoised on request.state and backed by the process-wide identity_cache,
+    so the Tenant/User lookups run at most once per (token, tenant) until the TTL expires
+    or a user/tenant/entitlement write invalidates the cache.
+    """
+    identity = getattr(request.state, "identity", None)
+    if identity is not None:
+        return identity
+
+    if payload is None:
+        payload = getattr(request.state, "token_payload", None)
+    if payload is None:
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return None
+        payload = decode_access_token(auth_header.split(" ")[1])
+        if not payload:
+            return None
+        request.state.token_payload = payload
+
+    username = payload.get("sub")
+    target_tenant_id = request.headers.get("X-Target-Tenant-ID")
+    masquerade_target = target_tenant_id if (username == "admin" and target_tenant_id) else None
+    effective_tenant = masquerade_target or payload.get("tenant_id")
+
+    key = identity_cache.make_key(payload, effective_tenant)
+    identity = identity_cache.get(key)
+    if identity is None:
+        identity = _load_identity(db, payload, effective_tenant, masquerade_target)
+        identity_cache.set(key, identity)
+
+    request.state.identity = identity
+    return identity
+
+
+def get_identity(request: Request, db: Session = Depends(get_db)) -> ResolvedIdentity:
+    """
+    Dependency returning the request-scoped ResolvedIdentity.
+    Usage: identity: ResolvedIdentity = Depends(get_identity)
+    """
+    identity = resolve_identity(request, db)
+    if identity is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return identity
+
+
+def get_gateway_tenant(request: Request, db: Session = Depends(get_db)) -> str:
+    """
+    AI gateway bucket for this request: the caller's tenant, or "default_tenant" when the
+    endpoint is reachable without a token (those keep working, sharing the default bucket).
+    Usage: tenant_id: str = Depends(get_gateway_tenant)
+    """
+    identity = resolve_identity(request, db)
+    return identity.tenant_uuid if identity else "default_tenant"
+
+# --- ENTITLEMENT GUARDS ---
+
 class FeatureGuard:
     """
     Dependency to enforce Tenant Feature entitlements.
@@ -114,16 +216,13 @@ class FeatureGuard:
         # So we need to resolve Slug -> Internal ID first? Or does token have internal ID?
         # Token usually has 'sub' (username) and 'tenant_id' (slug).
         
-        # OPTIMIZATION: We should probably store internal_id in token or resolve it once in verify_tenant.
-        # For now, let's resolve it here via a join or look up.
-        from app.models.tenant import Tenant
-        
-        tenant = db.query(Tenant).filter(Tenant.slug == tenant_id).first()
-        if not tenant:
+        # Resolved once per request (see resolve_identity)
+        identity = resolve_identity(request, db)
+        if not identity or not identity.tenant_exists:
              raise HTTPException(status_code=401, detail="Invalid Tenant Context")
              
         feature = db.query(TenantFeature).filter(
-            TenantFeature.tenant_id == tenant.internal_tenant_id,
+            TenantFeature.tenant_id == identity.tenant_uuid,
             TenantFeature.feature_key == self.feature_key,
             TenantFeature.is_active == True
         ).first()
@@ -148,17 +247,16 @@ class FrameworkGuard:
         if not tenant_id:
              raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Tenant context missing")
         
-        from app.models.tenant import Tenant
         from app.models.framework import Framework
         
-        tenant = db.query(Tenant).filter(Tenant.slug == tenant_id).first()
-        if not tenant:
+        identity = resolve_identity(request, db)
+        if not identity or not identity.tenant_exists:
              raise HTTPException(status_code=401, detail="Invalid Tenant Context")
              
         # Check if framework specific code is active
         # Join TenantFramework -> Framework
         link = db.query(TenantFramework).join(Framework).filter(
-            TenantFramework.tenant_id == tenant.internal_tenant_id,
+            TenantFramework.tenant_id == identity.tenant_uuid,
             Framework.code == self.framework_code,
             TenantFramework.is_active == True
         ).first()
@@ -176,40 +274,20 @@ class AuditorPermissionGuard:
     - EXEMPTION: Specific paths (e.g., /api/v1/auditor/assessments).
     """
     def __call__(self, request: Request, db: Session = Depends(get_db)):
-        # 1. Identify User Role
-        # We need the user object. 
-        # Ideally, we should have a `get_current_user` dep, but here we can look it up.
-        tenant_id_slug = getattr(request.state, "tenant_id", None)
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return # Should be accepted by verify_tenant already, or rejected.
+        # 1. Identify User Role (shared with get_current_user via resolve_identity)
+        if not getattr(request.state, "tenant_id", None):
+            return # Public path or preflight; verify_tenant already decided.
 
-        token = auth_header.split(" ")[1]
-        payload = decode_access_token(token)
-        if not payload:
-            return
-
-        username = payload.get("sub")
-        
-        from app.models.user import User
-        from app.models.tenant import Tenant
-        
-        # Resolve Tenant
-        tenant = db.query(Tenant).filter(Tenant.slug == tenant_id_slug).first()
-        if not tenant:
-            return 
-            
-        # Resolve User
-        user = db.query(User).filter(
-            User.email == username, 
-            User.tenant_id == tenant.internal_tenant_id
-        ).first()
+        identity = resolve_identity(request, db)
+        if not identity or not identity.tenant_exists:
+            return # Tenant not found
 
-        if not user:
+        # Only enforce for users that belong to the resolved tenant
+        if identity.user_id is None or identity.user_tenant_id != identity.tenant_uuid:
             return
 
         # 2. Check Allowed Methods
-        if user.role == "AUDITOR":
+        if identity.role == "AUDITOR":
             # ALLOW: GET (Read Only)
             if request.method == "GET":
                 return
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Query, Response
+from sqlalchemy.orm import Session
 from fastapi.responses import FileResponse
+import asyncio
 import os
 import shutil
 import json
+import time
 from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 
-# Try exporting/importing from tasks, but to avoid circular import issues in this simple structure,
-# we will just interact with the tasks.json file directly for now.
-TASKS_FILE = "tasks.json"
+from app.database import get_db, SessionLocal
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
+from app.services.version_catalog import record_version, list_versions
+from app.services.task_store import create_task, complete_document_tasks
 
 router = APIRouter()
 
@@ -27,33 +32,158 @@ class ApprovalRequest(BaseModel):
     approver_name: str = "Admin"
 
 def create_review_task(control_id: str, filename: str, user_id: str):
+    db = SessionLocal()
     try:
-        if os.path.exists(TASKS_FILE):
-            with open(TASKS_FILE, "r") as f:
-                tasks = json.load(f)
-        else:
-            tasks = []
-        
-        new_task = {
-            "id": f"TASK-{len(tasks) + 1001}",
-            "title": f"Review Revised Policy: {control_id}",
-            "description": f"User {user_id} uploaded a new version: {filename}. Please review and approve.",
-            "document_id": filename,
-            "control_id": control_id,
-            "assigned_to": "Admin",
-            "status": "PENDING",
-            "created_at": datetime.now().isoformat(),
-            "type": "REVIEW_VERSION"
-        }
-        
-        tasks.append(new_task)
-        
-        with open(TASKS_FILE, "w") as f:
-            json.dump(tasks, f, indent=2)
-            
-        print(f"Task created: {new_task['id']}")
+        task = create_task(
+            db,
+            title=f"Review Revised Policy: {control_id}",
+            description=f"User {user_id} uploaded a new version: {filename}. Please review and approve.",
+            document_id=filename,
+            control_id=control_id,
+            assigned_to="Admin",
+            task_type="REVIEW_VERSION"
+        )
+        print(f"Task created: {task.task_ref}")
     except Exception as e:
         print(f"Failed to create task: {e}")
+    finally:
+        db.close()
+
+async def _review_revision(file_stream, spool_path: Optional[str], file_hash: str, filename: str, control_id: str, user_id: str, is_confidential: bool, tenant_id: str = None):
+    """
+    PII scan, gap analysis and storage for an uploaded revision (steps 3-7).
+    Shared by the inline upload and the "document.review_revision" background job.
+    """
+    from app.services.ai_service import analyze_document_gap_async, detect_and_redact_pii_async
+    from app.services.document_extraction import extract_document, document_text_cache
+    from app.services.blob_store import blob_store
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_filename = filename.replace(" ", "_")
+    saved_filename = f"{control_id}_{timestamp}_{safe_filename}"
+    
+    # Stage DAG: extract -> (PII scan || gap analysis) -> verdict merge
+    timings = {}
+    pipeline_started = time.perf_counter()
+
+    async def timed(stage, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+    # 3. Extract once (cached by content hash); PII scan and gap analysis share it
+    # Confidential uploads are never cached; others only once the PII verdict allows it (step 5).
+    file_stream.seek(0)
+    extracted = await timed("extract", asyncio.to_thread(extract_document, file_stream, safe_filename, file_hash, not is_confidential, False))
+    ext = extracted.ext
+    is_image = extracted.is_image
+    text_content_for_pii = "" if is_image else extracted.text()
+    image_base64_for_pii = extracted.image_base64
+
+    # 4 + 6. PII Scan and Gap Analysis run concurrently (gap reuses the extraction)
+    requirements = [{"name": "Standard ISO 27001 Requirements for this topic"}]
+    gateway_tenant = tenant_id or "default_tenant"
+    pii_task = asyncio.create_task(timed("pii_scan", detect_and_redact_pii_async(text_content_for_pii, is_image, ext, image_base64_for_pii, tenant_id=gateway_tenant)))
+    gap_task = asyncio.create_task(timed("gap_analysis", analyze_document_gap_async(
+        control_id, 
+        requirements, 
+        file_path=None, 
+        is_confidential=is_confidential, 
+        filename=safe_filename,
+        tenant_id=gateway_tenant,
+        extracted=extracted
+    )))
+
+    try:
+        pii_result = await pii_task
+    except BaseException:
+        gap_task.cancel()
+        raise
+    action = pii_result.get("action", "NONE")
+    
+    # 5. REJECT if Critical (unless confidential mode overrides, but usually reject is absolute)
+    # Assuming REJECT applies to everyone for safety (e.g. unmasked passport upload = bad practice).
+    # The in-flight gap analysis is cancelled; its result would be discarded anyway.
+    if action == "REJECT":
+         gap_task.cancel()
+         raise HTTPException(status_code=400, detail=f"GDPR VIOLATION: {pii_result.get('reasoning')}")
+    # Unredacted text of a document that needs masking isn't kept either
+    if not is_confidential and action != "MASK":
+         document_text_cache.put(extracted)
+    
+    ai_result = await gap_task
+    timings["total"] = round((time.perf_counter() - pipeline_started) * 1000, 1)
+    ai_result["stage_timings_ms"] = timings
+    
+    ai_result["pii_status"] = pii_result
+    ai_result["file_hash"] = file_hash
+
+    final_verdict = ai_result.get("final_verdict", "FAIL")
+    is_pass = (final_verdict == "PASS") and ai_result.get("date_check_passed", False)
+    
+    if action in ["MASK", "TAG"]:
+        is_pass = False
+        ai_result["summary"] += f" [WARNING: PII DETECTED - {action}]"
+
+    # 7. STORAGE DECISION
+    final_stored_filename = saved_filename
+    file_deleted = False
+    
+    if is_confidential:
+         # CONFIDENTIAL: DO NOT WRITE TO DISK.
+         file_deleted = True
+         final_stored_filename = f"WITNESSED_ONLY_{saved_filename}"
+         ai_result["storage_status"] = "DELETED_CONFIDENTIAL"
+    else:
+         # STANDARD: Save to Disk (move the spooled upload into place, no rewrite)
+         file_path = os.path.join(VERSION_HISTORY_DIR, saved_filename)
+         file_stream.close()
+         blob_store.backend.promote(spool_path, file_path)
+             
+         if action == "MASK" and not is_image:
+              # Overwrite with redacted if needed (Logic omitted for brevity, usually involves regenerate)
+              pass
+
+    # Save Metadata (Receipt)
+    meta_filename = f"{saved_filename}.json"
+    meta_path = os.path.join(VERSION_HISTORY_DIR, meta_filename)
+    with open(meta_path, "w") as f:
+        json.dump(ai_result, f, indent=2)
+
+    # Index the revision (receipt inline) so history reads don't scan the directory
+    db = SessionLocal()
+    try:
+        record_version(
+            db, tenant_id, control_id, saved_filename, ai_result,
+            file_hash=file_hash,
+            original_filename=filename,
+            version_timestamp=datetime.strptime(timestamp, "%Y%m%d_%H%M%S"),
+            is_witnessed=file_deleted,
+            uploaded_by=user_id
+        )
+    except Exception as e:
+        print(f"Failed to index version {saved_filename}: {e}")
+    finally:
+        db.close()
+
+    # Logic Gate
+    task_created = False
+    if is_pass and not file_deleted:
+         create_review_task(control_id, saved_filename, user_id)
+         task_created = True
+    
+    return {
+        "status": "success",
+        "message": "Processed successfully." + (" (Confidential - Memory Only)" if file_deleted else ""),
+        "filename": final_stored_filename,
+        "version_timestamp": timestamp,
+        "ai_analysis": ai_result,
+        "task_created": task_created,
+        "pii_action": action,
+        "is_witnessed": file_deleted
+    }
 
 @router.post("/upload-revision")
 async def upload_revision(
@@ -61,177 +191,83 @@ async def upload_revision(
     control_id: str = Form(...),
     user_id: str = Form("unknown"),
     is_confidential: bool = Form(False),
-    background_tasks: BackgroundTasks = None
+    background: bool = Form(False),
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
 ):
-    from app.services.ai_service import analyze_document_gap, detect_and_redact_pii
+    """
+    Streams the upload, then runs PII + gap analysis inline, or, with background=true
+    (non-confidential only), queues it as a job and returns the job id immediately.
+    """
     import io
-    import pypdf
-    import docx
-    import base64
     import hashlib
+    from app.services.blob_store import blob_store, CHUNK_SIZE
     
+    spool_path = None
+    file_stream = None
     try:
-        # 1. READ STREAM TO MEMORY (Zero-Knowledge Prerequisite)
-        content = await file.read()
-        file_stream = io.BytesIO(content)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = file.filename.replace(" ", "_")
-        saved_filename = f"{control_id}_{timestamp}_{safe_filename}"
-        
-        # 2. SHA-256 Hashing (Audit Receipt)
-        sha256_hash = hashlib.sha256(content)
-        file_hash = sha256_hash.hexdigest()
-        
-        # 3. PII & AI Analysis (Using Memory Stream)
-        file_stream.seek(0)
-        ext = safe_filename.lower().split('.')[-1]
-        is_image = ext in ['png', 'jpg', 'jpeg']
-        
-        # Extract Text/Image Data for PII Check (Still needed for non-confidential masking or rejection)
-        # Note: If confidential, we rely on the prompt to sanitize, but PII check is useful for "REJECT" logic.
-        text_content_for_pii = ""
-        image_base64_for_pii = None
-        
-        try:
-            if is_image:
-                image_base64_for_pii = base64.b64encode(content).decode('utf-8')
-            elif ext == 'pdf':
-                reader = pypdf.PdfReader(io.BytesIO(content))
-                for page in reader.pages:
-                    text_content_for_pii += page.extract_text() + "\n"
-            elif ext == 'docx':
-                doc = docx.Document(io.BytesIO(content))
-                for para in doc.paragraphs:
-                    text_content_for_pii += para.text + "\n"
-            else:
-                 text_content_for_pii = content.decode("utf-8", errors="ignore")
-        except:
-            pass 
-
-        # 4. PII Scan
-        pii_result = detect_and_redact_pii(text_content_for_pii, is_image, ext, image_base64_for_pii)
-        action = pii_result.get("action", "NONE")
-        
-        # 5. REJECT if Critical (unless confidential mode overrides, but usually reject is absolute)
-        # Assuming REJECT applies to everyone for safety (e.g. unmasked passport upload = bad practice).
-        if action == "REJECT":
-             raise HTTPException(status_code=400, detail=f"GDPR VIOLATION: {pii_result.get('reasoning')}")
-        
-        # 6. Gap Analysis (Pass Stream)
-        file_stream.seek(0)
-        requirements = [{"name": "Standard ISO 27001 Requirements for this topic"}]
-        ai_result = analyze_document_gap(
-            control_id, 
-            requirements, 
-            file_path=None, 
-            is_confidential=is_confidential, 
-            file_stream=file_stream,
-            filename=safe_filename
-        )
-        
-        ai_result["pii_status"] = pii_result
-        ai_result["file_hash"] = file_hash
-
-        final_verdict = ai_result.get("final_verdict", "FAIL")
-        is_pass = (final_verdict == "PASS") and ai_result.get("date_check_passed", False)
-        
-        if action in ["MASK", "TAG"]:
-            is_pass = False
-            ai_result["summary"] += f" [WARNING: PII DETECTED - {action}]"
-
-        # 7. STORAGE DECISION
-        final_stored_filename = saved_filename
-        file_deleted = False
-        
+        # 1. STREAM THE UPLOAD + 2. SHA-256 Hashing (Audit Receipt), chunk by chunk
         if is_confidential:
-             # CONFIDENTIAL: DO NOT WRITE TO DISK.
-             file_deleted = True
-             final_stored_filename = f"WITNESSED_ONLY_{saved_filename}"
-             ai_result["storage_status"] = "DELETED_CONFIDENTIAL"
+            # Zero-Knowledge: never touches disk, so it has to stay in memory
+            file_stream = io.BytesIO()
+            sha256_hash = hashlib.sha256()
+            while True:
+                chunk = file.file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256_hash.update(chunk)
+                file_stream.write(chunk)
+            file_hash = sha256_hash.hexdigest()
         else:
-             # STANDARD: Save to Disk
-             file_path = os.path.join(VERSION_HISTORY_DIR, saved_filename)
-             with open(file_path, "wb") as f:
-                 f.write(content)
-                 
-             if action == "MASK" and not is_image:
-                  # Overwrite with redacted if needed (Logic omitted for brevity, usually involves regenerate)
-                  pass
-
-        # Save Metadata (Receipt)
-        meta_filename = f"{saved_filename}.json"
-        meta_path = os.path.join(VERSION_HISTORY_DIR, meta_filename)
-        with open(meta_path, "w") as f:
-            json.dump(ai_result, f, indent=2)
-
-        # Logic Gate
-        task_created = False
-        if is_pass and not file_deleted:
-             create_review_task(control_id, saved_filename, user_id)
-             task_created = True
+            # Spool to the blob store's temp area; memory stays bounded for large PDFs
+            file_hash, _, spool_path = blob_store.backend.write_stream(file.file)
+            file_stream = open(spool_path, "rb")
         
-        return {
-            "status": "success",
-            "message": "Processed successfully." + (" (Confidential - Memory Only)" if file_deleted else ""),
-            "filename": final_stored_filename,
-            "version_timestamp": timestamp,
-            "ai_analysis": ai_result,
-            "task_created": task_created,
-            "pii_action": action,
-            "is_witnessed": file_deleted
-        }
+        if background and not is_confidential:
+            # Hand the spooled file to the job queue; the worker runs PII + gap analysis
+            from app.services.job_queue import enqueue
+            file_stream.close()
+            job = enqueue(db, "document.review_revision", {
+                "spool_path": spool_path,
+                "file_hash": file_hash,
+                "filename": file.filename,
+                "control_id": control_id,
+                "user_id": user_id,
+            }, tenant_id=identity.tenant_uuid, created_by=identity.username)
+            spool_path = None # Owned by the job now
+            return {"status": "queued", "job_id": job.id, "message": "Review queued. Poll /api/v1/jobs/{job_id} for progress."}
+
+        return await _review_revision(file_stream, spool_path, file_hash, file.filename, control_id, user_id, is_confidential, identity.tenant_uuid)
         
     except Exception as e:
         print(f"Upload Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if file_stream is not None:
+            file_stream.close()
+        if spool_path:
+            blob_store.backend.discard(spool_path)
 
 @router.get("/history/{control_id}")
-async def get_version_history(control_id: str):
+async def get_version_history(
+    control_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
+):
     """
-    Returns list of all versions for a control
+    Returns versions for a control, newest first, from the version catalog.
+    Paginated with limit/offset; the total is returned in the X-Total-Count header.
     """
     try:
-        files = []
-        if os.path.exists(VERSION_HISTORY_DIR):
-            for f in os.listdir(VERSION_HISTORY_DIR):
-                if f.startswith(f"{control_id}_"):
-                    # Parse timestamp from filename: ID_TIMESTAMP_NAME
-                    try:
-                        parts = f.split("_")
-                        # parts[0] = ID (could be A.5.1)
-                        # parts[1] = Date (20240203)
-                        # parts[2] = Time (1030)
-                        # Rest = Name
-                        # Heuristic: Find the date-looking part
-                        ts_str = "Unknown"
-                        for i, p in enumerate(parts):
-                            if len(p) == 8 and p.isdigit(): # 20240203
-                                if i+1 < len(parts) and len(parts[i+1]) == 6 and parts[i+1].isdigit():
-                                    ts_str = f"{p} {parts[i+1]}"
-                                    break
-                                    
-                        files.append({
-                            "filename": f,
-                            "timestamp": ts_str,
-                            "url": f"/api/v1/documents/download/{f}",
-                            "ai_status": "PENDING" 
-                        })
-                        
-                        # Check for metadata
-                        meta_file = os.path.join(VERSION_HISTORY_DIR, f"{f}.json")
-                        if os.path.exists(meta_file):
-                            with open(meta_file, "r") as mf:
-                                data = json.load(mf)
-                                files[-1]["ai_analysis"] = data
-                                
-                    except:
-                        pass
-        
-        # Sort by filename (descending timestamp usually works if rigid structure)
-        files.sort(key=lambda x: x["filename"], reverse=True)
-        return files
+        total, versions = list_versions(db, identity.tenant_uuid, control_id, limit=limit, offset=offset)
+        response.headers["X-Total-Count"] = str(total)
+        return [v.to_history_entry() for v in versions]
     except Exception as e:
+        print(f"Version history error: {e}")
         return []
 
 @router.get("/download/{filename}")
@@ -302,18 +338,11 @@ async def approve_document(req: ApprovalRequest):
         c.save()
         
         # 3. Update Tasks
-        if os.path.exists(TASKS_FILE):
-             with open(TASKS_FILE, "r") as f:
-                tasks = json.load(f)
-             
-             for t in tasks:
-                 if t.get("document_id") == req.version_filename and t.get("status") == "PENDING":
-                     t["status"] = "COMPLETED"
-                     t["outcome"] = "APPROVED"
-                     t["completed_at"] = timestamp
-            
-             with open(TASKS_FILE, "w") as f:
-                json.dump(tasks, f, indent=2)
+        db = SessionLocal()
+        try:
+            complete_document_tasks(db, req.version_filename, outcome="APPROVED")
+        finally:
+            db.close()
 
         return {
             "status": "success",
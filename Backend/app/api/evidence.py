@@ -1,9 +1,8 @@
-import shutil
-import os
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, or_
 from pydantic import BaseModel
 
 from app.database import get_db
@@ -11,14 +10,12 @@ from app.models.evidence import Evidence
 from app.models.control import Control
 from app.api.auth import get_current_user
 from app.api.processes import get_actionable_title
+from app.services.blob_store import blob_store
 
 router = APIRouter(
     tags=["evidence"]
 )
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 class EvidenceResponse(BaseModel):
     id: int
     filename: str
@@ -34,6 +31,10 @@ class EvidenceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkIntentSyncRequest(BaseModel):
+    evidence_ids: List[int] = []
+    master_intent_ids: List[str] = []
+
 @router.post("/upload", response_model=EvidenceResponse)
 async def upload_evidence(
     file: UploadFile = File(...),
@@ -47,19 +48,16 @@ async def upload_evidence(
     if not control:
         raise HTTPException(status_code=404, detail="Control not found")
         
-    # unique filename
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    safe_filename = f"{control_id}_{timestamp}_{file.filename}"
-    file_location = os.path.join(UPLOAD_DIR, safe_filename)
-    
-    with open(file_location, "wb+") as file_object:
-        shutil.copyfileobj(file.file, file_object)
-        
+    # Content-addressed storage: streamed + hashed in chunks, one physical copy per SHA-256
+    stored = blob_store.put_stream(db, file.file, file.filename)
+    file_location = stored.storage_path
+
     evidence = Evidence(
         filename=file.filename,
         file_path=file_location,
-        file_size=os.path.getsize(file_location),
+        file_size=stored.size,
         file_type=file.content_type,
+        content_hash=stored.sha256,
         title=title,
         description=description,
         control_id=control_id,
@@ -80,71 +78,58 @@ async def upload_evidence(
         current_actionable_title = get_actionable_title(control)
         
         # 2. Key for Sync: "Actionable Title"
-        # Only sync if we have a valid, non-fallback title (fallback is usually control.title)
-        # But even if it's fallback, if it matches exactly, we sync?
-        # Let's trust get_actionable_title returns the "Intent".
-        
+        # Only valid Actionable Titles (in the map) fan out; a fallback to control.title
+        # would risk syncing to everything with the same name.
         sync_key = current_actionable_title
         print(f"Syncing Evidence for Intent: '{sync_key}'")
 
-        # 3. Find LINKED CONTROLS (Same Intent, Different ID)
-        # We need to scan other controls. Since actionable_title isn't a DB column, we might need to query ALL controls
-        # and checking python-side, OR reliable on 'control_id' patterns if ACTIONABLE_TITLES is strictly static.
-        # BUT: Iterating all controls is slow.
-        # OPTIMIZATION:
-        # A. If we have ACTIONABLE_TITLES list, we can reverse lookup? No.
-        # B. We only care about other frameworks.
-        #
-        # For now, let's stick to the mapped controls in ACTIONABLE_TITLES dict if possible?
-        # NO, we want to find Target Control B where get_actionable_title(B) == sync_key.
-        #
-        # Better approach:
-        # If 'sync_key' is in ACTIONABLE_TITLES values, we can find keys that map to it!
-        # Then query controls with those keys.
-        
-        from app.api.processes import ACTIONABLE_TITLES
-        matching_control_ids = [cid for cid, title in ACTIONABLE_TITLES.items() if title == sync_key]
-        
-        # Also include the current control's ID if not in list (e.g. if title matched by fallback)
-        if control.control_id not in matching_control_ids:
-            # If it was a fallback match, we might risk syncing to everything with same name.
-            # Let's enable this only for VALID Actionable Titles (in the map) to be safe.
-            pass
-
-        if matching_control_ids:
-             # Find actual DB controls with these IDs
-             linked_controls = db.query(Control).filter(
-                Control.control_id.in_(matching_control_ids),
+        # 3. Find LINKED CONTROLS (Same Intent, Different ID) via the precomputed inverted index:
+        # actionable title / UniversalIntent crosswalk -> control references, ControlMapping -> control PKs
+        from app.services.intent_index import get_intent_index
+        index = get_intent_index(db)
+        linked_refs = index.linked_refs(control.control_id)
+        linked_ids = index.mapped_control_ids(control.id)
+
+        if linked_refs or linked_ids:
+             # Find actual DB controls (one query)
+             linked_filters = []
+             if linked_refs:
+                 linked_filters.append(Control.control_id.in_(linked_refs))
+             if linked_ids:
+                 linked_filters.append(Control.id.in_(linked_ids))
+             linked_control_ids = [row[0] for row in db.query(Control.id).filter(
+                or_(*linked_filters),
                 Control.id != control_id, # Exclude self
                 Control.tenant_id == current_user.tenant_id # Same Tenant Only
-             ).all()
-
-             count_synced = 0
-             for linked_c in linked_controls:
-                # Check exist
-                exists = db.query(Evidence).filter(
-                    Evidence.control_id == linked_c.id,
-                    Evidence.file_path == file_location
-                ).first()
-                
-                if not exists:
-                    new_ev = Evidence(
-                        filename=file.filename,
-                        file_path=file_location,
-                        file_size=os.path.getsize(file_location),
-                        file_type=file.content_type,
-                        title=title,
-                        description=f"Synced via Intent: {sync_key}",
-                        control_id=linked_c.id,
-                        status="pending",
-                        validation_source="manual", 
-                        uploaded_by="system_sync"
-                    )
-                    db.add(new_ev)
-                    count_synced += 1
-             
+             ).all()]
+
+             # Existing links for this physical file (one query)
+             already_linked = {row[0] for row in db.query(Evidence.control_id).filter(
+                Evidence.control_id.in_(linked_control_ids),
+                Evidence.file_path == file_location
+             ).all()} if linked_control_ids else set()
+
+             rows = [
+                {
+                    "filename": file.filename,
+                    "file_path": file_location,
+                    "file_size": evidence.file_size,
+                    "file_type": file.content_type,
+                    "content_hash": stored.sha256,
+                    "title": title,
+                    "description": f"Synced via Intent: {sync_key}",
+                    "control_id": linked_id,
+                    "status": "pending",
+                    "validation_source": "manual",
+                    "uploaded_by": "system_sync",
+                    "tenant_id": current_user.tenant_id
+                }
+                for linked_id in linked_control_ids if linked_id not in already_linked
+             ]
+             if rows:
+                 db.execute(insert(Evidence), rows)
              db.commit()
-             print(f" -> Synced to {count_synced} controls with same Intent.")
+             print(f" -> Synced to {len(rows)} controls with same Intent.")
 
     except Exception as e:
         print(f"Sync Failed: {e}")
@@ -153,7 +138,7 @@ async def upload_evidence(
     # Auto-trigger AI Analysis
     try:
         from app.services.ai_service import analyze_control_logic
-        analyze_control_logic(control_id, db)
+        analyze_control_logic(control_id, db, current_user.tenant_id)
     except Exception as e:
         print(f"Auto-Analysis Failed: {e}")
     
@@ -189,4 +174,34 @@ def get_control_evidence(control_id: int, db: Session = Depends(get_db), current
     # Or should we check control ownership first? 
     # If we filter evidence by tenant_id, we only get evidence for this tenant. 
     # If control_id overlaps with another tenant (rare if unique), we still filter by tenant_id.
-    return db.query(Evidence).filter(Evidence.control_id == control_id, Evidence.tenant_id == current_user.tenant_id).all()
\ No newline at end of file
+    return db.query(Evidence).filter(Evidence.control_id == control_id, Evidence.tenant_id == current_user.tenant_id).all()
+
+@router.post("/sync/bulk")
+def bulk_sync_evidence(
+    request: BulkIntentSyncRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Evidence Gravity backfill: propagate many evidence items and/or every evidence
+    item tagged with the given intents, in a single transaction.
+    """
+    from app.services.evidence_sync_service import sync_evidence_bulk
+
+    query = db.query(Evidence.id, Evidence.master_intent_id).filter(
+        Evidence.tenant_id == current_user.tenant_id,
+        Evidence.master_intent_id.isnot(None)
+    )
+    items = []
+    if request.evidence_ids:
+        items.extend(query.filter(Evidence.id.in_(request.evidence_ids)).all())
+    if request.master_intent_ids:
+        items.extend(query.filter(Evidence.master_intent_id.in_(request.master_intent_ids)).all())
+
+    try:
+        created = sync_evidence_bulk(db, [(eid, key) for eid, key in items])
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Bulk sync failed: {str(e)}")
+
+    return {"message": f"Propagated {created} evidence clones", "pairs": len(set(items)), "created": created}
@@ -7,96 +7,24 @@ from app.models.control import Control, ControlStatus
 from app.models.tenant_framework import TenantFramework
 from app.schemas.framework import FrameworkCreate, Framework as FrameworkSchema, FrameworkWithStats
 from app.api.auth import get_current_user
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
 from pydantic import BaseModel
 from datetime import datetime
 from sqlalchemy import or_, and_, text
 from app.models.universal_intent import UniversalIntent, IntentStatus
 from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
 from app.models.tenant import Tenant
+from app.services.framework_stats import FrameworkStatsEngine
 router = APIRouter()
 
-def _calculate_framework_stats(db, framework, tenant_uuid):
-    # Get Default Tenant UUID
-    from app.models.tenant import Tenant
-    default_tenant = db.query(Tenant).filter(Tenant.slug == "default_tenant").first()
-    default_tenant_uuid = default_tenant.internal_tenant_id if default_tenant else "default_tenant"
-
-    # Base query for controls visible to this tenant
-    control_query = db.query(Control).filter(
-        Control.framework_id == framework.id,
-        or_(Control.tenant_id == tenant_uuid, Control.tenant_id == default_tenant_uuid)
-    )
-
-    total_controls = control_query.count()
-
-    # normalize framework code for crosswalk (e.g. ISO 27001:2022 -> ISO27001)
-    fw_code = framework.code
-    # Simple mapping if needed, matching seed script
-    if "ISO" in fw_code and "27001" in fw_code:
-        fw_code = "ISO27001" 
-
-    implemented = db.query(Control).outerjoin(
-        IntentFrameworkCrosswalk,
-        and_(
-            Control.control_id == IntentFrameworkCrosswalk.control_reference,
-            IntentFrameworkCrosswalk.framework_id == fw_code
-        )
-    ).outerjoin(
-        UniversalIntent,
-        IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
-    ).filter(
-        Control.framework_id == framework.id,
-        or_(Control.tenant_id == tenant_uuid, Control.tenant_id == default_tenant_uuid),
-        or_(
-            Control.status == ControlStatus.IMPLEMENTED,
-            UniversalIntent.status == IntentStatus.COMPLETED
-        )
-    ).count()
-    
-    # IN PROGRESS: Started AND (Parent Not Completed)
-    in_progress = db.query(Control).outerjoin(
-        IntentFrameworkCrosswalk,
-        and_(
-            Control.control_id == IntentFrameworkCrosswalk.control_reference,
-            IntentFrameworkCrosswalk.framework_id == fw_code
-        )
-    ).outerjoin(
-        UniversalIntent,
-        IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
-    ).filter(
-        Control.framework_id == framework.id,
-        or_(Control.tenant_id == tenant_uuid, Control.tenant_id == default_tenant_uuid),
-        Control.status == ControlStatus.IN_PROGRESS,
-        or_(UniversalIntent.status != IntentStatus.COMPLETED, UniversalIntent.status == None)
-    ).count()
-    
-    # NOT STARTED: Not Started AND (Parent Not Completed)
-    not_started = db.query(Control).outerjoin(
-        IntentFrameworkCrosswalk,
-        and_(
-            Control.control_id == IntentFrameworkCrosswalk.control_reference,
-            IntentFrameworkCrosswalk.framework_id == fw_code
-        )
-    ).outerjoin(
-        UniversalIntent,
-        IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
-    ).filter(
-        Control.framework_id == framework.id,
-        or_(Control.tenant_id == tenant_uuid, Control.tenant_id == default_tenant_uuid),
-        Control.status == ControlStatus.NOT_STARTED,
-        or_(UniversalIntent.status != IntentStatus.COMPLETED, UniversalIntent.status == None)
-    ).count()
-    
-    completion_percentage = (implemented / total_controls * 100) if total_controls > 0 else 0
+def _calculate_framework_stats(db, framework, tenant_uuid, default_tenant_uuid=None):
+    # Get Default Tenant UUID (callers with a resolved identity pass it in)
+    if default_tenant_uuid is None:
+        default_tenant = db.query(Tenant).filter(Tenant.slug == "default_tenant").first()
+        default_tenant_uuid = default_tenant.internal_tenant_id if default_tenant else "default_tenant"
 
-    return {
-        **framework.__dict__,
-        "total_controls": total_controls,
-        "implemented_controls": implemented,
-        "in_progress_controls": in_progress,
-        "not_started_controls": not_started,
-        "completion_percentage": round(completion_percentage, 2)
-    }
+    return FrameworkStatsEngine(db).framework_payloads([framework], tenant_uuid, default_tenant_uuid)[0]
 
 
 
@@ -128,7 +56,8 @@ def list_frameworks(
     limit: int = 100,
     catalog: bool = False,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    identity: ResolvedIdentity = Depends(get_identity)
 ):
     """
     Get all frameworks.
@@ -144,10 +73,8 @@ def list_frameworks(
             frameworks = db.query(Framework).filter(Framework.tenant_id == "default_tenant").all()
         else:
             # Return only subscribed frameworks
-            # Resolve Tenant UUID if current_user.tenant_id is a slug
-            from app.models.tenant import Tenant
-            tenant = db.query(Tenant).filter(Tenant.slug == current_user.tenant_id).first()
-            tenant_uuid = tenant.internal_tenant_id if tenant else current_user.tenant_id
+            # Tenant UUID resolved once per request (slug -> internal_tenant_id)
+            tenant_uuid = identity.tenant_uuid
             
             frameworks = db.query(Framework).join(
                 TenantFramework, Framework.id == TenantFramework.framework_id
@@ -156,11 +83,8 @@ def list_frameworks(
                 TenantFramework.is_active == True
             ).offset(skip).limit(limit).all()
             
-            # Enrich with stats
-            results = []
-            for fw in frameworks:
-                results.append(_calculate_framework_stats(db, fw, tenant_uuid))
-            return results
+            # Enrich with stats (one grouped query for all subscribed frameworks)
+            return FrameworkStatsEngine(db).framework_payloads(frameworks, tenant_uuid, identity.default_tenant_uuid)
         
     # For catalog or superadmin, return basic schema (mapped to WithStats with 0s)
     # This ensures type safety
@@ -310,19 +234,16 @@ def get_framework(
 def get_framework_stats(
     framework_id: int,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    identity: ResolvedIdentity = Depends(get_identity)
 ):
     """Get framework with statistics"""
     framework = db.query(Framework).filter(Framework.id == framework_id).first()
     if not framework:
         raise HTTPException(status_code=404, detail="Framework not found")
     
-    # Resolve Tenant UUID if current_user.tenant_id is a slug
-    # This ensures we query controls using the correct UUID foreign key
-    tenant = db.query(Tenant).filter(Tenant.slug == current_user.tenant_id).first()
-    tenant_uuid = tenant.internal_tenant_id if tenant else current_user.tenant_id
-
-    return _calculate_framework_stats(db, framework, tenant_uuid)
+    # Tenant UUID resolved once per request; ensures we query controls using the UUID foreign key
+    return _calculate_framework_stats(db, framework, identity.tenant_uuid, identity.default_tenant_uuid)
 @router.post("/{framework_id}/seed-controls", status_code=status.HTTP_201_CREATED)
 def seed_framework_controls(
     framework_id: int,
@@ -406,6 +327,11 @@ def seed_framework_controls(
             deleted_controls = result.rowcount
 
         db.commit()
+        # Raw deletes bypass the ORM events that keep the crosswalk graph and evidence view current
+        from app.services.intent_index import invalidate_intent_index
+        from app.services.data_adapter import invalidate_evidence_view
+        invalidate_intent_index()
+        invalidate_evidence_view()
         
         # 4. Insert New Controls
         for data in controls_data:
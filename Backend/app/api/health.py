@@ -45,6 +45,14 @@ def check_system_integrity():
         print(f"CRITICAL HEALTH CHECK ERROR: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="System Integrity Check Failed")
 
+@router.get("/llm-cache", response_model=Dict[str, Any])
+def llm_cache_metrics():
+    """
+    LLM response cache hit/miss counters (this process) and stored entry totals.
+    """
+    from app.services.llm_cache import llm_cache
+    return llm_cache.stats()
+
 from fastapi import Request, HTTPException
 from app.api.auth import get_current_user
 from app.models.user import User
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db, SessionLocal
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
+from app.models.job import Job, TERMINAL_JOB_STATUSES
+from app.services.job_queue import cancel_job
+
+router = APIRouter()
+
+
+def _get_tenant_job(db: Session, job_id: str, identity: ResolvedIdentity) -> Job:
+    job = db.query(Job).filter(Job.id == job_id, Job.tenant_id == identity.tenant_uuid).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/")
+def list_jobs(
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
+):
+    """Most recent jobs for the current tenant."""
+    query = db.query(Job).filter(Job.tenant_id == identity.tenant_uuid)
+    if status:
+        query = query.filter(Job.status == status)
+    if job_type:
+        query = query.filter(Job.job_type == job_type)
+    return [job.to_dict() for job in query.order_by(Job.created_at.desc()).limit(limit).all()]
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db), identity: ResolvedIdentity = Depends(get_identity)):
+    return _get_tenant_job(db, job_id, identity).to_dict()
+
+
+@router.post("/{job_id}/cancel")
+def cancel(job_id: str, db: Session = Depends(get_db), identity: ResolvedIdentity = Depends(get_identity)):
+    """Queued jobs stop immediately; running jobs stop at their next progress checkpoint."""
+    job = _get_tenant_job(db, job_id, identity)
+    if job.status in TERMINAL_JOB_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return cancel_job(db, job).to_dict()
+
+
+def _job_snapshot(job_id: str) -> Optional[dict]:
+    poll_db = SessionLocal()
+    try:
+        job = poll_db.get(Job, job_id)
+        return job.to_dict() if job else None
+    finally:
+        poll_db.close()
+
+
+@router.get("/{job_id}/events")
+def job_events(job_id: str, db: Session = Depends(get_db), identity: ResolvedIdentity = Depends(get_identity)):
+    """
+    Server-Sent Events stream of job progress. Emits on every change and closes
+    once the job reaches a terminal status.
+    The tenant check runs in the threadpool (sync endpoint); each poll runs in a worker
+    thread so the blocking query never stalls the event loop.
+    """
+    _get_tenant_job(db, job_id, identity)
+
+    async def stream():
+        last = None
+        while True:
+            snapshot = await asyncio.to_thread(_job_snapshot, job_id)
+            if snapshot is None:
+                yield "event: error\ndata: {\"detail\": \"Job not found\"}\n\n"
+                return
+            if snapshot != last:
+                yield f"data: {json.dumps(snapshot, default=str)}\n\n"
+                last = snapshot
+            if snapshot["status"] in TERMINAL_JOB_STATUSES:
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/{job_id}/download")
+def download_result(job_id: str, db: Session = Depends(get_db), identity: ResolvedIdentity = Depends(get_identity)):
+    """File produced by a finished job (e.g. the auditor pack ZIP)."""
+    job = _get_tenant_job(db, job_id, identity)
+    result = job.result or {}
+    path = result.get("path") if isinstance(result, dict) else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Job has no downloadable result")
+    return FileResponse(path, filename=result.get("filename"), media_type=result.get("media_type", "application/octet-stream"))
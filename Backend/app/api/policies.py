@@ -6,6 +6,7 @@ from datetime import datetime
 
 from app.database import get_db
 from app.models.policy import Policy
+from app.services.mapping_engine import remap_in_background
 from app.api.auth import get_current_user
 
 router = APIRouter(
@@ -57,7 +58,7 @@ def get_policies(folder: Optional[str] = None, db: Session = Depends(get_db)):
     return query.all()
 
 @router.post("/", response_model=PolicyResponse)
-def create_policy(policy: PolicyCreate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+def create_policy(policy: PolicyCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     db_policy = Policy(
         name=policy.name,
         description=policy.description,
@@ -71,6 +72,8 @@ def create_policy(policy: PolicyCreate, db: Session = Depends(get_db), current_u
     db.add(db_policy)
     db.commit()
     db.refresh(db_policy)
+    # Requirement mapping: scan just this policy
+    background_tasks.add_task(remap_in_background, policy_ids=[db_policy.id])
     return db_policy
 
 @router.get("/{policy_id}", response_model=PolicyResponse)
@@ -81,7 +84,7 @@ def get_policy(policy_id: int, db: Session = Depends(get_db)):
     return policy
 
 @router.put("/{policy_id}", response_model=PolicyResponse)
-def update_policy(policy_id: int, policy_update: PolicyUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+def update_policy(policy_id: int, policy_update: PolicyUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     db_policy = db.query(Policy).filter(Policy.id == policy_id).first()
     if not db_policy:
         raise HTTPException(status_code=404, detail="Policy not found")
@@ -96,11 +99,14 @@ def update_policy(policy_id: int, policy_update: PolicyUpdate, db: Session = Dep
         policy_update.approval_date = datetime.now()
         policy_update.approver = current_user.email
     
-    for key, value in policy_update.dict(exclude_unset=True).items():
+    changes = policy_update.dict(exclude_unset=True)
+    for key, value in changes.items():
         setattr(db_policy, key, value)
     
     db.commit()
     db.refresh(db_policy)
+    if "content" in changes or "name" in changes:
+        background_tasks.add_task(remap_in_background, policy_ids=[db_policy.id])
     return db_policy
 
 @router.post("/{policy_id}/attest")
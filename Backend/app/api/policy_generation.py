@@ -4,12 +4,18 @@ FastAPI Integration for Policy Generation
 RESTful API endpoints for policy generation, validation, and management
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from datetime import datetime
 import os
 
+from app.database import get_db
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
+from app.services.job_queue import enqueue
+
 from app.services.ai_policy_service import PolicyGenerationService
 from app.services.policy_intents import POLICY_CONTROL_MAP, get_policy_intents, validate_policy_coverage
 from app.services.policy_template_structure import PolicyTemplateStructure
@@ -24,6 +30,7 @@ class PolicyGenerationRequest(BaseModel):
 class BatchGenerationRequest(BaseModel):
     policy_names: List[str] = Field(..., description="List of policy names to generate")
     company_name: str = Field(default="AssuRisk", description="Organization name")
+    cloud_stack: Optional[str] = Field(default=None, description="Technology stack referenced in the policies")
 
 class SectionRegenerationRequest(BaseModel):
     policy_name: str
@@ -98,11 +105,21 @@ async def list_all_policies():
     }
 
 
-@router.post("/generate", response_model=PolicyGenerationResponse)
-async def generate_policy(request: PolicyGenerationRequest):
+@router.post("/generate")
+async def generate_policy(
+    request: PolicyGenerationRequest,
+    background: bool = Query(False, description="Queue as a background job and return its id"),
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
+):
     """
     Generates a single policy with AI
     """
+    if background:
+        job = enqueue(db, "policy.generate", request.model_dump(),
+                      tenant_id=identity.tenant_uuid, created_by=identity.username)
+        return {"job_id": job.id, "status": job.status, "policy_name": request.policy_name}
+
     try:
         result = policy_service.generate_policy(
             policy_name=request.policy_name,
@@ -118,9 +135,14 @@ async def generate_policy(request: PolicyGenerationRequest):
 
 
 @router.post("/generate/batch")
-async def generate_policies_batch(request: BatchGenerationRequest, background_tasks: BackgroundTasks):
+async def generate_policies_batch(
+    request: BatchGenerationRequest,
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
+):
     """
-    Generates multiple policies in batch (runs in background)
+    Generates multiple policies in batch (runs in background, in parallel).
+    Poll /api/v1/jobs/{job_id} for progress, throughput/ETA and per-policy results.
     """
     # Validate all policy names exist
     invalid_policies = [p for p in request.policy_names if p not in POLICY_CONTROL_MAP]
@@ -130,15 +152,13 @@ async def generate_policies_batch(request: BatchGenerationRequest, background_ta
             detail=f"Invalid policy names: {', '.join(invalid_policies)}"
         )
     
-    # Start batch generation in background
-    job_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
-    # TODO: Implement proper background job tracking with database
-    # For now, just return job ID
+    # Retries resume from the engine's per-policy checkpoints
+    job = enqueue(db, "policy.generate_batch", request.model_dump(),
+                  tenant_id=identity.tenant_uuid, created_by=identity.username)
     
     return {
-        "job_id": job_id,
-        "status": "started",
+        "job_id": job.id,
+        "status": job.status,
         "total_policies": len(request.policy_names),
         "message": "Batch generation started in background"
     }
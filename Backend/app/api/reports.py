@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
+from typing import Literal, Optional
+from app.database import get_db, SessionLocal
 from app.api.auth import get_current_user
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
 from app.models import User
 from report_generator import ComplianceReporter
 from app.services.multi_framework_report import MultiFrameworkReportService
@@ -14,6 +17,7 @@ router = APIRouter(
 
 @router.get("/unified-controls-evidence")
 def get_unified_report(
+    stream: Optional[Literal["json", "ndjson"]] = Query(None, description="Stream the report as it is built (json or ndjson)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -24,7 +28,19 @@ def get_unified_report(
     try:
         # Pass the tenant_id from the current_user context
         tenant_id = current_user.tenant_id if hasattr(current_user, 'tenant_id') else "default_tenant"
-        
+
+        if stream:
+            def stream_report():
+                # Runs after this handler returns, so the stream uses its own session
+                stream_db = SessionLocal()
+                try:
+                    yield from MultiFrameworkReportService.iter_unified_report(stream_db, tenant_id, fmt=stream)
+                finally:
+                    stream_db.close()
+
+            media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+            return StreamingResponse(stream_report(), media_type=media_type)
+
         report_data = MultiFrameworkReportService.generate_unified_report(db, tenant_id)
         return report_data
     except Exception as e:
@@ -39,16 +55,32 @@ def get_dashboard_metrics():
         reporter.close()
 
 @router.post("/auditor-pack")
-def generate_auditor_pack():
-    reporter = ComplianceReporter()
-    try:
-        path, filename = reporter.generate_auditor_pack()
-        if os.path.exists(path):
-            return FileResponse(path, filename=filename, media_type='application/zip')
-        else:
-            raise HTTPException(status_code=500, detail="Failed to generate report")
-    finally:
-        reporter.close()
+def generate_auditor_pack(
+    background: bool = Query(False, description="Queue as a background job; download via /jobs/{job_id}/download"),
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
+):
+    if background:
+        from app.services.job_queue import enqueue
+        job = enqueue(db, "report.auditor_pack", {"shared_tenant_id": identity.default_tenant_uuid},
+                      tenant_id=identity.tenant_uuid, created_by=identity.username)
+        return {"job_id": job.id, "status": job.status}
+
+    reporter = ComplianceReporter(tenant_id=identity.tenant_uuid, shared_tenant_id=identity.default_tenant_uuid)
+    filename = reporter.auditor_pack_filename()
+
+    def stream_pack():
+        # Runs after this handler returns, so the reporter is closed by the stream itself
+        try:
+            yield from reporter.iter_auditor_pack()
+        finally:
+            reporter.close()
+
+    return StreamingResponse(
+        stream_pack(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get("/ai-mapping")
 def get_ai_mapping():
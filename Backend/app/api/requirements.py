@@ -5,43 +5,43 @@ Integrates with existing ai_service.py infrastructure (OpenAI GPT-4 Turbo)
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 import json
-import os
-import shutil
-import uuid
 
 # ─── Internal Imports (adjust paths to match your project structure) ───
 from app.database import get_db
+from app.api.deps import get_identity, get_gateway_tenant
+from app.utils.identity_cache import ResolvedIdentity
 from app.models import Control, Framework, Evidence
 from app.services.ai_service import (
-    suggest_evidence,
+    suggest_evidence_async,
     analyze_document_gap,
-    generate_premium_policy,
+    generate_premium_policy_async,
     analyze_gap,
     detect_and_redact_pii,
     generate_ai_response,
+    analyze_document_gap_async,
+    detect_and_redact_pii_async,
     client as ai_client,
 )
+from app.services.blob_store import blob_store
+from app.services.framework_stats import framework_compliance_summary
+from app.services.document_extraction import extract_document
 
 router = APIRouter()
 
-# ─── Config ───
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads", "evidence")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 1. DYNAMIC REQUIREMENTS (AI-Generated, Cached in DB)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 @router.get("/controls/{control_id}/requirements")
-def get_requirements(
+async def get_requirements(
     control_id: str,
     regenerate: bool = Query(False, description="Force AI regeneration (bypasses cache)"),
     db: Session = Depends(get_db),
+    tenant_id: str = Depends(get_gateway_tenant),
 ):
     """
     Get AI-generated requirements for a control.
@@ -54,14 +54,15 @@ def get_requirements(
     if not control:
         raise HTTPException(status_code=404, detail=f"Control '{control_id}' not found")
 
-    # 2. Delegate to existing ai_service.suggest_evidence (handles caching internally)
-    result = suggest_evidence(
+    # 2. Delegate to existing ai_service.suggest_evidence_async (handles caching internally)
+    result = await suggest_evidence_async(
         title=control.title or "",
         description=control.description or "",
         category=control.category or "General",
         control_id=control_id,
         db=db,
         regenerate=regenerate,
+        tenant_id=tenant_id,
     )
 
     return {
@@ -97,13 +98,10 @@ async def upload_evidence(
     if not control:
         raise HTTPException(status_code=404, detail=f"Control '{control_id}' not found")
 
-    # 2. Save file to disk
+    # 2. Save file to the content-addressed blob store (streamed, hashed while writing)
     file_ext = file.filename.split(".")[-1].lower() if file.filename else "bin"
-    safe_filename = f"{control_id}_{uuid.uuid4().hex[:8]}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    stored = blob_store.put_stream(db, file.file, file.filename)
+    file_path = stored.storage_path
 
     # 3. Get cached requirements for context
     requirements = []
@@ -113,45 +111,44 @@ async def upload_evidence(
         except json.JSONDecodeError:
             pass
 
-    # 4. Run AI Evidence Review (reuses existing analyze_document_gap)
-    ai_review = analyze_document_gap(
+    # 4. Extract once, keyed by the blob hash; the review and PII scan share it
+    extracted = await asyncio.to_thread(extract_document, file_path, file.filename or file_path, stored.sha256, not is_confidential)
+
+    # 5. Run AI Evidence Review (reuses existing analyze_document_gap)
+    ai_review = await analyze_document_gap_async(
         control_title=control.title or control_id,
         requirements=requirements,
         file_path=file_path,
         is_confidential=is_confidential,
+        tenant_id=tenant_id,
+        extracted=extracted,
     )
 
-    # 5. Optional: PII scan
+    # 6. Optional: PII scan
     pii_result = None
-    if not is_confidential:
+    if not is_confidential and not extracted.error:
         try:
-            if file_ext in ["png", "jpg", "jpeg"]:
-                import base64
-                with open(file_path, "rb") as f:
-                    img_b64 = base64.b64encode(f.read()).decode("utf-8")
-                pii_result = detect_and_redact_pii(
-                    text_content="", is_image=True, file_ext=file_ext, image_base64=img_b64
+            if extracted.is_image:
+                pii_result = await detect_and_redact_pii_async(
+                    text_content="", is_image=True, file_ext=extracted.ext, image_base64=extracted.image_base64, tenant_id=tenant_id
                 )
             elif file_ext in ["pdf", "docx", "txt", "md"]:
-                # Extract text for PII check (lightweight re-read)
-                text_snippet = ""
-                if file_ext == "txt" or file_ext == "md":
-                    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                        text_snippet = f.read()[:5000]
-                pii_result = detect_and_redact_pii(
-                    text_content=text_snippet, is_image=False
+                text_snippet = extracted.text(5000)
+                pii_result = await detect_and_redact_pii_async(
+                    text_content=text_snippet, is_image=False, tenant_id=tenant_id
                 ) if text_snippet else None
         except Exception as e:
             print(f"PII scan skipped: {e}")
 
-    # 6. Save evidence record to DB
+    # 7. Save evidence record to DB
     evidence_record = Evidence(
         control_id=control.id,
         filename=file.filename,
         title=requirement_name or file.filename,
         file_path=file_path,
         file_type=file_ext,
-        file_size=os.path.getsize(file_path),
+        file_size=stored.size,
+        content_hash=stored.sha256,
         tenant_id=tenant_id,
         status=ai_review.get("final_verdict", "pending").lower(),
         validation_source="manual",
@@ -217,43 +214,39 @@ def get_cross_framework_mapping(
     if not control:
         raise HTTPException(status_code=404, detail=f"Control '{control_id}' not found")
 
-    # Strategy: Use raw SQL for the crosswalk join since model relationships may vary
-    # This query finds controls sharing the same intent via the crosswalk table
+    # Strategy: Resolve shared intents from the in-memory crosswalk graph, then load
+    # the live title / status / framework of the related controls in one query
     related_controls = []
 
     try:
-        query = text("""
-            SELECT DISTINCT
-                c.control_id,
-                c.title,
-                c.status,
-                f.name AS framework_name,
-                f.id AS framework_id,
-                ui.category AS intent_name,
-                ui.intent_id AS intent_id
-            FROM intent_framework_crosswalk ifc1
-            JOIN intent_framework_crosswalk ifc2 
-                ON ifc1.intent_id = ifc2.intent_id 
-                AND ifc1.control_reference != ifc2.control_reference
-            JOIN controls c ON c.control_id = ifc2.control_reference
-            JOIN frameworks f ON c.framework_id = f.id
-            JOIN universal_intents ui ON ui.id = ifc1.intent_id
-            WHERE ifc1.control_reference = :control_id
-            ORDER BY f.name, c.control_id
-        """)
-
-        result = db.execute(query, {"control_id": control_id}).fetchall()
-
-        for row in result:
+        from app.services.intent_index import get_intent_index
+        graph = get_intent_index(db)
+        links = graph.shared_intent_controls(control_id)
+        controls_by_id = {
+            row.id: row for row in db.query(
+                Control.id, Control.control_id, Control.title, Control.status,
+                Framework.name.label("framework_name"), Framework.id.label("framework_id")
+            ).join(Framework, Control.framework_id == Framework.id).filter(
+                Control.id.in_({control_pk for _, control_pk in links})
+            ).all()
+        } if links else {}
+
+        seen = set()
+        for intent_key, control_pk in links:
+            row = controls_by_id.get(control_pk)
+            if row is None or (control_pk, intent_key) in seen:
+                continue
+            seen.add((control_pk, intent_key))
             related_controls.append({
                 "control_id": row.control_id,
                 "title": row.title,
                 "status": row.status,
                 "framework_name": row.framework_name,
                 "framework_id": row.framework_id,
-                "shared_intent": row.intent_name,
-                "intent_id": row.intent_id,
+                "shared_intent": graph.intent_categories.get(intent_key),
+                "intent_id": intent_key,
             })
+        related_controls.sort(key=lambda rc: (rc["framework_name"], rc["control_id"], rc["intent_id"]))
 
     except Exception as e:
         print(f"Cross-framework query error: {e}")
@@ -322,6 +315,7 @@ def apply_evidence_cross_framework(
             file_path=source_evidence.file_path,
             file_type=source_evidence.file_type,
             file_size=source_evidence.file_size,
+            content_hash=source_evidence.content_hash,
             tenant_id=source_evidence.tenant_id or "default_tenant",
             status=source_evidence.status or "pending",
             validation_source="automated_agent",
@@ -347,17 +341,20 @@ def apply_evidence_cross_framework(
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 @router.post("/controls/{control_id}/generate-policy")
-def generate_policy(
+async def generate_policy(
     control_id: str,
     policy_name: Optional[str] = Form(None),
     company_name: Optional[str] = Form("Our Organization"),
     industry: Optional[str] = Form("Technology"),
     policy_owner: Optional[str] = Form("Chief Information Security Officer"),
     policy_approver: Optional[str] = Form("Board of Directors"),
+    regenerate: bool = Form(False),
     db: Session = Depends(get_db),
+    tenant_id: str = Depends(get_gateway_tenant),
 ):
     """
     Generate an audit-ready policy document for a control using AI.
+    Pass regenerate=true to bypass the LLM response cache.
     Returns professional Markdown content ready for PDF/Word export.
     """
     control = db.query(Control).filter(Control.control_id == str(control_id)).first()
@@ -378,12 +375,14 @@ def generate_policy(
     if not policy_name:
         policy_name = f"{control.title} Policy" if control.title else f"Control {control_id} Policy"
 
-    # Use existing generate_premium_policy from ai_service
-    policy_content = generate_premium_policy(
+    # Use existing generate_premium_policy_async from ai_service
+    policy_content = await generate_premium_policy_async(
         control_title=control.title or control_id,
         policy_name=policy_name,
         company_profile=company_profile,
         control_description=control.description or "",
+        regenerate=regenerate,
+        tenant_id=tenant_id,
     )
 
     return {
@@ -400,14 +399,10 @@ def generate_policy(
 # 5. GAP ANALYSIS (Bulk)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-@router.get("/controls/{control_id}/gap-analysis")
-def run_gap_analysis(
-    control_id: str,
-    db: Session = Depends(get_db),
-):
+def gap_analysis_for_control(db: Session, control_id: str, tenant_id: str = "default_tenant") -> dict:
     """
-    Run gap analysis: compare uploaded evidence against requirements.
-    Returns MET / PARTIAL / NOT_MET status.
+    Compare uploaded evidence against requirements for one control.
+    Shared by the endpoint and the "gap_analysis.control" background job.
     """
     control = db.query(Control).filter(Control.control_id == str(control_id)).first()
     if not control:
@@ -430,6 +425,7 @@ def run_gap_analysis(
         control_title=control.title or control_id,
         requirements=requirements,
         uploaded_files=uploaded_files,
+        tenant_id=tenant_id,
     )
 
     return {
@@ -443,6 +439,28 @@ def run_gap_analysis(
     }
 
 
+@router.get("/controls/{control_id}/gap-analysis")
+def run_gap_analysis(
+    control_id: str,
+    background: bool = Query(False, description="Queue as a background job and return its id"),
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity),
+):
+    """
+    Run gap analysis: compare uploaded evidence against requirements.
+    Returns MET / PARTIAL / NOT_MET status.
+    """
+    if background:
+        from app.services.job_queue import enqueue
+        if not db.query(Control.id).filter(Control.control_id == str(control_id)).first():
+            raise HTTPException(status_code=404, detail=f"Control '{control_id}' not found")
+        job = enqueue(db, "gap_analysis.control", {"control_id": control_id},
+                      tenant_id=identity.tenant_uuid, created_by=identity.username)
+        return {"status": "queued", "job_id": job.id, "control_id": control_id}
+
+    return gap_analysis_for_control(db, control_id, identity.tenant_uuid)
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 6. COMPLIANCE DASHBOARD SUMMARY
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -460,42 +478,7 @@ def get_compliance_summary(
     if not framework:
         raise HTTPException(status_code=404, detail="Framework not found")
 
-    controls = db.query(Control).filter(Control.framework_id == framework_id).all()
-
-    total = len(controls)
-    with_requirements = 0
-    with_evidence = 0
-    statuses = {"implemented": 0, "in_progress": 0, "not_started": 0, "other": 0}
-
-    for c in controls:
-        if c.ai_requirements_json:
-            try:
-                reqs = json.loads(c.ai_requirements_json)
-                if len(reqs) > 0:
-                    with_requirements += 1
-            except json.JSONDecodeError:
-                pass
-
-        ev_count = db.query(Evidence).filter(Evidence.control_id == c.id).count()
-        if ev_count > 0:
-            with_evidence += 1
-
-        status = (c.status or "not_started").lower()
-        if status in statuses:
-            statuses[status] += 1
-        else:
-            statuses["other"] += 1
-
-    return {
-        "framework_id": framework_id,
-        "framework_name": framework.name,
-        "total_controls": total,
-        "controls_with_requirements": with_requirements,
-        "controls_with_evidence": with_evidence,
-        "evidence_coverage_pct": round((with_evidence / total) * 100, 1) if total > 0 else 0,
-        "status_breakdown": statuses,
-        "compliance_score": round((statuses["implemented"] / total) * 100, 1) if total > 0 else 0,
-    }
+    return framework_compliance_summary(db, framework)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
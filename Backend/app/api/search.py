@@ -0,0 +1,26 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.api.deps import get_identity
+from app.utils.identity_cache import ResolvedIdentity
+from app.services.search_index import KINDS, search
+
+router = APIRouter()
+
+
+@router.get("/")
+def search_catalog(
+    q: str = Query(..., min_length=1, description="Words to find; the last one also matches as a prefix"),
+    kinds: Optional[List[str]] = Query(None, description=f"Any of: {', '.join(KINDS)}"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    identity: ResolvedIdentity = Depends(get_identity)
+):
+    """Ranked full-text search over controls, evidence and policies visible to the tenant."""
+    tenant_ids = [t for t in (identity.tenant_uuid, identity.default_tenant_uuid) if t]
+    hits = search(db, q, tenant_ids, kinds=kinds, limit=limit, offset=offset)
+    return [hit.to_dict() for hit in hits]
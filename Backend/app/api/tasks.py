@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import List, Optional
-import json
-import os
-from datetime import datetime
+
+from app.database import get_db
+from app.services.task_store import create_task, list_tasks, set_task_status
 
 router = APIRouter()
 
-TASKS_FILE = "tasks.json"
+TASKS_FILE = "tasks.json" # Legacy store; migrated into review_tasks at startup
 
 class TaskCreate(BaseModel):
     title: str
@@ -21,50 +22,36 @@ class Task(TaskCreate):
     status: str # "PENDING", "APPROVED", "REJECTED"
     created_at: str
 
-def load_tasks():
-    if not os.path.exists(TASKS_FILE):
-        return []
-    try:
-        with open(TASKS_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
-
-def save_tasks(tasks):
-    with open(TASKS_FILE, "w") as f:
-        json.dump(tasks, f, indent=2)
-
 @router.get("/", response_model=List[Task])
-def get_tasks():
-    return load_tasks()
+def get_tasks(
+    response: Response,
+    status: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    control_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Filtered, paginated task list; the total is returned in the X-Total-Count header."""
+    total, tasks = list_tasks(db, status=status, assigned_to=assigned_to, control_id=control_id, limit=limit, offset=offset)
+    response.headers["X-Total-Count"] = str(total)
+    return [t.to_dict() for t in tasks]
 
 @router.post("/request-approval", response_model=Task)
-def request_approval(task_in: TaskCreate):
-    tasks = load_tasks()
-    
-    new_task = {
-        "id": f"TASK-{len(tasks) + 1001}",
-        "title": task_in.title,
-        "description": task_in.description,
-        "document_id": task_in.document_id,
-        "control_id": task_in.control_id,
-        "assigned_to": task_in.assigned_to,
-        "status": "PENDING",
-        "created_at": datetime.now().isoformat()
-    }
-    
-    tasks.append(new_task)
-    save_tasks(tasks)
-    return new_task
+def request_approval(task_in: TaskCreate, db: Session = Depends(get_db)):
+    task = create_task(
+        db,
+        title=task_in.title,
+        description=task_in.description,
+        document_id=task_in.document_id,
+        control_id=task_in.control_id,
+        assigned_to=task_in.assigned_to
+    )
+    return task.to_dict()
 
 @router.post("/{task_id}/approve")
-def approve_task(task_id: str):
-    tasks = load_tasks()
-    for t in tasks:
-        if t["id"] == task_id:
-            t["status"] = "APPROVED"
-            t["completed_at"] = datetime.now().isoformat()
-            save_tasks(tasks)
-            return {"status": "success", "message": f"Task {task_id} approved"}
+def approve_task(task_id: str, db: Session = Depends(get_db)):
+    if set_task_status(db, task_id, "APPROVED"):
+        return {"status": "success", "message": f"Task {task_id} approved"}
     
     raise HTTPException(status_code=404, detail="Task not found")
@@ -15,6 +15,17 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Resolved tenant/user identity cache (seconds). 0 disables caching.
+    IDENTITY_CACHE_TTL_SECONDS: int = 60
+
+    # Content-addressed evidence storage (local filesystem backend)
+    BLOB_STORE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads", "blobs")
+    BLOB_GC_GRACE_SECONDS: int = 3600 # Unreferenced blobs younger than this are kept (upload in flight)
+    # Extract-once document text cache (app.services.document_extraction), keyed by content hash
+    DOCUMENT_TEXT_CACHE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads", "extracted_text")
+    DOCUMENT_TEXT_CACHE_MAX_CHARS: int = 50_000_000 # In-memory tier; older extractions fall back to disk
+    DOCUMENT_TEXT_CACHE_MAX_DISK_BYTES: int = 2_000_000_000 # Disk tier; least recently used extractions are pruned past this
+
     FIELD_ENCRYPTION_KEY: str = "W3pisde0nDHMsO1Cv7lfiqB8SpxdnH63R-cllQETyzM="
     APP_ENCRYPTION_KEY: str = "W3pisde0nDHMsO1Cv7lfiqB8SpxdnH63R-cllQETyzM="
 
@@ -58,6 +69,40 @@ class Settings(BaseSettings):
 
     OPENAI_API_KEY: Optional[str] = None
 
+    # AI gateway (app.services.ai_gateway); point AI_BASE_URL at a stub server for tests
+    AI_BASE_URL: str = "https://api.openai.com/v1"
+    AI_MAX_CONCURRENCY: int = 8 # In-flight upstream calls across all tenants
+    AI_TENANT_RATE_PER_MINUTE: float = 60.0
+    AI_TENANT_BURST: int = 10
+    AI_MAX_RETRIES: int = 3
+    AI_REQUEST_TIMEOUT_SECONDS: float = 60.0
+
+    # Persistent LLM response cache (app.services.llm_cache)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 5000 # Least recently used entries are evicted beyond this
+
+    # Local regex/checksum PII pre-scan (app.services.pii_scanner); ambiguous text still goes to the LLM
+    PII_LOCAL_SCAN_ENABLED: bool = True
+
+    # Background job queue (app.services.job_queue)
+    JOB_WORKERS_ENABLED: bool = True
+    JOB_WORKER_PROCESSES: int = 2
+    JOB_TENANT_CONCURRENCY: int = 2 # Running jobs per tenant
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_STALE_SECONDS: int = 600 # Running jobs without a heartbeat this long are requeued
+
+    # Batch policy generation (app.services.batch_policy_engine)
+    POLICY_BATCH_MAX_WORKERS: int = 4 # Concurrent generations per batch; AI gateway limits still apply
+    POLICY_BATCH_CHECKPOINT_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads", "policy_checkpoints")
+
+    # Streaming auditor pack export (app.services.zip_stream)
+    AUDITOR_PACK_HASH_WORKERS: int = 4 # Evidence files read + hashed ahead of the compressor
+
+    # Bulk cloud resource ingestion (app.services.resource_ingest)
+    RESOURCE_INGEST_BATCH_SIZE: int = 1000 # Resources per existence lookup / bulk write
+    RESOURCE_INGEST_WORKERS: int = 4 # Threads encrypting scrubbed metadata ahead of the writer
+
     @field_validator("OPENAI_API_KEY", mode='before')
     def fetch_openai_key(cls, v: Any, info: ValidationInfo) -> Any:
         """
@@ -106,6 +106,63 @@ def startup_event():
     finally:
         db.close()
 
+    # --- EVIDENCE BLOB STORE ---
+    # Schema upgrade for pre-blob databases, then reclaim blobs no Evidence row references
+    # and trim the extracted-text cache kept next to them.
+    try:
+        from app.services.blob_store import blob_store, ensure_blob_schema
+        from app.services.document_extraction import document_text_cache
+        ensure_blob_schema(engine)
+        db_blobs = SessionLocal()
+        blob_store.collect_garbage(db_blobs)
+        db_blobs.close()
+        document_text_cache.prune()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to prepare evidence blob store: {e}")
+
+    # --- CLOUD RESOURCE UPSERT KEY ---
+    # Unique (tenant_id, resource_id) for databases created before it; enables native upserts on ingest.
+    try:
+        from app.services.resource_ingest import ensure_cloud_resource_schema
+        ensure_cloud_resource_schema(engine)
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to prepare cloud resource upsert key: {e}")
+
+    # --- CONTROL REQUIREMENT COUNTS ---
+    # Schema upgrade + one-time backfill; the Control model keeps the count in step afterwards.
+    try:
+        from app.services.framework_stats import ensure_requirement_counts
+        db_counts = SessionLocal()
+        ensure_requirement_counts(engine, db_counts)
+        db_counts.close()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to backfill control requirement counts: {e}")
+
+    # --- FULL-TEXT SEARCH INDEX ---
+    # FTS5 (SQLite) / tsvector + GIN (Postgres); after_flush hooks keep it current afterwards.
+    try:
+        from app.services.search_index import ensure_search_schema, ensure_search_backfilled
+        if ensure_search_schema(engine):
+            db_search = SessionLocal()
+            indexed = ensure_search_backfilled(db_search)
+            if indexed:
+                print(f"[STARTUP] Search index built ({indexed} documents).")
+            db_search.close()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to prepare search index: {e}")
+
+    # --- COMPLIANCE ROLLUP BACKFILL ---
+    # One-time materialization of existing ComplianceResults; ORM events keep it in sync afterwards.
+    try:
+        from app.services.compliance_rollup import ensure_rollup_backfilled
+        db_rollup = SessionLocal()
+        rebuilt = ensure_rollup_backfilled(db_rollup)
+        if rebuilt:
+            print(f"[STARTUP] Compliance rollup backfilled ({rebuilt} rows).")
+        db_rollup.close()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to backfill compliance rollup: {e}")
+
     # --- AUTO-SEED SOC 2 FIX ---
     # This runs outside the main try block to ensure independent failure handling
     try:
@@ -136,6 +193,56 @@ def startup_event():
     except Exception as e:
         print(f"[STARTUP ERROR] Failed to auto-seed SOC 2 or Frameworks: {e}")
 
+    # --- INTENT INDEX WARM-UP ---
+    # Build the inverted intent -> control index after seeding so the first upload doesn't pay for it.
+    try:
+        from app.services.intent_index import get_intent_index
+        db_index = SessionLocal()
+        index = get_intent_index(db_index)
+        print(f"[STARTUP] Intent index built ({len(index.ref_to_intents)} crosswalk refs, {len(index.mapped_ids)} mapped controls).")
+        db_index.close()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to build intent index: {e}")
+
+    # --- DOCUMENT VERSION CATALOG ---
+    # Index revisions uploaded before the catalog existed (skips ones already indexed).
+    try:
+        from app.services.version_catalog import import_version_directory
+        from app.api.documents import VERSION_HISTORY_DIR
+        db_versions = SessionLocal()
+        import_version_directory(db_versions, VERSION_HISTORY_DIR)
+        db_versions.close()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to index document versions: {e}")
+
+    # --- TASK STORE MIGRATION ---
+    # One-shot: moves the legacy tasks.json into review_tasks, then renames the file.
+    try:
+        from app.services.task_store import import_tasks_json
+        from app.api.tasks import TASKS_FILE
+        db_tasks = SessionLocal()
+        import_tasks_json(db_tasks, TASKS_FILE)
+        db_tasks.close()
+    except Exception as e:
+        print(f"[STARTUP ERROR] Failed to migrate tasks.json: {e}")
+
+    # --- BACKGROUND JOB WORKERS ---
+    # Long-running AI / report work runs in worker processes so request threads stay free.
+    if settings.JOB_WORKERS_ENABLED:
+        try:
+            from app.services.job_queue import job_workers
+            job_workers.start()
+        except Exception as e:
+            print(f"[STARTUP ERROR] Failed to start job workers: {e}")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop job workers, then close the AI gateway's pooled connections and event loop thread."""
+    from app.services.job_queue import job_workers
+    job_workers.stop()
+    from app.services.ai_gateway import ai_gateway
+    ai_gateway.close()
+
 print("[OK] CORS CONFIGURATION LOADED: Allowed access from localhost:3000 and localhost:3001")
 
 
@@ -203,6 +310,14 @@ app.include_router(
     tags=["Policy Generation"]
 )
 
+# Background Jobs Router
+from app.api import jobs
+app.include_router(jobs.router, prefix=f"{settings.API_V1_PREFIX}/jobs", tags=["Background Jobs"])
+
+# Full-text Search Router
+from app.api import search
+app.include_router(search.router, prefix=f"{settings.API_V1_PREFIX}/search", tags=["Search"])
+
 # Requirements / Dynamic AI Router
 app.include_router(
     requirements.router,
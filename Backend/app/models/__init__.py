@@ -2,12 +2,14 @@ from app.models.user import User
 from app.models.framework import Framework
 from app.models.control import Control, ControlStatus
 from app.models.evidence import Evidence
+from app.models.evidence_blob import EvidenceBlob
 from app.models.control_mapping import ControlMapping
 from app.models.policy import Policy
 from app.models.assessment import Assessment
 from app.models.process import Process, SubProcess
 from app.models.settings import ComplianceSettings
 from app.models.document import Document
+from app.models.document_version import DocumentVersion
 from app.models.tenant import Tenant
 from app.models.tenant_framework import TenantFramework
 from app.models.tenant_feature import TenantFeature
@@ -18,11 +20,16 @@ from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk, Stan
 
 from app.models.scope_justification import ScopeJustification
 from app.models.person import Person
+from app.models.compliance_result import ComplianceResult
+from app.models.compliance_rollup import ComplianceRollup
+from app.models.llm_cache_entry import LLMCacheEntry
+from app.models.job import Job, JobStatus
+from app.models.review_task import ReviewTask
 
 __all__ = [
-    "User", "Framework", "Control", "ControlStatus", "Evidence", "ControlMapping", "Policy", 
-    "Assessment", "Process", "SubProcess", "ComplianceSettings", "Document", "Tenant",
+    "User", "Framework", "Control", "ControlStatus", "Evidence", "EvidenceBlob", "ControlMapping", "Policy", 
+    "Assessment", "Process", "SubProcess", "ComplianceSettings", "Document", "DocumentVersion", "Tenant",
     "TenantFramework", "TenantFeature", "CommonControl", "FrameworkMapping",
     "UniversalIntent", "IntentFrameworkCrosswalk", "StandardProcessOverlay", "Person",
-    "ScopeJustification"
+    "ScopeJustification", "ComplianceResult", "ComplianceRollup", "LLMCacheEntry", "Job", "JobStatus", "ReviewTask"
 ]
\ No newline at end of file
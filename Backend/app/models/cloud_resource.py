@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -22,5 +22,10 @@ class CloudResource(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # One row per resource per tenant; lets ingestion use native upserts
+        UniqueConstraint('tenant_id', 'resource_id', name='uq_cloud_resource_key'),
+    )
+
     def __repr__(self):
         return f"<CloudResource {self.resource_type}:{self.resource_id}>"
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ComplianceRollup(Base):
+    """
+    Materialized pass/fail counts per (tenant, framework, domain).
+    Derived from ComplianceResult joined to Control on control_id; maintained
+    incrementally by app.services.compliance_rollup. Never edit by hand.
+    """
+    __tablename__ = "compliance_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, nullable=False, index=True) # Same convention as ComplianceResult.tenant_id
+    framework_id = Column(Integer, nullable=False, index=True)
+    domain = Column(String, nullable=False) # Control.domain, "Uncategorized" when empty
+
+    total_count = Column(Integer, default=0, nullable=False)
+    pass_count = Column(Integer, default=0, nullable=False)
+    fail_count = Column(Integer, default=0, nullable=False)
+    implemented_count = Column(Integer, default=0, nullable=False) # Results whose Control.status is implemented
+    not_applicable_count = Column(Integer, default=0, nullable=False) # Results whose Control.is_applicable is False
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'framework_id', 'domain', name='uq_compliance_rollup_key'),
+    )
+
+    def __repr__(self):
+        return f"<ComplianceRollup {self.tenant_id} | FW {self.framework_id} | {self.domain}: {self.pass_count}/{self.total_count}>"
@@ -1,7 +1,8 @@
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Boolean
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 import enum
+import json
 from app.database import Base
 
 
@@ -32,6 +33,7 @@ class Control(Base):
     # AI Generated Data (Persisted)
     ai_explanation = Column(Text, nullable=True) # Summary of clause
     ai_requirements_json = Column(Text, nullable=True) # JSON list of requirements
+    ai_requirements_count = Column(Integer, default=0, nullable=True) # Kept in step with ai_requirements_json
     
     framework_id = Column(Integer, ForeignKey("frameworks.id"), nullable=False)
     framework = relationship("Framework", back_populates="controls")
@@ -85,6 +87,11 @@ class Control(Base):
     def __repr__(self):
         return f"<Control {self.control_id}: {self.title}>"
 
+    @validates("ai_requirements_json")
+    def _sync_requirements_count(self, key, value):
+        self.ai_requirements_count = count_requirements(value)
+        return value
+
     @property
     def process_name(self):
         """Returns the name of the canonical process this control belongs to (via SubProcess)"""
@@ -99,4 +106,14 @@ class Control(Base):
         if self.sub_processes and len(self.sub_processes) > 0:
             return self.sub_processes[0].name
         return None
-  
+
+
+def count_requirements(requirements_json):
+    """Number of entries in an ai_requirements_json payload (0 when empty or unparseable)."""
+    if not requirements_json:
+        return 0
+    try:
+        requirements = json.loads(requirements_json)
+    except (TypeError, ValueError):
+        return 0
+    return len(requirements) if isinstance(requirements, (list, dict)) else 0
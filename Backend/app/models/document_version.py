@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+class DocumentVersion(Base):
+    """
+    Catalog of uploaded document revisions (files live in version_history/).
+    The AI review receipt is stored inline so history reads never touch the filesystem.
+    tenant_id is NULL for revisions imported from before the catalog existed.
+    """
+    __tablename__ = "document_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, nullable=True)
+    control_id = Column(String, nullable=False) # Control reference, e.g. "A.5.1"
+    filename = Column(String, nullable=False, unique=True) # Stored name in version_history/
+    original_filename = Column(String, nullable=True)
+    file_hash = Column(String(64), nullable=True)
+    version_timestamp = Column(DateTime, nullable=True)
+
+    ai_status = Column(String, default="PENDING") # final_verdict of the receipt
+    ai_receipt = Column(JSON, nullable=True)
+    is_witnessed = Column(Boolean, default=False) # Confidential: receipt only, file not kept
+    uploaded_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_document_versions_tenant_control_ts', 'tenant_id', 'control_id', 'version_timestamp'),
+    )
+
+    def to_history_entry(self):
+        return {
+            "filename": self.filename,
+            "timestamp": self.version_timestamp.strftime("%Y%m%d %H%M%S") if self.version_timestamp else "Unknown",
+            "url": f"/api/v1/documents/download/{self.filename}",
+            "ai_status": self.ai_status or "PENDING",
+            "ai_analysis": self.ai_receipt
+        }
@@ -14,6 +14,7 @@ class Evidence(Base):
     file_path = Column(String, nullable=False)
     file_size = Column(BigInteger, nullable=True)
     file_type = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True) # SHA-256 of the stored blob (see EvidenceBlob)
     tenant_id = Column(String, default="default_tenant", nullable=False, index=True)
     master_intent_id = Column(String, nullable=True, index=True) # Antigravity Directive 3
     
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from sqlalchemy.sql import func
+from app.database import Base
+
+class EvidenceBlob(Base):
+    """
+    One physical evidence file, keyed by its SHA-256 digest.
+    Many Evidence rows (uploads to several controls, cross-framework sync clones)
+    point at the same storage_path. Managed by app.services.blob_store.
+    """
+    __tablename__ = "evidence_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    storage_path = Column(String, nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False) # Evidence rows referencing storage_path, as of the last GC pass
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_referenced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<EvidenceBlob {self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)>"
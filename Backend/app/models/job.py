@@ -0,0 +1,73 @@
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, JSON, Index
+from datetime import datetime
+import enum
+import uuid
+from app.database import Base
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+TERMINAL_JOB_STATUSES = (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value)
+
+class Job(Base):
+    """
+    Durable background job (AI generation, gap analysis, document review, reports).
+    Claimed and executed by app.services.job_queue worker processes.
+    Timestamps are naive UTC.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    tenant_id = Column(String, nullable=False, index=True) # Tenant UUID (ResolvedIdentity.tenant_uuid)
+    job_type = Column(String, nullable=False) # Registered handler key, e.g. "policy.generate_batch"
+    status = Column(String, default=JobStatus.QUEUED.value, nullable=False)
+
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    progress = Column(Float, default=0.0, nullable=False) # 0.0 - 1.0
+    progress_message = Column(String, nullable=True)
+
+    # Retry policy
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    retry_backoff_seconds = Column(Integer, default=30, nullable=False) # Doubles per attempt
+    next_run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    locked_by = Column(String, nullable=True) # Worker id holding the claim
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_jobs_status_next_run', 'status', 'next_run_at'),
+    )
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "progress": round(self.progress or 0.0, 4),
+            "progress_message": self.progress_message,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "cancel_requested": self.cancel_requested,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.job_type} {self.status}>"
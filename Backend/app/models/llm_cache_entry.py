@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LLMCacheEntry(Base):
+    """
+    Persisted LLM completion, keyed by a fingerprint of model + prompts + parameters.
+    Shared across tenants: identical catalog prompts (ISO/SOC 2 control text)
+    produce identical requests. Managed by app.services.llm_cache.
+    """
+    __tablename__ = "llm_cache_entries"
+
+    fingerprint = Column(String(64), primary_key=True)
+    content = Column(Text, nullable=False)
+
+    # Provenance
+    model = Column(String, nullable=True)
+    purpose = Column(String, nullable=True, index=True) # Calling function, e.g. "generate_business_text"
+    created_by_tenant = Column(String, nullable=True) # Tenant whose request populated the entry
+    prompt_chars = Column(Integer, nullable=True)
+
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True) # LRU order
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    def __repr__(self):
+        return f"<LLMCacheEntry {self.fingerprint[:12]} {self.purpose} hits={self.hit_count}>"
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+TASK_ID_OFFSET = 1000 # Public ids keep the legacy tasks.json format: TASK-1001, TASK-1002, ...
+
+class ReviewTask(Base):
+    """
+    Approval / review task (Admin inbox). Replaces the tasks.json file.
+    The integer primary key is allocated by the database, so concurrent
+    creates can't collide; the public id is derived from it.
+    """
+    __tablename__ = "review_tasks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    document_id = Column(String, nullable=True, index=True)
+    control_id = Column(String, nullable=True, index=True)
+    assigned_to = Column(String, default="Admin", index=True)
+    status = Column(String, default="PENDING", nullable=False, index=True) # PENDING, APPROVED, REJECTED, COMPLETED
+    task_type = Column(String, nullable=True) # e.g. REVIEW_VERSION
+    outcome = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_review_tasks_status_assignee', 'status', 'assigned_to'),
+    )
+
+    @property
+    def task_ref(self) -> str:
+        return f"TASK-{self.id + TASK_ID_OFFSET}"
+
+    @staticmethod
+    def id_from_ref(task_ref: str):
+        try:
+            return int(task_ref.split("-", 1)[1]) - TASK_ID_OFFSET
+        except (IndexError, ValueError):
+            return None
+
+    def to_dict(self):
+        data = {
+            "id": self.task_ref,
+            "title": self.title,
+            "description": self.description,
+            "document_id": self.document_id,
+            "control_id": self.control_id,
+            "assigned_to": self.assigned_to,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+        if self.task_type:
+            data["type"] = self.task_type
+        if self.outcome:
+            data["outcome"] = self.outcome
+        if self.completed_at:
+            data["completed_at"] = self.completed_at.isoformat()
+        return data
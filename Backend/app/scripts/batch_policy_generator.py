@@ -2,7 +2,8 @@
 Batch Policy Generation Script
 ==============================
 Generates all 72 policies defined in POLICY_CONTROL_MAP with progress tracking,
-validation, and database integration.
+validation, and database integration. Runs on BatchPolicyEngine: parallel workers,
+and per-policy checkpoints so rerunning the same command resumes after a crash.
 """
 
 import os
@@ -10,9 +11,9 @@ import sys
 import json
 from datetime import datetime
 from typing import Dict, List
-import time
 
 from app.services.ai_policy_service import PolicyGenerationService
+from app.services.batch_policy_engine import BatchPolicyEngine
 from app.services.policy_intents import POLICY_CONTROL_MAP
 
 
@@ -24,7 +25,9 @@ class BatchPolicyGenerator:
     def __init__(self, 
                  api_key: str = None,
                  company_name: str = "AssuRisk",
-                 output_dir: str = "C:/AssuRisk/Policies"):
+                 output_dir: str = "C:/AssuRisk/Policies",
+                 cloud_stack: str = None,
+                 max_workers: int = None):
         """
         Initialize batch generator
         
@@ -32,9 +35,13 @@ class BatchPolicyGenerator:
             api_key: OpenAI API key (Required)
             company_name: Organization name
             output_dir: Directory to save generated policies
+            cloud_stack: Cloud stack named in the policies (service default if None)
+            max_workers: Concurrent generations (POLICY_BATCH_MAX_WORKERS if None)
         """
         self.service = PolicyGenerationService(api_key)
+        self.engine = BatchPolicyEngine(service=self.service, max_workers=max_workers)
         self.company_name = company_name
+        self.cloud_stack = cloud_stack
         self.output_dir = output_dir
         
         # Create output directory
@@ -46,11 +53,12 @@ class BatchPolicyGenerator:
                             policy_filter: List[str] = None,
                             delay_seconds: int = 2) -> Dict:
         """
-        Generates all policies or a filtered subset
+        Generates all policies or a filtered subset on BatchPolicyEngine's worker pool.
+        Completed policies are checkpointed, so rerunning after a crash resumes.
         
         Args:
             policy_filter: Optional list of specific policy names to generate
-            delay_seconds: Delay between API calls to avoid rate limiting
+            delay_seconds: Unused; kept for callers. The AI gateway's rate limit paces requests now.
             
         Returns:
             Summary report dictionary
@@ -62,6 +70,7 @@ class BatchPolicyGenerator:
         print(f"{'='*70}")
         print(f"Total policies to generate: {len(policies_to_generate)}")
         print(f"Output directory: {self.output_dir}")
+        print(f"Workers: {self.engine.max_workers}")
         print(f"{'='*70}\n")
         
         results = {
@@ -72,92 +81,53 @@ class BatchPolicyGenerator:
             "failed": 0,
             "audit_ready": 0,
             "needs_review": 0,
+            "reused": 0,
             "policies": {},
             "summary_by_category": {}
         }
         
-        for i, policy_name in enumerate(policies_to_generate, 1):
-            print(f"\n[{i}/{len(policies_to_generate)}] Generating: {policy_name}")
-            print("-" * 70)
-            
-            try:
-                # Generate the policy
-                result = self.service.generate_policy(policy_name, self.company_name)
-                
-                if result.get("success"):
-                    results["successful"] += 1
-                    
-                    # Check if audit ready
-                    is_audit_ready = result["intent_coverage"]["audit_ready"] and result["validation"]["valid"]
-                    
-                    if is_audit_ready:
-                        results["audit_ready"] += 1
-                        subdirectory = "audit_ready"
-                        status_icon = "✓"
-                    else:
-                        results["needs_review"] += 1
-                        subdirectory = "needs_review"
-                        status_icon = "⚠"
-                    
-                    # Save the policy
-                    filename = f"{policy_name.replace(' ', '_').replace('/', '-')}.md"
-                    filepath = os.path.join(self.output_dir, subdirectory, filename)
-                    
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(result["content"])
-                    
-                    # Print summary
-                    print(f"{status_icon} Generated successfully")
-                    print(f"  Word count: {result['metadata']['word_count']}")
-                    print(f"  Intent coverage: {result['intent_coverage']['coverage_percentage']:.1f}%")
-                    print(f"  Mandatory statements: {result['validation']['mandatory_statements']}")
-                    print(f"  Status: {'AUDIT READY' if is_audit_ready else 'NEEDS REVIEW'}")
-                    print(f"  Saved to: {filepath}")
-                    
-                    # Show any warnings
-                    if result['validation']['warnings']:
-                        print(f"  Warnings:")
-                        for warning in result['validation']['warnings']:
-                            print(f"    - {warning}")
-                    
-                    # Store result
-                    results["policies"][policy_name] = {
-                        "success": True,
-                        "audit_ready": is_audit_ready,
-                        "word_count": result['metadata']['word_count'],
-                        "coverage": result['intent_coverage']['coverage_percentage'],
-                        "filepath": filepath,
-                        "controls": result['metadata']['mapped_controls']
-                    }
-                    
-                else:
-                    results["failed"] += 1
-                    print(f"✗ Failed: {result.get('error')}")
-                    
-                    results["policies"][policy_name] = {
-                        "success": False,
-                        "error": result.get('error')
-                    }
-                
-            except Exception as e:
-                results["failed"] += 1
-                print(f"✗ Exception: {str(e)}")
-                
+        summary = self.engine.run(
+            policies_to_generate,
+            company_profile={"company_name": self.company_name, "cloud_stack": self.cloud_stack},
+            on_progress=self._print_progress
+        )
+        for key in ("successful", "failed", "audit_ready", "needs_review", "reused"):
+            results[key] = summary[key]
+        
+        for policy_name in policies_to_generate:
+            result = summary["policies"].get(policy_name)
+            if result is None:
+                continue
+            if not result["success"]:
                 results["policies"][policy_name] = {
                     "success": False,
-                    "error": str(e)
+                    "error": result.get("error")
                 }
+                continue
+            
+            # Save the policy
+            subdirectory = "audit_ready" if result["audit_ready"] else "needs_review"
+            filename = f"{policy_name.replace(' ', '_').replace('/', '-')}.md"
+            filepath = os.path.join(self.output_dir, subdirectory, filename)
             
-            # Rate limiting delay
-            if i < len(policies_to_generate):
-                time.sleep(delay_seconds)
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(result["content"])
+            
+            # Store result
+            results["policies"][policy_name] = {
+                "success": True,
+                "audit_ready": result["audit_ready"],
+                "reused": result["reused"],
+                "word_count": result["word_count"],
+                "coverage": result["coverage"],
+                "filepath": filepath,
+                "controls": (result.get("metadata") or {}).get("mapped_controls")
+            }
         
         # Finalize results
         results["end_time"] = datetime.now().isoformat()
-        results["duration_seconds"] = (
-            datetime.fromisoformat(results["end_time"]) - 
-            datetime.fromisoformat(results["start_time"])
-        ).total_seconds()
+        results["duration_seconds"] = summary["duration_seconds"]
+        results["throughput_per_minute"] = summary["throughput_per_minute"]
         
         # Generate summary report
         self._generate_summary_report(results)
@@ -167,6 +137,13 @@ class BatchPolicyGenerator:
         
         return results
     
+    @staticmethod
+    def _print_progress(progress: Dict):
+        eta = f"{progress['eta_seconds']:.0f}s" if progress["eta_seconds"] is not None else "-"
+        print(f"[{progress['completed']}/{progress['total']}] {progress['last_policy']} "
+              f"| {progress['throughput_per_minute']}/min | ETA {eta} "
+              f"| failed {progress['failed']} | from checkpoints {progress['reused']}")
+    
     def generate_priority_policies(self) -> Dict:
         """
         Generates only the high-priority policies needed for Stage 1 audit
@@ -214,9 +191,10 @@ class BatchPolicyGenerator:
         print(f"Total policies: {results['total_policies']}")
         print(f"✓ Successful: {results['successful']}")
         print(f"✗ Failed: {results['failed']}")
+        print(f"↺ From checkpoints: {results['reused']}")
         print(f"✓ Audit ready: {results['audit_ready']}")
         print(f"⚠ Needs review: {results['needs_review']}")
-        print(f"Duration: {results['duration_seconds']:.1f} seconds")
+        print(f"Duration: {results['duration_seconds']:.1f} seconds ({results['throughput_per_minute']}/min)")
         print("="*70)
         
         if results['audit_ready'] > 0:
@@ -268,7 +246,11 @@ def main():
     parser.add_argument("--output", default="C:/AssuRisk/Policies",
                        help="Output directory")
     parser.add_argument("--delay", type=int, default=2,
-                       help="Delay in seconds between API calls")
+                       help="Ignored; the AI gateway rate limit paces requests")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Concurrent generations (default: POLICY_BATCH_MAX_WORKERS)")
+    parser.add_argument("--cloud-stack", default=None,
+                       help="Cloud stack named in the policies")
     
     args = parser.parse_args()
     
@@ -284,7 +266,9 @@ def main():
     generator = BatchPolicyGenerator(
         api_key=api_key,
         company_name=args.company,
-        output_dir=args.output
+        output_dir=args.output,
+        cloud_stack=args.cloud_stack,
+        max_workers=args.workers
     )
     
     # Run generation based on mode
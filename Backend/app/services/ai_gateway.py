@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class AIGatewayError(Exception):
+    """Raised when a chat completion fails after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # Runs on the gateway loop only, so no lock is needed between check and take
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AIGateway:
+    """
+    Single async entry point for OpenAI-compatible chat completions.
+
+    - One pooled httpx.AsyncClient (keep-alive) on a dedicated event loop thread
+    - Per-tenant token bucket + global concurrency cap
+    - Jittered exponential backoff on 429/5xx/transport errors (honours Retry-After)
+    - Identical in-flight requests are coalesced into one upstream call
+
+    Sync code calls chat(); async handlers await achat(). Both run on the gateway
+    loop, so API routes never block on an LLM round trip.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        max_concurrency: int = None,
+        tenant_rate_per_minute: float = None,
+        tenant_burst: int = None,
+        max_retries: int = None,
+        timeout: float = None,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 20.0,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.base_url = (base_url or settings.AI_BASE_URL).rstrip("/")
+        self._api_key = api_key
+        self.max_concurrency = max_concurrency or settings.AI_MAX_CONCURRENCY
+        self.tenant_rate = (tenant_rate_per_minute or settings.AI_TENANT_RATE_PER_MINUTE) / 60.0
+        self.tenant_burst = tenant_burst or settings.AI_TENANT_BURST
+        self.max_retries = settings.AI_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or settings.AI_REQUEST_TIMEOUT_SECONDS
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._transport = transport
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Loop-bound state, created on the gateway loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.stats = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0}
+
+    # --- Loop management ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run, name="ai-gateway", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    def chat(self, payload: dict, tenant_id: str = "default_tenant") -> str:
+        """Blocking call for sync code paths. Returns the assistant message content."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._complete(payload, tenant_id), loop)
+        return future.result()
+
+    async def achat(self, payload: dict, tenant_id: str = "default_tenant") -> str:
+        """Awaitable call for async handlers; the caller's loop stays free while waiting."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._complete(payload, tenant_id), loop)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._buckets = {}
+        self._inflight = {}
+
+    # --- Gateway loop internals ---
+
+    def _api_key_value(self) -> str:
+        raw_key = self._api_key or settings.OPENAI_API_KEY
+        if not raw_key:
+            raise AIGatewayError("API Key is missing")
+        return str(raw_key).strip() # Keys pasted into env vars often carry newlines
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                transport=self._transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _bucket(self, tenant_id: str) -> TokenBucket:
+        bucket = self._buckets.get(tenant_id)
+        if bucket is None:
+            bucket = self._buckets[tenant_id] = TokenBucket(self.tenant_rate, self.tenant_burst)
+        return bucket
+
+    @staticmethod
+    def coalesce_key(payload: dict) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    async def _complete(self, payload: dict, tenant_id: str) -> str:
+        self.stats["requests"] += 1
+        key = self.coalesce_key(payload)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            content = await self._send_with_retries(payload, tenant_id or "default_tenant")
+            future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def _send_with_retries(self, payload: dict, tenant_id: str) -> str:
+        client = self._get_client()
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self._api_key_value()}"
+        }
+        body = {k: v for k, v in payload.items() if v is not None}
+
+        attempt = 0
+        while True:
+            await self._bucket(tenant_id).acquire()
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    self.stats["upstream_calls"] += 1
+                    response = await client.post("/chat/completions", headers=headers, json=body)
+            except httpx.TransportError as e:
+                error = AIGatewayError(f"OpenAI transport error: {e}")
+            else:
+                if response.status_code == 200:
+                    return response.json()["choices"][0]["message"]["content"]
+                error = AIGatewayError(f"OpenAI API Error ({response.status_code}): {response.text}", response.status_code)
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise error
+                retry_after = response.headers.get("retry-after")
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            self.stats["retries"] += 1
+            print(f"[AI Gateway] {error} - retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+def chat_payload(system_prompt: str, user_content, model: str, max_tokens: int, temperature: float, json_mode: bool = False) -> dict:
+    """OpenAI chat-completions body; user_content may be a string or multimodal parts."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        "response_format": {"type": "json_object"} if json_mode else None,
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+
+
+ai_gateway = AIGateway()
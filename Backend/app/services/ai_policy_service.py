@@ -15,6 +15,9 @@ from app.config import settings
 from app.services.policy_template_structure import PolicyTemplateStructure
 from app.services.policy_intents import get_policy_intents, get_mapped_controls, POLICY_CONTROL_MAP
 
+# Hardcoded stack for now, ideally comes from settings
+DEFAULT_CLOUD_STACK = "AWS, Office 365, GitHub"
+
 
 class PolicyGenerationService:
     """
@@ -130,16 +133,15 @@ Output valid Markdown only. Do not wrap in ```markdown blocks.
     def generate_policy(self, 
                        policy_name: str, 
                        company_name: str = "AssuRisk",
-                       temperature: float = 0.1) -> Dict:
+                       temperature: float = 0.1,
+                       cloud_stack: str = DEFAULT_CLOUD_STACK,
+                       tenant_id: str = "default_tenant") -> Dict:
         """
         Generates a complete policy document using OpenAI GPT-4-Turbo.
         """
         # Soft-Match / Fallback for unknown policies
         if policy_name not in POLICY_CONTROL_MAP:
             print(f"WARNING: Policy '{policy_name}' not explicitly mapped. Using default controls.")
-            
-        # Hardcoded stack for now, ideally comes from settings
-        cloud_stack = "AWS, Office 365, GitHub"
         
         system_prompt = self._build_system_prompt()
         user_prompt = self._build_user_prompt(policy_name, company_name, cloud_stack)
@@ -150,16 +152,12 @@ Output valid Markdown only. Do not wrap in ```markdown blocks.
         if self.provider == "openai" and self.openai_client:
             print(f"  Generating {policy_name} with OpenAI GPT-4-Turbo...")
             try:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4-turbo",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_tokens=4000,
-                    temperature=temperature
+                # Through the shared gateway so batch fan-out stays within the tenant rate limit
+                from app.services.ai_gateway import ai_gateway, chat_payload
+                generated_content = ai_gateway.chat(
+                    chat_payload(system_prompt, user_prompt, "gpt-4-turbo", 4000, temperature),
+                    tenant_id
                 )
-                generated_content = response.choices[0].message.content
             except Exception as e:
                 print(f"  ⚠ OpenAI Failure: {str(e)}")
                 return {"success": False, "error": f"OpenAI Generation Failed: {str(e)}"}
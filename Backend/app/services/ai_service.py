@@ -1,3 +1,4 @@
+import asyncio
 import random
 from datetime import datetime
 import json
@@ -6,6 +7,8 @@ from sqlalchemy.orm import Session
 import openai
 from app.models import Assessment, Control, Evidence, Policy
 from app.config import settings
+from app.services.ai_gateway import ai_gateway, chat_payload
+from app.services.llm_cache import acached_chat, cached_chat
 
 # Initialize AI Client (OpenAI Priority)
 client = None
@@ -27,9 +30,11 @@ except Exception as e:
     print(f"CRITICAL ERROR initializing AI client: {e}")
     client = None
 
-def generate_ai_response(system_prompt: str, user_prompt: str, max_tokens: int = 1000, json_mode: bool = False) -> str:
+def generate_ai_response(system_prompt: str, user_prompt: str, max_tokens: int = 1000, json_mode: bool = False, tenant_id: str = "default_tenant", cache_purpose: str = None, regenerate: bool = False) -> str:
     """
     Unified validation and generation wrapper for OpenAI Only
+    (pooled, rate-limited and retried by the AI gateway)
+    Pass cache_purpose to serve repeat prompts from the LLM response cache.
     """
     if not client:
         raise ValueError("AI Client not initialized")
@@ -37,48 +42,34 @@ def generate_ai_response(system_prompt: str, user_prompt: str, max_tokens: int =
     print(f"!!! GENERATING WITH PROVIDER: {PROVIDER} - Model: {MODEL_NAME} !!!")
 
     try:
-        # AGGRESSIVE STRIP: Remove any newlines or spaces from the key
-        # Explicitly fetch from settings or env to ensure we have the latest
-        raw_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-        if not raw_key:
-             raise ValueError("API Key is missing")
-        
-        api_key = str(raw_key).strip()
-
         if PROVIDER == "openai":
-            import requests
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
-            
-            payload = {
-                "model": MODEL_NAME or "gpt-4-turbo-preview",
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "response_format": {"type": "json_object"} if json_mode else None,
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            }
-            
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                 raise Exception(f"OpenAI API Error ({response.status_code}): {response.text}")
-                 
-            return response.json()['choices'][0]['message']['content']
+            payload = chat_payload(system_prompt, user_prompt, MODEL_NAME or "gpt-4-turbo-preview", max_tokens, 0.7, json_mode)
+            if cache_purpose:
+                return cached_chat(payload, cache_purpose, tenant_id, regenerate=regenerate)
+            return ai_gateway.chat(payload, tenant_id)
             
     except Exception as e:
         print(f"AI Generation Error ({PROVIDER}): {e}")
         raise e
 
+async def agenerate_ai_response(system_prompt: str, user_prompt: str, max_tokens: int = 1000, json_mode: bool = False, tenant_id: str = "default_tenant", cache_purpose: str = None, regenerate: bool = False) -> str:
+    """
+    Async twin of generate_ai_response for async handlers (does not hold a worker thread).
+    """
+    if not client:
+        raise ValueError("AI Client not initialized")
+
+    try:
+        if PROVIDER == "openai":
+            payload = chat_payload(system_prompt, user_prompt, MODEL_NAME or "gpt-4-turbo-preview", max_tokens, 0.7, json_mode)
+            if cache_purpose:
+                return await acached_chat(payload, cache_purpose, tenant_id, regenerate=regenerate)
+            return await ai_gateway.achat(payload, tenant_id)
+
+    except Exception as e:
+        print(f"AI Generation Error ({PROVIDER}): {e}")
+        raise e
+
 def analyze_control_logic(control_id: int, db: Session, tenant_id: str = "default_tenant") -> Assessment:
 
     """
@@ -157,51 +148,51 @@ def analyze_control_logic(control_id: int, db: Session, tenant_id: str = "defaul
     
     return assessment
 
-def suggest_evidence(title: str, description: str, category: str, control_id: int = None, db: Session = None, regenerate: bool = False):
-    # 1. Check DB for existing suggestion (Persistence)
-    if control_id and db and not regenerate:
-        # FIX: Use control_id (String) not id (Integer)
-        control = db.query(Control).filter(Control.control_id == str(control_id)).first()
-        if control and control.ai_requirements_json:
-            print(f"DEBUG: Checking Persisted AI Data for Control {control_id}")
-            try:
-                # Smart Cache Invalidation:
-                # If cached data contains generic/placeholder text, force regeneration.
-                cached_str = control.ai_requirements_json or ""
-                explanation = control.ai_explanation or ""
-                
-                cached_str_lower = cached_str.lower()
-                explanation_lower = explanation.lower()
-                
-                invalid_triggers = [
-                    "standard policy", 
-                    "autogenerate_by_ai",
-                    "master intent library",
-                    "example artifact",
-                    "generated by ai",
-                    "ai generated"
-                ]
-
-                # --- CONSISTENCY LOCK START ---
-                if control.ai_requirements_json and not regenerate:
-                    requirements = json.loads(control.ai_requirements_json)
-                    explanation = control.ai_explanation or "Regulatory Intent Summary"
-                    
-                    # SELF-HEALING: If this was a System Generated Fallback, and we have AI now, REGENERATE.
-                    if "System Generated" in explanation or "Standard Compliance Requirement" in explanation:
-                         print(f"DEBUG: Self-Healing triggered for Control {control_id} (Replacing Fallback)")
-                         # Do not return. Fall through to AI generation.
-                    elif len(requirements) > 0:
-                        print(f"DEBUG: CONSISTENCY LOCK - Using stored data for {control_id}")
-                        return {
-                            "explanation": explanation,
-                            "requirements": requirements
-                        }
-                    # --- CONSISTENCY LOCK END ---
-            except Exception as e:
-                print(f"Error parsing stored JSON: {e}")
-                # Fallthrough to generate new
+def _stored_suggestion(control_id, db: Session):
+    # FIX: Use control_id (String) not id (Integer)
+    control = db.query(Control).filter(Control.control_id == str(control_id)).first()
+    if control and control.ai_requirements_json:
+        print(f"DEBUG: Checking Persisted AI Data for Control {control_id}")
+        try:
+            # Smart Cache Invalidation:
+            # If cached data contains generic/placeholder text, force regeneration.
+            cached_str = control.ai_requirements_json or ""
+            explanation = control.ai_explanation or ""
+            
+            cached_str_lower = cached_str.lower()
+            explanation_lower = explanation.lower()
+            
+            invalid_triggers = [
+                "standard policy", 
+                "autogenerate_by_ai",
+                "master intent library",
+                "example artifact",
+                "generated by ai",
+                "ai generated"
+            ]
 
+            # --- CONSISTENCY LOCK START ---
+            if control.ai_requirements_json:
+                requirements = json.loads(control.ai_requirements_json)
+                explanation = control.ai_explanation or "Regulatory Intent Summary"
+                
+                # SELF-HEALING: If this was a System Generated Fallback, and we have AI now, REGENERATE.
+                if "System Generated" in explanation or "Standard Compliance Requirement" in explanation:
+                     print(f"DEBUG: Self-Healing triggered for Control {control_id} (Replacing Fallback)")
+                     # Do not return. Fall through to AI generation.
+                elif len(requirements) > 0:
+                    print(f"DEBUG: CONSISTENCY LOCK - Using stored data for {control_id}")
+                    return {
+                        "explanation": explanation,
+                        "requirements": requirements
+                    }
+                # --- CONSISTENCY LOCK END ---
+        except Exception as e:
+            print(f"Error parsing stored JSON: {e}")
+            # Fallthrough to generate new
+    return None
+
+def _suggest_evidence_payload(title: str, description: str, control_id=None) -> dict:
     # Infer Framework from Control ID if possible, else default to context
     framework_context = "ISO 27001 / SOC 2"
     if title.startswith("A.") or (control_id and str(control_id).startswith("A")):
@@ -257,117 +248,118 @@ Source Determination:
     Generate ALL requirements that the standard text implies. Do not limit to 6 — generate as many as the clause actually requires (typically 3-10).
     """
 
-    # Combined Prompt
-    try:
-        api_key = settings.OPENAI_API_KEY
-        if not api_key:
-            raise ValueError("AI Client not initialized (Missing API Key)")
+    # Direct HTTP via the AI gateway (pooled connection, retries on 429/5xx)
+    return chat_payload(system_prompt, user_message, "gpt-4-turbo-preview", 1024, 0.2, json_mode=True)
 
-        # Direct HTTP Request to bypass SDK connection issues
-        import requests
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        payload = {
-            "model": "gpt-4-turbo-preview",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            "response_format": {"type": "json_object"},
-            "max_tokens": 1024,
-            "temperature": 0.2
-        }
-        
-        print(f"!!! GENERATING WITH PROVIDER: openai - Model: gpt-4-turbo-preview (Direct HTTP) !!!")
+def _store_suggestion(content: str, control_id, db: Session):
+    # Clean potential markdown wrappers (Redundant if json_mode=True but safe)
+    if "```json" in content:
+        content = content.replace("```json", "").replace("```", "")
+    elif "```" in content:
+        content = content.replace("```", "")
         
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30 # Explicit timeout
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API Error ({response.status_code}): {response.text}")
-            
-        result = response.json()
-        content = result['choices'][0]['message']['content']
+    result = json.loads(content)
+    
+    # MAP TO FRONTEND FORMAT AND SAVE
+    final_requirements = []
+    raw_reqs = result.get("requirements", [])
+    
+    for r in raw_reqs:
+        final_requirements.append({
+            "name": r.get("Requirement_Name", "Unknown Artifact"),
+            "type": r.get("Requirement_Type", "Artifact"),
+            "desc": r.get("Description", "Required per Master Intent Library"),
+            "automation_potential": r.get("Automation_Potential", False),
+            "audit_guidance": r.get("Auditor_Guidance", ""),
+            "source": r.get("Source", "HYBRID"),
+            "evidence_types": r.get("Evidence_Types", [])
+        })
         
-        # Clean potential markdown wrappers (Redundant if json_mode=True but safe)
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        elif "```" in content:
-            content = content.replace("```", "")
+    # 2. Save to DB (Persistence)
+    if control_id and db:
+        try:
+            # FIX: Use control_id (String) not id (Integer)
+            control = db.query(Control).filter(Control.control_id == str(control_id)).first()
+            if control:
+                control.ai_explanation = result.get("explanation", "")
+                control.ai_requirements_json = json.dumps(final_requirements)
+                db.commit()
+                print(f"DEBUG: Saved AI Data for Control {control_id}")
+        except Exception as e:
+            print(f"Error saving to DB: {e}")
             
-        result = json.loads(content)
+    if control_id and str(control_id).lower() == "4.1": 
+        result["master_intent_id"] = "INTENT_ORG_CONTEXT"
+    elif control_id and str(control_id).lower() == "5.2":
+        result["master_intent_id"] = "INTENT_GOVERNANCE_POLICY"
         
-        # MAP TO FRONTEND FORMAT AND SAVE
-        final_requirements = []
-        raw_reqs = result.get("requirements", [])
-        
-        for r in raw_reqs:
-            final_requirements.append({
-                "name": r.get("Requirement_Name", "Unknown Artifact"),
-                "type": r.get("Requirement_Type", "Artifact"),
-                "desc": r.get("Description", "Required per Master Intent Library"),
-                "automation_potential": r.get("Automation_Potential", False),
-                "audit_guidance": r.get("Auditor_Guidance", ""),
-                "source": r.get("Source", "HYBRID"),
-                "evidence_types": r.get("Evidence_Types", [])
-            })
-            
-        # 2. Save to DB (Persistence)
-        if control_id and db:
-            try:
-                # FIX: Use control_id (String) not id (Integer)
-                control = db.query(Control).filter(Control.control_id == str(control_id)).first()
-                if control:
-                    control.ai_explanation = result.get("explanation", "")
-                    control.ai_requirements_json = json.dumps(final_requirements)
-                    db.commit()
-                    print(f"DEBUG: Saved AI Data for Control {control_id}")
-            except Exception as e:
-                print(f"Error saving to DB: {e}")
-                
-        if control_id and str(control_id).lower() == "4.1": 
-            result["master_intent_id"] = "INTENT_ORG_CONTEXT"
-        elif control_id and str(control_id).lower() == "5.2":
-            result["master_intent_id"] = "INTENT_GOVERNANCE_POLICY"
-            
-        return {
-            "explanation": result.get("explanation", ""),
-            "requirements": final_requirements,
-            "master_intent_id": result.get("master_intent_id", None)
-        }
+    return {
+        "explanation": result.get("explanation", ""),
+        "requirements": final_requirements,
+        "master_intent_id": result.get("master_intent_id", None)
+    }
+
+def _store_fallback_suggestion(title: str, description: str, category: str, control_id, db: Session):
+    # FALLBACK: Generate Static Requirements based on Intent
+    fallback_reqs = generate_fallback_requirements(title, description, category)
+    
+    # PERSISTENCE: Save these so we don't retry (User Rule: "Generate Only Once")
+    if control_id and db:
+        try:
+            control = db.query(Control).filter(Control.control_id == str(control_id)).first()
+            if control:
+                control.ai_explanation = "Standard Compliance Requirement (System Generated)"
+                control.ai_requirements_json = json.dumps(fallback_reqs)
+                db.commit()
+                print(f"DEBUG: Saved FALLBACK Data for Control {control_id}")
+        except Exception as db_e:
+             print(f"Error saving fallback to DB: {db_e}")
+
+    return {
+        "explanation": "Standard Compliance Requirement (System Generated)",
+        "requirements": fallback_reqs,
+        "master_intent_id": "FALLBACK_INTENT"
+    }
+
+def suggest_evidence(title: str, description: str, category: str, control_id: int = None, db: Session = None, regenerate: bool = False, tenant_id: str = "default_tenant"):
+    # 1. Check DB for existing suggestion (Persistence)
+    if control_id and db and not regenerate:
+        stored = _stored_suggestion(control_id, db)
+        if stored:
+            return stored
+
+    payload = _suggest_evidence_payload(title, description, control_id)
+    try:
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("AI Client not initialized (Missing API Key)")
+
+        print(f"!!! GENERATING WITH PROVIDER: openai - Model: gpt-4-turbo-preview (Direct HTTP) !!!")
+
+        content = cached_chat(payload, "suggest_evidence", tenant_id, regenerate=regenerate)
+        return _store_suggestion(content, control_id, db)
     except Exception as e:
-        import traceback
-        # traceback.print_exc() # Reduce noise
         print(f"AI Suggestion Error: {e}. Falling back to Static Rules.")
-        
-        # FALLBACK: Generate Static Requirements based on Intent
-        fallback_reqs = generate_fallback_requirements(title, description, category)
-        
-        # PERSISTENCE: Save these so we don't retry (User Rule: "Generate Only Once")
-        if control_id and db:
-            try:
-                control = db.query(Control).filter(Control.control_id == str(control_id)).first()
-                if control:
-                    control.ai_explanation = "Standard Compliance Requirement (System Generated)"
-                    control.ai_requirements_json = json.dumps(fallback_reqs)
-                    db.commit()
-                    print(f"DEBUG: Saved FALLBACK Data for Control {control_id}")
-            except Exception as db_e:
-                 print(f"Error saving fallback to DB: {db_e}")
-
-        return {
-            "explanation": "Standard Compliance Requirement (System Generated)",
-            "requirements": fallback_reqs,
-            "master_intent_id": "FALLBACK_INTENT"
-        }
+        return _store_fallback_suggestion(title, description, category, control_id, db)
+
+async def suggest_evidence_async(title: str, description: str, category: str, control_id: int = None, db: Session = None, regenerate: bool = False, tenant_id: str = "default_tenant"):
+    """
+    Async twin of suggest_evidence: DB reads/writes run in a worker thread, the LLM call is awaited.
+    """
+    if control_id and db and not regenerate:
+        stored = await asyncio.to_thread(_stored_suggestion, control_id, db)
+        if stored:
+            return stored
+
+    payload = _suggest_evidence_payload(title, description, control_id)
+    try:
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("AI Client not initialized (Missing API Key)")
+
+        content = await acached_chat(payload, "suggest_evidence", tenant_id, regenerate=regenerate)
+        return await asyncio.to_thread(_store_suggestion, content, control_id, db)
+    except Exception as e:
+        print(f"AI Suggestion Error: {e}. Falling back to Static Rules.")
+        return await asyncio.to_thread(_store_fallback_suggestion, title, description, category, control_id, db)
 
 def generate_fallback_requirements(title: str, description: str, category: str):
     """
@@ -477,7 +469,7 @@ def generate_fallback_requirements(title: str, description: str, category: str):
         
     return reqs
 
-def generate_business_text(control_id: str, standard_text: str):
+def generate_business_text(control_id: str, standard_text: str, regenerate: bool = False, tenant_id: str = "default_tenant"):
     """
     Generates a 'Business View' Title and Description for a Control/Clause.
     Title = Job to be Done (Action Oriented)
@@ -511,43 +503,12 @@ def generate_business_text(control_id: str, standard_text: str):
         if not api_key:
             raise ValueError("AI Client not initialized (Missing API Key)")
 
-        # Direct HTTP Request to bypass SDK connection issues
-        import requests
-        import json
-        
-        # AGGRESSIVE STRIP: Remove any newlines or spaces from the key
-        api_key = str(settings.OPENAI_API_KEY).strip()
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        payload = {
-            "model": "gpt-4-turbo-preview",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            "response_format": {"type": "json_object"},
-            "max_tokens": 1024,
-            "temperature": 0.2
-        }
+        # Direct HTTP via the AI gateway (pooled connection, retries on 429/5xx)
+        payload = chat_payload(system_prompt, user_message, "gpt-4-turbo-preview", 1024, 0.2, json_mode=True)
         
         print(f"!!! GENERATING WITH PROVIDER: openai - Model: gpt-4-turbo-preview (Direct HTTP) !!!")
         
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30 # Explicit timeout
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API Error ({response.status_code}): {response.text}")
-            
-        result = response.json()
-        content = result['choices'][0]['message']['content']
+        content = cached_chat(payload, "generate_business_text", tenant_id, regenerate=regenerate)
         
         # Clean potential markdown wrappers (Redundant if json_mode=True but safe)
         if "```json" in content:
@@ -561,7 +522,7 @@ def generate_business_text(control_id: str, standard_text: str):
         print(f"Generate Business Text Error: {e}")
         return {"business_title": "Error Generating Title", "business_description": "Error Generating Description"}
 
-def analyze_gap(control_title: str, requirements: list, uploaded_files: list):
+def _gap_prompts(control_title: str, requirements: list, uploaded_files: list):
     req_list = ", ".join([r.get("name", "Unknown") for r in requirements])
     file_list = ", ".join(uploaded_files) if uploaded_files else "None"
 
@@ -579,6 +540,17 @@ def analyze_gap(control_title: str, requirements: list, uploaded_files: list):
         "reasoning": "Brief explanation."
     }}
     """
+    return system_prompt, user_message
+
+def _gap_error():
+    return {
+        "status": "NOT_MET",
+        "missing_items": ["Error analyzing evidence"],
+        "reasoning": "AI Service unavailable."
+    }
+
+def analyze_gap(control_title: str, requirements: list, uploaded_files: list, tenant_id: str = "default_tenant"):
+    system_prompt, user_message = _gap_prompts(control_title, requirements, uploaded_files)
 
     try:
         if not client:
@@ -588,21 +560,33 @@ def analyze_gap(control_title: str, requirements: list, uploaded_files: list):
             system_prompt=system_prompt,
             user_prompt=user_message,
             max_tokens=1024,
-            json_mode=True
+            json_mode=True,
+            tenant_id=tenant_id
         )
-        
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        elif "```" in content:
-            content = content.replace("```", "")
-            
-        return json.loads(content)
+        return _parse_json_content(content)
     except Exception as e:
-        return {
-            "status": "NOT_MET",
-            "missing_items": ["Error analyzing evidence"],
-            "reasoning": "AI Service unavailable."
-        }
+        return _gap_error()
+
+async def analyze_gap_async(control_title: str, requirements: list, uploaded_files: list, tenant_id: str = "default_tenant"):
+    """
+    Async twin of analyze_gap for async handlers.
+    """
+    system_prompt, user_message = _gap_prompts(control_title, requirements, uploaded_files)
+
+    try:
+        if not client:
+            raise ValueError("AI Client not initialized")
+
+        content = await agenerate_ai_response(
+            system_prompt=system_prompt,
+            user_prompt=user_message,
+            max_tokens=1024,
+            json_mode=True,
+            tenant_id=tenant_id
+        )
+        return _parse_json_content(content)
+    except Exception as e:
+        return _gap_error()
 
 def _get_iso_folder(control_id: str) -> str:
     """
@@ -626,7 +610,7 @@ def _get_iso_folder(control_id: str) -> str:
     if "8." in control_id: return "Annex_A/Technological"
     return "Governance/Clauses"
 
-def generate_premium_policy(control_title: str, policy_name: str, company_profile: dict, control_description: str):
+def _premium_policy_prompts(control_title: str, policy_name: str, company_profile: dict, control_description: str):
     """
     The Compliance Compiler Engine (Version 2.1).
     Now includes:
@@ -751,7 +735,14 @@ def generate_premium_policy(control_title: str, policy_name: str, company_profil
     
     (Then follow with the Content).
     """
-    
+    return system_prompt, user_message
+
+def generate_premium_policy(control_title: str, policy_name: str, company_profile: dict, control_description: str, regenerate: bool = False, tenant_id: str = "default_tenant"):
+    """
+    The Compliance Compiler Engine (Version 2.1); see _premium_policy_prompts for the prompt logic.
+    """
+    system_prompt, user_message = _premium_policy_prompts(control_title, policy_name, company_profile, control_description)
+
     try:
         if not client:
             raise ValueError("AI Client not initialized")
@@ -760,15 +751,40 @@ def generate_premium_policy(control_title: str, policy_name: str, company_profil
         return generate_ai_response(
             system_prompt=system_prompt,
             user_prompt=user_message,
-            max_tokens=3500
+            max_tokens=3500,
+            cache_purpose="generate_premium_policy",
+            regenerate=regenerate,
+            tenant_id=tenant_id
         )
 
     except Exception as e:
         print(f"Policy Compiler Error: {e}")
         return f"## Error compiling Policy\n\nReason: {str(e)}"
 
-def generate_artifact_content(control_title: str, artifact_name: str, context: str):
-    # Legacy wrapper
+async def generate_premium_policy_async(control_title: str, policy_name: str, company_profile: dict, control_description: str, regenerate: bool = False, tenant_id: str = "default_tenant"):
+    """
+    Async twin of generate_premium_policy for async handlers.
+    """
+    system_prompt, user_message = _premium_policy_prompts(control_title, policy_name, company_profile, control_description)
+
+    try:
+        if not client:
+            raise ValueError("AI Client not initialized")
+
+        return await agenerate_ai_response(
+            system_prompt=system_prompt,
+            user_prompt=user_message,
+            max_tokens=3500,
+            cache_purpose="generate_premium_policy",
+            regenerate=regenerate,
+            tenant_id=tenant_id
+        )
+
+    except Exception as e:
+        print(f"Policy Compiler Error: {e}")
+        return f"## Error compiling Policy\n\nReason: {str(e)}"
+
+def _artifact_prompts(control_title: str, artifact_name: str, context: str):
     system_prompt = "You are a Compliance Officer creating a formal document."
     user_message = f"""
     Document: "{artifact_name}"
@@ -776,79 +792,71 @@ def generate_artifact_content(control_title: str, artifact_name: str, context: s
     Context: "{context}"
     Format: Markdown.
     """
+    return system_prompt, user_message
+
+def generate_artifact_content(control_title: str, artifact_name: str, context: str, tenant_id: str = "default_tenant"):
+    # Legacy wrapper
+    system_prompt, user_message = _artifact_prompts(control_title, artifact_name, context)
     try:
         if not client: return "AI Unavailable"
         
         return generate_ai_response(
             system_prompt=system_prompt,
             user_prompt=user_message,
-            max_tokens=2000
+            max_tokens=2000,
+            tenant_id=tenant_id
         )
     except Exception as e:
         return str(e)
 
-def analyze_document_gap(control_title: str, requirements: list, file_path: str = None, is_confidential: bool = False, file_stream = None, filename: str = ""):
+async def generate_artifact_content_async(control_title: str, artifact_name: str, context: str, tenant_id: str = "default_tenant"):
     """
-    Simulates a Senior ISO 27001 Auditor Review.
-    Checks for Requirements Met and Evidence Date Currency (<12 months).
-    Supports: PDF, DOCX, and IMAGES (PNG/JPG) via Computer Vision.
-    Accepts local file_path OR in-memory file_stream (BytesIO).
+    Async twin of generate_artifact_content for async handlers.
+    """
+    system_prompt, user_message = _artifact_prompts(control_title, artifact_name, context)
+    try:
+        if not client: return "AI Unavailable"
+
+        return await agenerate_ai_response(
+            system_prompt=system_prompt,
+            user_prompt=user_message,
+            max_tokens=2000,
+            tenant_id=tenant_id
+        )
+    except Exception as e:
+        return str(e)
+
+def _document_gap_request(control_title: str, requirements: list, file_path: str = None, is_confidential: bool = False, file_stream = None, filename: str = "", extracted = None):
+    """
+    Reads the document and builds the auditor prompt.
+    Pass extracted (ExtractedDocument) to reuse text already parsed for this upload.
+    Returns (payload, None), or (None, result) when no AI call is needed.
     """
-    import pypdf
-    import docx
-    import base64
     from datetime import datetime
+    from app.services.document_extraction import extract_document
     
     current_date = datetime.now().strftime("%Y-%m-%d")
     req_list = "\n".join([f"- {r.get('name', 'Requirement')}" for r in requirements]) if requirements else "Standard ISO 27001 Requirements"
     
-    # Check File Type
-    target_name = filename if file_stream else (file_path or "")
-    ext = target_name.lower().split('.')[-1]
-    is_image = ext in ['png', 'jpg', 'jpeg']
-    
-    text_content = ""
-    image_base64 = None
-    
-    try:
-        if is_image:
-            # IMAGE HANDLING (VISION)
-            if file_stream:
-                image_base64 = base64.b64encode(file_stream.read()).decode('utf-8')
-            else:
-                with open(file_path, "rb") as image_file:
-                    image_base64 = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        elif ext == 'pdf':
-            source = file_stream if file_stream else file_path
-            reader = pypdf.PdfReader(source)
-            for page in reader.pages:
-                text_content += page.extract_text() + "\n"
-        elif ext == 'docx':
-            source = file_stream if file_stream else file_path
-            doc = docx.Document(source)
-            for para in doc.paragraphs:
-                text_content += para.text + "\n"
-        else:
-             # Assume text/md
-            if file_stream:
-                text_content = file_stream.read().decode("utf-8", errors="ignore")
-            else:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    text_content = f.read()
-                
-        if not is_image:
-             text_content = text_content[:50000] # Truncate Text
-             
-    except Exception as e:
-        print(f"Error reading file for AI analysis: {e}")
-        return {
+    if extracted is None:
+        target_name = filename if file_stream else (file_path or "")
+        # Confidential content is never cached
+        extracted = extract_document(file_stream if file_stream else file_path, target_name, cache=not is_confidential)
+
+    if extracted.error:
+        return None, {
             "status": "ERROR", 
-            "reasoning": f"Could not process file: {e}",
+            "reasoning": f"Could not process file: {extracted.error}",
             "gaps": ["File unreadable"],
              "date_check": False
         }
 
+    # Check File Type
+    ext = extracted.ext
+    is_image = extracted.is_image
+    image_base64 = extracted.image_base64
+    text_content = "" if is_image else extracted.text(50000) # Truncate Text
+
     # --- BUILD PROMPT ---
     
     privacy_instruction = ""
@@ -932,57 +940,65 @@ def analyze_document_gap(control_title: str, requirements: list, file_path: str
         }}
         """
 
+    if not client:
+         return None, { "final_verdict": "FAIL", "gaps_found": ["AI Service Unavailable"], "date_check_passed": False, "summary": "System offline." }
+
+    if PROVIDER != "openai":
+        return None, { "final_verdict": "FAIL", "gaps_found": ["Vision Not Supported on this Provider"], "date_check_passed": False }
+
+    # Multi-modal message (image parts) goes through the same gateway as text
+    payload = chat_payload(system_prompt, user_message_content, "gpt-4-turbo", 1024, 0.7, json_mode=True) # Explicitly use turbo for Vision
+    return payload, None
+
+def _parse_json_content(content: str):
+    # Clean markdown
+    if "```json" in content:
+        content = content.replace("```json", "").replace("```", "")
+    elif "```" in content:
+        content = content.replace("```", "")
+    return json.loads(content)
+
+def _document_gap_error(e: Exception):
+    print(f"AI Analysis Error: {e}")
+    return {
+         "final_verdict": "FAIL",
+         "gaps_found": [f"AI Error: {str(e)}"],
+         "date_check_passed": False,
+         "summary": "Analysis failed due to internal error."
+    }
+
+def analyze_document_gap(control_title: str, requirements: list, file_path: str = None, is_confidential: bool = False, file_stream = None, filename: str = "", tenant_id: str = "default_tenant", extracted = None):
+    """
+    Simulates a Senior ISO 27001 Auditor Review.
+    Checks for Requirements Met and Evidence Date Currency (<12 months).
+    Supports: PDF, DOCX, and IMAGES (PNG/JPG) via Computer Vision.
+    Accepts local file_path OR in-memory file_stream (BytesIO).
+    """
+    payload, early_result = _document_gap_request(control_title, requirements, file_path, is_confidential, file_stream, filename, extracted)
+    if early_result is not None:
+        return early_result
     try:
-        if not client:
-             return { "final_verdict": "FAIL", "gaps_found": ["AI Service Unavailable"], "date_check_passed": False, "summary": "System offline." }
-
-        # Helper wrapper update or direct call for Multi-modal?
-        # generate_ai_response wrapper might handle string only.
-        # We need to call client directly OR update the wrapper.
-        # Updating logic inline here for safety/speed since wrapper is simple.
-        
-        if PROVIDER == "openai":
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message_content} 
-            ]
-            response = client.chat.completions.create(
-                model="gpt-4-turbo", # Explicitly use turbo for Vision
-                messages=messages,
-                max_tokens=1024,
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
-            content = response.choices[0].message.content
-        else:
-            return { "final_verdict": "FAIL", "gaps_found": ["Vision Not Supported on this Provider"], "date_check_passed": False }
-
-        
-        # Clean markdown
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        elif "```" in content:
-            content = content.replace("```", "")
-            
-        return json.loads(content)
-        
+        return _parse_json_content(ai_gateway.chat(payload, tenant_id))
     except Exception as e:
-        print(f"AI Analysis Error: {e}")
-        return {
-             "final_verdict": "FAIL",
-             "gaps_found": [f"AI Error: {str(e)}"],
-             "date_check_passed": False,
-             "summary": "Analysis failed due to internal error."
-        }
+        return _document_gap_error(e)
 
-def detect_and_redact_pii(text_content: str, is_image: bool, file_ext: str = "txt", image_base64: str = None):
+async def analyze_document_gap_async(control_title: str, requirements: list, file_path: str = None, is_confidential: bool = False, file_stream = None, filename: str = "", tenant_id: str = "default_tenant", extracted = None):
     """
-    Scans for GDPR/PII Data.
-    Returns: { "pii_found": bool, "action": "REJECT"|"MASK"|"TAG"|"NONE", "reasoning": str, "redacted_text": str|None, "pii_locations": list }
+    Async twin of analyze_document_gap: file parsing runs in a worker thread,
+    the LLM round trip is awaited on the gateway without holding one.
     """
-    if not client:
-        return { "pii_found": False, "action": "NONE", "reasoning": "AI Unavailable" } 
+    payload, early_result = await asyncio.to_thread(
+        _document_gap_request, control_title, requirements, file_path, is_confidential, file_stream, filename, extracted
+    )
+    if early_result is not None:
+        return early_result
+    try:
+        return _parse_json_content(await ai_gateway.achat(payload, tenant_id))
+    except Exception as e:
+        return _document_gap_error(e)
 
+def _pii_request(text_content: str, is_image: bool, file_ext: str = "txt", image_base64: str = None):
+    """Builds the DPO prompt payload for detect_and_redact_pii."""
     system_prompt = "You are a GDPR Data Protection Officer."
     
     if is_image:
@@ -1042,32 +1058,61 @@ def detect_and_redact_pii(text_content: str, is_image: bool, file_ext: str = "tx
         }}
         """
 
+    # max_tokens: allow space for redacted text; temperature 0.3: strict
+    return chat_payload(system_prompt, user_message_content, "gpt-4-turbo", 2000, 0.3, json_mode=True)
+
+def _local_pii_result(text_content: str, is_image: bool):
+    """
+    Deterministic pre-scan. Returns (result, None) when the local verdict is final,
+    or (None, fallback) when the LLM must decide; fallback is used if the AI is offline.
+    """
+    if is_image or not settings.PII_LOCAL_SCAN_ENABLED:
+        return None, None # Pixels need the vision model
+    from app.services.pii_scanner import scan_text
+    scan = scan_text(text_content or "")
+    if scan.ambiguous:
+        return None, scan.to_response()
+    return scan.to_response(), None
+
+def detect_and_redact_pii(text_content: str, is_image: bool, file_ext: str = "txt", image_base64: str = None, tenant_id: str = "default_tenant"):
+    """
+    Scans for GDPR/PII Data.
+    Local regex/checksum detectors answer clear-cut cases; only ambiguous text and images reach the LLM.
+    Returns: { "pii_found": bool, "action": "REJECT"|"MASK"|"TAG"|"NONE", "reasoning": str, "redacted_text": str|None, "pii_locations": list }
+    """
+    local_result, fallback = _local_pii_result(text_content, is_image)
+    if local_result is not None:
+        return local_result
+
+    if not client:
+        return fallback or { "pii_found": False, "action": "NONE", "reasoning": "AI Unavailable" } 
+
     try:
-        # Build Messages
-        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_message_content}]
-        
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=messages,
-            max_tokens=2000, # Allow space for redacted text
-            temperature=0.3, # Strict
-            response_format={"type": "json_object"}
-        )
-        content = response.choices[0].message.content
-        
-         # Clean markdown
-        if "```json" in content:
-            content = content.replace("```json", "").replace("```", "")
-        elif "```" in content:
-            content = content.replace("```", "")
-            
-        return json.loads(content)
+        payload = _pii_request(text_content, is_image, file_ext, image_base64)
+        return _parse_json_content(ai_gateway.chat(payload, tenant_id))
         
     except Exception as e:
         print(f"PII Check Error: {e}")
-        return { "pii_found": False, "action": "NONE", "reasoning": "Error scanning for PII." }
+        return fallback or { "pii_found": False, "action": "NONE", "reasoning": "Error scanning for PII." }
+
+async def detect_and_redact_pii_async(text_content: str, is_image: bool, file_ext: str = "txt", image_base64: str = None, tenant_id: str = "default_tenant"):
+    """Async twin of detect_and_redact_pii for async upload handlers."""
+    local_result, fallback = _local_pii_result(text_content, is_image)
+    if local_result is not None:
+        return local_result
+
+    if not client:
+        return fallback or { "pii_found": False, "action": "NONE", "reasoning": "AI Unavailable" } 
+
+    try:
+        payload = _pii_request(text_content, is_image, file_ext, image_base64)
+        return _parse_json_content(await ai_gateway.achat(payload, tenant_id))
+
+    except Exception as e:
+        print(f"PII Check Error: {e}")
+        return fallback or { "pii_found": False, "action": "NONE", "reasoning": "Error scanning for PII." }
 
-def suggest_justification(title: str, control_id: str, category: str, scope: str = ""):
+def _justification_prompts(title: str, control_id: str, category: str, scope: str = ""):
     # OpenAI Prompt
     system_prompt = "You are an ISO 27001 Lead Auditor."
     
@@ -1088,6 +1133,10 @@ def suggest_justification(title: str, control_id: str, category: str, scope: str
     
     Output ONLY the justification text. START with coverage status (e.g. "Excluded: The organization..." or "Included: Mandatory...").
     """
+    return system_prompt, user_message
+
+def suggest_justification(title: str, control_id: str, category: str, scope: str = "", regenerate: bool = False, tenant_id: str = "default_tenant"):
+    system_prompt, user_message = _justification_prompts(title, control_id, category, scope)
 
     try:
         if not client:
@@ -1096,14 +1145,40 @@ def suggest_justification(title: str, control_id: str, category: str, scope: str
         content = generate_ai_response(
             system_prompt=system_prompt,
             user_prompt=user_message,
-            max_tokens=300
+            max_tokens=300,
+            cache_purpose="suggest_justification",
+            regenerate=regenerate,
+            tenant_id=tenant_id
+        )
+        return {"justification": content.strip()}
+    except Exception as e:
+        print(f"Justification Error: {e}")
+        return {"justification": "Justification generation failed. Please enter manually."}
+
+async def suggest_justification_async(title: str, control_id: str, category: str, scope: str = "", regenerate: bool = False, tenant_id: str = "default_tenant"):
+    """
+    Async twin of suggest_justification for async handlers.
+    """
+    system_prompt, user_message = _justification_prompts(title, control_id, category, scope)
+
+    try:
+        if not client:
+            raise ValueError("AI Client not initialized")
+
+        content = await agenerate_ai_response(
+            system_prompt=system_prompt,
+            user_prompt=user_message,
+            max_tokens=300,
+            cache_purpose="suggest_justification",
+            regenerate=regenerate,
+            tenant_id=tenant_id
         )
         return {"justification": content.strip()}
     except Exception as e:
         print(f"Justification Error: {e}")
         return {"justification": "Justification generation failed. Please enter manually."}
 
-def rewrite_text(text: str, instruction: str):
+def rewrite_text(text: str, instruction: str, tenant_id: str = "default_tenant"):
     """
     Rewrites text based on instruction using OpenAI.
     """
@@ -1117,7 +1192,8 @@ def rewrite_text(text: str, instruction: str):
         return generate_ai_response(
             system_prompt=system_prompt,
             user_prompt=user_message,
-            max_tokens=2048
+            max_tokens=2048,
+            tenant_id=tenant_id
         )
     except Exception as e:
         print(f"Rewrite Error: {e}")
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.ai_policy_service import DEFAULT_CLOUD_STACK
+
+# Inputs that change the generated text; two tenants with equal values share results
+PROFILE_DEFAULTS = {"company_name": "AssuRisk", "cloud_stack": DEFAULT_CLOUD_STACK, "temperature": 0.1}
+
+
+def normalize_profile(company_profile: Optional[dict]) -> dict:
+    profile = dict(PROFILE_DEFAULTS)
+    for field in PROFILE_DEFAULTS:
+        value = (company_profile or {}).get(field)
+        if value is not None:
+            profile[field] = value.strip() if isinstance(value, str) else value
+    return profile
+
+
+def profile_key(company_profile: Optional[dict]) -> str:
+    material = json.dumps(normalize_profile(company_profile), sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+class PolicyCheckpointStore:
+    """
+    One JSON file per completed policy: <root>/<profile_key>/<sha1(policy_name)>.json.
+    Written atomically, so a crash mid-write never leaves a half checkpoint.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or settings.POLICY_BATCH_CHECKPOINT_DIR
+
+    def _path(self, key: str, policy_name: str) -> str:
+        name = hashlib.sha1(policy_name.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key, f"{name}.json")
+
+    def load(self, key: str, policy_name: str) -> Optional[dict]:
+        try:
+            with open(self._path(key, policy_name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, key: str, policy_name: str, result: dict):
+        path = self._path(key, policy_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(temp_path, path)
+
+
+class BatchPolicyEngine:
+    """
+    Generates a set of policies on a bounded thread pool (the work is LLM I/O).
+
+    - Each successful policy is checkpointed; rerunning the same batch skips them.
+    - Checkpoints are keyed by the normalized company profile, so tenants with the
+      same profile reuse each other's results, and concurrent identical requests
+      in this process wait on the one in flight instead of generating twice.
+    - on_progress(dict) receives throughput and ETA after every policy.
+    """
+
+    _inflight: Dict[tuple, Future] = {}
+    _inflight_lock = threading.Lock()
+
+    def __init__(self, service=None, max_workers: int = None, checkpoints: PolicyCheckpointStore = None):
+        if service is None:
+            from app.services.ai_policy_service import PolicyGenerationService
+            service = PolicyGenerationService()
+        self.service = service
+        self.max_workers = max_workers or settings.POLICY_BATCH_MAX_WORKERS
+        self.checkpoints = checkpoints or PolicyCheckpointStore()
+
+    def _generate_one(self, key: str, profile: dict, policy_name: str, tenant_id: str):
+        """Returns (result, reused)."""
+        cached = self.checkpoints.load(key, policy_name)
+        if cached is not None:
+            return cached, True
+
+        with self._inflight_lock:
+            pending = self._inflight.get((key, policy_name))
+            owner = pending is None
+            if owner:
+                pending = self._inflight[(key, policy_name)] = Future()
+        if not owner:
+            return pending.result(), True
+
+        try:
+            result = self.service.generate_policy(
+                policy_name=policy_name,
+                company_name=profile["company_name"],
+                temperature=profile["temperature"],
+                cloud_stack=profile["cloud_stack"],
+                tenant_id=tenant_id
+            )
+            if result.get("success"):
+                self.checkpoints.save(key, policy_name, result) # Failures are retried on resume
+            pending.set_result(result)
+            return result, False
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop((key, policy_name), None)
+
+    def run(self, policy_names: List[str], company_profile: dict = None, tenant_id: str = "default_tenant",
+            on_progress: Callable[[dict], None] = None) -> dict:
+        profile = normalize_profile(company_profile)
+        key = profile_key(profile)
+        names = list(dict.fromkeys(policy_names)) # Drop duplicates, keep order
+        started = time.monotonic()
+
+        summary = {
+            "profile_key": key,
+            "company_name": profile["company_name"],
+            "total_policies": len(names),
+            "successful": 0,
+            "failed": 0,
+            "reused": 0,
+            "audit_ready": 0,
+            "needs_review": 0,
+            "policies": {}
+        }
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="policy-batch")
+        try:
+            futures = {executor.submit(self._generate_one, key, profile, name, tenant_id): name for name in names}
+            generated = 0
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    result, reused = future.result()
+                except Exception as e:
+                    result, reused = {"success": False, "policy_name": name, "error": str(e)}, False
+                summary["policies"][name] = self._record(summary, result, reused)
+                if not reused:
+                    generated += 1
+
+                if on_progress:
+                    on_progress(self._progress(summary, generated, time.monotonic() - started, name))
+        finally:
+            # If on_progress raised (e.g. job cancelled), queued policies are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        summary["duration_seconds"] = round(time.monotonic() - started, 2)
+        summary["throughput_per_minute"] = self._progress(summary, generated, summary["duration_seconds"], None)["throughput_per_minute"]
+        return summary
+
+    @staticmethod
+    def _record(summary: dict, result: dict, reused: bool) -> dict:
+        if reused:
+            summary["reused"] += 1
+        if not result.get("success"):
+            summary["failed"] += 1
+            return {"success": False, "error": result.get("error"), "reused": reused}
+
+        summary["successful"] += 1
+        coverage = result.get("intent_coverage") or {}
+        validation = result.get("validation") or {}
+        audit_ready = bool(coverage.get("audit_ready")) and bool(validation.get("valid"))
+        summary["audit_ready" if audit_ready else "needs_review"] += 1
+        return {
+            "success": True,
+            "reused": reused,
+            "audit_ready": audit_ready,
+            "word_count": (result.get("metadata") or {}).get("word_count"),
+            "coverage": coverage.get("coverage_percentage"),
+            "content": result.get("content"),
+            "metadata": result.get("metadata")
+        }
+
+    @staticmethod
+    def _progress(summary: dict, generated: int, elapsed: float, last_policy: Optional[str]) -> dict:
+        done = summary["successful"] + summary["failed"]
+        remaining = summary["total_policies"] - done
+        # Reused checkpoints are near-free, so rate is measured on generated policies only
+        rate = generated / elapsed if elapsed > 0 and generated else 0.0
+        return {
+            "completed": done,
+            "total": summary["total_policies"],
+            "failed": summary["failed"],
+            "reused": summary["reused"],
+            "last_policy": last_policy,
+            "elapsed_seconds": round(elapsed, 1),
+            "throughput_per_minute": round(rate * 60, 2),
+            "eta_seconds": round(remaining / rate, 1) if rate else None
+        }
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Optional
+
+from sqlalchemy import select, func, text, update, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.evidence import Evidence
+from app.models.evidence_blob import EvidenceBlob
+
+CHUNK_SIZE = 1024 * 1024 # 1 MiB; bounds memory regardless of file size
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    sha256: str
+    size: int
+    storage_path: str
+    deduplicated: bool # True if the content was already stored
+
+
+class LocalBlobBackend:
+    """
+    Filesystem backend: <root>/<sha[:2]>/<sha[2:4]>/<sha><ext>.
+    Writes land in <root>/tmp first and are moved into place atomically.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, sha256: str, ext: str = "") -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}{ext}")
+
+    def write_stream(self, source: BinaryIO):
+        """Streams source to a temp file, hashing as it goes. Returns (sha256, size, temp_path)."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir, prefix=f"{uuid.uuid4().hex}_")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            self.discard(temp_path)
+            raise
+        return digest.hexdigest(), size, temp_path
+
+    def promote(self, temp_path: str, final_path: str):
+        os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
+        try:
+            os.replace(temp_path, final_path)
+        except OSError:
+            shutil.move(temp_path, final_path) # Different filesystem
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def discard(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class BlobStore:
+    """
+    Content-addressed evidence storage. One physical copy per SHA-256;
+    Evidence rows reference it through file_path / content_hash.
+    """
+
+    def __init__(self, backend: LocalBlobBackend):
+        self.backend = backend
+
+    def put_stream(self, db: Session, source: BinaryIO, filename: str = "") -> StoredBlob:
+        """
+        Stores an upload stream (hash computed while streaming). If the digest is
+        already known the temp copy is dropped and the existing blob is returned.
+        The blob row is flushed, not committed; the caller's commit covers it.
+        """
+        sha256, size, temp_path = self.backend.write_stream(source)
+
+        existing = db.get(EvidenceBlob, sha256)
+        if existing is not None:
+            if self.backend.exists(existing.storage_path):
+                self.backend.discard(temp_path)
+            else:
+                # Row survived but the file didn't (manual cleanup); restore it
+                self.backend.promote(temp_path, existing.storage_path)
+            existing.last_referenced_at = datetime.now(timezone.utc)
+            return StoredBlob(sha256, existing.size, existing.storage_path, True)
+
+        ext = os.path.splitext(filename or "")[1].lower()
+        storage_path = self.backend.path_for(sha256, ext)
+        if self.backend.exists(storage_path):
+            self.backend.discard(temp_path)
+        else:
+            self.backend.promote(temp_path, storage_path)
+
+        try:
+            with db.begin_nested():
+                db.add(EvidenceBlob(sha256=sha256, storage_path=storage_path, size=size))
+        except IntegrityError:
+            # Concurrent upload of the same content won the insert
+            winner = db.get(EvidenceBlob, sha256)
+            return StoredBlob(sha256, winner.size, winner.storage_path, True)
+        return StoredBlob(sha256, size, storage_path, False)
+
+    def refresh_ref_counts(self, db: Session):
+        """Recounts Evidence references for every blob in one grouped statement."""
+        counts = (
+            select(Evidence.file_path, func.count(Evidence.id).label("refs"))
+            .group_by(Evidence.file_path)
+            .subquery()
+        )
+        db.execute(
+            update(EvidenceBlob).values(
+                ref_count=func.coalesce(
+                    select(counts.c.refs).where(counts.c.file_path == EvidenceBlob.storage_path).scalar_subquery(),
+                    0
+                )
+            )
+        )
+        db.flush()
+
+    def collect_garbage(self, db: Session, grace_seconds: Optional[int] = None) -> int:
+        """
+        Deletes blobs no Evidence row references. Blobs younger than the grace
+        period are kept so uploads between put_stream() and their Evidence commit
+        aren't collected. Returns the number of blobs removed.
+        """
+        grace = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        self.refresh_ref_counts(db)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace)
+
+        orphans = [
+            blob for blob in db.query(EvidenceBlob).filter(EvidenceBlob.ref_count == 0).all()
+            if _as_utc(blob.last_referenced_at) is None or _as_utc(blob.last_referenced_at) <= cutoff
+        ]
+        for blob in orphans:
+            self.backend.discard(blob.storage_path)
+            db.delete(blob)
+        db.commit()
+        if orphans:
+            print(f"[BlobStore] Collected {len(orphans)} unreferenced blobs.")
+        return len(orphans)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc) # SQLite drops tzinfo
+
+
+def ensure_blob_schema(engine):
+    """Adds evidence.content_hash to databases created before the blob store."""
+    columns = {c["name"] for c in sa_inspect(engine).get_columns("evidence")}
+    if "content_hash" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE evidence ADD COLUMN content_hash VARCHAR(64)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_evidence_content_hash ON evidence (content_hash)"))
+        print("[BlobStore] Added evidence.content_hash column.")
+
+
+blob_store = BlobStore(LocalBlobBackend(settings.BLOB_STORE_DIR))
@@ -5,6 +5,7 @@ from fastapi import BackgroundTasks
 from app.models.universal_intent import UniversalIntent, IntentStatus
 from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
 from app.models.compliance_result import ComplianceResult
+import app.services.compliance_rollup  # noqa: F401  (keeps compliance_rollups in sync on write)
 from app.models.control import Control
 from app.models.policy import Policy
 
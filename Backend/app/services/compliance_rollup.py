@@ -0,0 +1,189 @@
+from sqlalchemy import event, select, delete, insert, func, case, false
+from sqlalchemy.orm import Session
+from sqlalchemy import inspect as sa_inspect
+from typing import Iterable, Optional, Set, Tuple
+
+from app.models.compliance_result import ComplianceResult
+from app.models.compliance_rollup import ComplianceRollup
+from app.models.control import Control, ControlStatus
+
+UNCATEGORIZED = "Uncategorized"
+
+# Control attributes that move results between rollup keys or change their counters
+_CONTROL_TRACKED_ATTRS = ("status", "is_applicable", "domain", "framework_id", "control_id")
+_RESULT_TRACKED_ATTRS = ("status", "tenant_id", "control_id")
+
+RollupKey = Tuple[str, int, str] # (tenant_id, framework_id, domain)
+
+
+def domain_label(domain: Optional[str]) -> str:
+    return domain if domain else UNCATEGORIZED
+
+
+def _domain_expr():
+    return func.coalesce(func.nullif(Control.domain, ""), UNCATEGORIZED)
+
+
+def _aggregate_select():
+    results = ComplianceResult.__table__
+    controls = Control.__table__
+    return select(
+        results.c.tenant_id,
+        controls.c.framework_id,
+        _domain_expr().label("domain"),
+        func.count(results.c.id).label("total_count"),
+        func.sum(case((results.c.status == "PASS", 1), else_=0)).label("pass_count"),
+        func.sum(case((results.c.status == "FAIL", 1), else_=0)).label("fail_count"),
+        func.sum(case((controls.c.status == ControlStatus.IMPLEMENTED.value, 1), else_=0)).label("implemented_count"),
+        func.sum(case((controls.c.is_applicable == false(), 1), else_=0)).label("not_applicable_count"),
+    ).select_from(
+        results.join(controls, results.c.control_id == controls.c.control_id)
+    ).group_by(results.c.tenant_id, controls.c.framework_id, _domain_expr())
+
+
+def _row_values(row) -> dict:
+    return {
+        "tenant_id": row.tenant_id,
+        "framework_id": row.framework_id,
+        "domain": row.domain,
+        "total_count": row.total_count or 0,
+        "pass_count": int(row.pass_count or 0),
+        "fail_count": int(row.fail_count or 0),
+        "implemented_count": int(row.implemented_count or 0),
+        "not_applicable_count": int(row.not_applicable_count or 0),
+    }
+
+
+def recompute_keys(connection, keys: Iterable[RollupKey]):
+    """Re-derive the rollup rows for the given keys only (O(results in those keys))."""
+    rollups = ComplianceRollup.__table__
+    for tenant_id, framework_id, domain in set(keys):
+        if tenant_id is None or framework_id is None:
+            continue
+        row = connection.execute(
+            _aggregate_select().where(
+                ComplianceResult.__table__.c.tenant_id == tenant_id,
+                Control.__table__.c.framework_id == framework_id,
+                _domain_expr() == domain
+            )
+        ).first()
+
+        connection.execute(delete(rollups).where(
+            rollups.c.tenant_id == tenant_id,
+            rollups.c.framework_id == framework_id,
+            rollups.c.domain == domain
+        ))
+        if row is not None and row.total_count:
+            connection.execute(insert(rollups).values(**_row_values(row)))
+
+
+def rebuild_compliance_rollup(db: Session, tenant_id: Optional[str] = None):
+    """
+    Full rebuild from source tables. Needed after raw SQL / bulk writes that
+    bypass ORM events, and once to backfill existing data.
+    """
+    rollups = ComplianceRollup.__table__
+    stmt = _aggregate_select()
+    purge = delete(rollups)
+    if tenant_id is not None:
+        stmt = stmt.where(ComplianceResult.__table__.c.tenant_id == tenant_id)
+        purge = purge.where(rollups.c.tenant_id == tenant_id)
+
+    rows = [_row_values(r) for r in db.execute(stmt)]
+    db.execute(purge)
+    if rows:
+        db.execute(insert(rollups), rows)
+    db.commit()
+    return len(rows)
+
+
+def ensure_rollup_backfilled(db: Session):
+    """Backfill on first run: rollup empty but results exist."""
+    has_rollup = db.query(ComplianceRollup.id).first() is not None
+    if has_rollup:
+        return 0
+    has_results = db.query(ComplianceResult.id).first() is not None
+    if not has_results:
+        return 0
+    return rebuild_compliance_rollup(db)
+
+
+# --- INCREMENTAL MAINTENANCE (ORM events) ---
+
+def _values(obj, attr) -> list:
+    """Current value plus any pre-flush value(s) of an attribute."""
+    state = sa_inspect(obj)
+    hist = state.attrs[attr].history
+    values = list(hist.added) + list(hist.unchanged) + list(hist.deleted)
+    if not values:
+        values = [getattr(obj, attr, None)]
+    return values
+
+
+def _has_changes(obj, attrs) -> bool:
+    state = sa_inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+def _collect_affected_keys(session: Session) -> Set[RollupKey]:
+    result_pairs = set() # (tenant_id, control_id)
+    control_keys = set() # (control_id, framework_id, domain) incl. old values
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, ComplianceResult):
+            if obj in session.dirty and not _has_changes(obj, _RESULT_TRACKED_ATTRS):
+                continue
+            for tenant_id in _values(obj, "tenant_id"):
+                for control_id in _values(obj, "control_id"):
+                    result_pairs.add((tenant_id, str(control_id) if control_id is not None else None))
+        elif isinstance(obj, Control):
+            if obj in session.dirty and not _has_changes(obj, _CONTROL_TRACKED_ATTRS):
+                continue
+            for control_id in _values(obj, "control_id"):
+                for framework_id in _values(obj, "framework_id"):
+                    for domain in _values(obj, "domain"):
+                        control_keys.add((control_id, framework_id, domain_label(domain)))
+
+    if not result_pairs and not control_keys:
+        return set()
+
+    connection = session.connection()
+    keys = set()
+
+    # Results: resolve control_id -> (framework, domain) in one query
+    if result_pairs:
+        control_ids = {cid for _, cid in result_pairs if cid}
+        located = {}
+        if control_ids:
+            for control_id, framework_id, domain in connection.execute(
+                select(Control.__table__.c.control_id, Control.__table__.c.framework_id, _domain_expr())
+                .where(Control.__table__.c.control_id.in_(control_ids))
+            ):
+                located[control_id] = (framework_id, domain)
+        for tenant_id, control_id in result_pairs:
+            if control_id in located:
+                keys.add((tenant_id, *located[control_id]))
+
+    # Controls: every tenant holding results for the control, old and new keys
+    if control_keys:
+        control_ids = {cid for cid, _, _ in control_keys if cid}
+        tenants_by_control = {}
+        if control_ids:
+            for tenant_id, control_id in connection.execute(
+                select(ComplianceResult.__table__.c.tenant_id, ComplianceResult.__table__.c.control_id)
+                .where(ComplianceResult.__table__.c.control_id.in_(control_ids))
+                .distinct()
+            ):
+                tenants_by_control.setdefault(control_id, set()).add(tenant_id)
+        for control_id, framework_id, domain in control_keys:
+            for tenant_id in tenants_by_control.get(control_id, ()):
+                keys.add((tenant_id, framework_id, domain))
+
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_compliance_rollup(session, flush_context):
+    keys = _collect_affected_keys(session)
+    if keys:
+        recompute_keys(session.connection(), keys)
@@ -1,17 +1,77 @@
 
 import os
 import json
+import threading
+import weakref
+from collections import Counter
 from enum import Enum
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 from app.database import SessionLocal
 from app.models.evidence import Evidence
 from app.models.control import Control
+from app.models.control_mapping import ControlMapping
+from app.utils.table_version import TableVersion
+
+INHERITED_SEPARATOR = "_INHERITED_"
 
 class AuditMode(str, Enum):
     SIMULATION = "SIMULATION"
     AWS_LIVE = "AWS_LIVE"
     HYBRID = "HYBRID"
 
+class EvidenceView:
+    """
+    One derived audit evidence list plus lookups by evidence ID, by control and status counters.
+    Built once per source version (mock file stamp + control tables version) and shared by all
+    adapters; status reviews are written through instead of forcing a rebuild.
+    """
+
+    def __init__(self, items: List[Dict], key, pinned: Optional[Set[str]] = None):
+        self.items = items
+        self.key = key
+        self.pinned = pinned or set() # Items forced to NOT_APPLICABLE by the SOA; reviews don't change them
+        self.by_id: Dict[str, Dict] = {}
+        self.by_control: Dict[str, List[Dict]] = {}
+        self.by_source: Dict[str, List[Dict]] = {} # Stored evidence ID -> it and its inherited copies
+        self.status_counts = Counter()
+        for item in items:
+            item_id = item.get("id")
+            self.by_id.setdefault(item_id, item) # First wins, like the old linear scan
+            self.by_control.setdefault(item.get("control_id"), []).append(item)
+            self.by_source.setdefault(str(item_id).split(INHERITED_SEPARATOR)[0], []).append(item)
+            self.status_counts[item.get("status")] += 1
+
+    def apply_review(self, real_id: str, status: str, comment: Optional[str]):
+        for item in self.by_source.get(real_id, []):
+            if item.get("id") not in self.pinned:
+                self.status_counts[item.get("status")] -= 1
+                item["status"] = status
+                self.status_counts[status] += 1
+            if comment:
+                item["auditor_comment"] = comment
+            item["updated_at"] = "NOW"
+
+
+_views = weakref.WeakKeyDictionary() # engine -> {(mode, mock_file): EvidenceView}
+_views_lock = threading.Lock()
+
+source_version = TableVersion("evidence_view") # Bumped when controls or control mappings change
+source_version.watch(Control)
+source_version.watch(ControlMapping)
+
+
+def invalidate_evidence_view(*_args, **_kwargs):
+    source_version.bump()
+
+
+def _file_stamp(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 class DataSourceAdapter:
     def __init__(self):
         # self.mode = os.getenv("AUDIT_MODE", AuditMode.SIMULATION)
@@ -24,18 +84,46 @@ class DataSourceAdapter:
         Fetch all evidence based on current audit mode.
         """
         print(f"[DEBUG] get_all_evidence called. Mode: {self.mode}")
-        if self.mode == AuditMode.SIMULATION:
-            return self._load_mock_data(db)
-        else:
-            # Fallback to DB if live or hybrid
-            return self._load_from_db(db)
+        return list(self.get_view(db).items)
 
     def get_evidence_by_id(self, db: SessionLocal, evidence_id: str) -> Optional[Dict]:
-        all_data = self.get_all_evidence(db)
-        for item in all_data:
-            if item.get("id") == evidence_id:
-                return item
-        return None
+        return self.get_view(db).by_id.get(evidence_id)
+
+    def get_evidence_for_control(self, db: SessionLocal, control_id: str) -> List[Dict]:
+        return list(self.get_view(db).by_control.get(control_id, []))
+
+    def get_status_counts(self, db: SessionLocal) -> Counter:
+        return Counter(self.get_view(db).status_counts)
+
+    def get_view(self, db: SessionLocal) -> EvidenceView:
+        """Cached view for the current mode; rebuilt when the mock file or the control tables change."""
+        views = self._views_for(db)
+        key = self._source_key()
+        view = views.get((self.mode, self.mock_file))
+        if view is not None and view.key == key:
+            return view
+        with _views_lock:
+            view = views.get((self.mode, self.mock_file))
+            if view is None or view.key != key:
+                if self.mode == AuditMode.SIMULATION:
+                    items, pinned = self._build_mock_items(db)
+                else:
+                    # Fallback to DB if live or hybrid
+                    items, pinned = self._load_from_db(db), set()
+                view = EvidenceView(items, key, pinned)
+                views[(self.mode, self.mock_file)] = view
+        return view
+
+    def _views_for(self, db: SessionLocal) -> Dict:
+        engine = db.get_bind().engine
+        with _views_lock:
+            return _views.setdefault(engine, {})
+
+    def _source_key(self):
+        # Taken before loading: a change during the build leaves the view stale rather than hiding it
+        if self.mode == AuditMode.SIMULATION:
+            return (source_version.value, _file_stamp(self.mock_file))
+        return (source_version.value,)
 
     def update_evidence_status(self, evidence_id: str, status: str, comment: str = None) -> bool:
         """
@@ -48,8 +136,13 @@ class DataSourceAdapter:
             return False
 
     def _load_mock_data(self, db: SessionLocal) -> List[Dict]:
+        return self._build_mock_items(db)[0]
+
+    def _build_mock_items(self, db: SessionLocal) -> Tuple[List[Dict], Set[str]]:
+        """Expanded evidence list plus the IDs the SOA forced to NOT_APPLICABLE."""
+        pinned = set()
         if not os.path.exists(self.mock_file):
-            return []
+            return [], pinned
             
         # 1. Load Mock Evidence
         with open(self.mock_file, "r") as f:
@@ -61,6 +154,7 @@ class DataSourceAdapter:
         # 2. Fetch Live SOA Status from DB
         # db passed in argument
         soa_map = {}
+        controls = []
         try:
             from app.models.control import Control
             # This query uses the passed DB session which should have RLS or be filtered
@@ -77,30 +171,19 @@ class DataSourceAdapter:
             # No db.close() here, managed by caller
 
         # 3. Evidence Inheritance Logic (Intent-Based for NIST)
+        # ControlMapping edges come from the shared crosswalk graph; only controls visible
+        # to this session (step 2) take part, as before.
         inheritance_map = {} 
+        id_to_code = {c.id: c.control_id for c in controls}
+        code_to_details = {c.control_id: {"title": c.title, "description": c.description} for c in controls}
         try:
-            from app.models.control_mapping import ControlMapping
-            from app.models.control import Control
-            
-            # Use Control Mapping (Global? or Tenant?)
-            # Assuming ControlMapping is consistent or tenant-scoped
-            all_mappings = db.query(ControlMapping).all()
-            
-            # Re-query controls list if needed or reuse
-            # Using query again to be safe with session state?
-            all_controls_list = db.query(Control).all()
-            id_to_code = {c.id: c.control_id for c in all_controls_list}
-            
-            code_to_details = {c.control_id: {"title": c.title, "description": c.description} for c in all_controls_list}
+            from app.services.intent_index import get_intent_index
+            graph = get_intent_index(db)
 
-            for m in all_mappings:
-                if m.source_control_id in id_to_code and m.target_control_id in id_to_code:
-                    source_code = id_to_code[m.source_control_id]
-                    target_code = id_to_code[m.target_control_id]
-                    
-                    if source_code not in inheritance_map:
-                        inheritance_map[source_code] = []
-                    inheritance_map[source_code].append(target_code)
+            for source_id, source_code in id_to_code.items():
+                for target_id in graph.mapping_targets_of(source_id):
+                    if target_id in id_to_code:
+                        inheritance_map.setdefault(source_code, []).append(id_to_code[target_id])
         except Exception as e:
             print(f"Warning: Failed to fetch mappings: {e}")
 
@@ -118,6 +201,7 @@ class DataSourceAdapter:
                 
                 if soa_data["is_applicable"] is False:
                      item["status"] = "NOT_APPLICABLE"
+                     pinned.add(item.get("id"))
                      
             expanded_evidence.append(item)
             
@@ -130,6 +214,8 @@ class DataSourceAdapter:
                     virtual_item["original_control_id"] = cid 
                     virtual_item["id"] = f"{item['id']}_INHERITED_{target_code}"
                     virtual_item["source_control"] = cid 
+                    if item.get("id") in pinned:
+                        pinned.add(virtual_item["id"])
                     
                     if target_code in code_to_details:
                         virtual_item["control_name"] = code_to_details[target_code]["title"]
@@ -143,6 +229,7 @@ class DataSourceAdapter:
                          
                          if soa_data["is_applicable"] is False:
                              virtual_item["status"] = "NOT_APPLICABLE"
+                             pinned.add(virtual_item["id"])
                     
                     expanded_evidence.append(virtual_item)
 
@@ -150,10 +237,6 @@ class DataSourceAdapter:
         existing_ids = set(e.get("control_id") for e in expanded_evidence)
         import re
         
-        # Safe access to code_to_details if step 3 failed? 
-        if 'code_to_details' not in locals():
-            code_to_details = {}
-
         for cid, details in code_to_details.items():
             is_iso = re.match(r'^(\d|A\.)', cid)
             
@@ -179,7 +262,7 @@ class DataSourceAdapter:
                     })
 
         print(f"[DEBUG] Returning {len(expanded_evidence)} expanded items.")
-        return expanded_evidence
+        return expanded_evidence, pinned
 
     def _update_mock_data(self, evidence_id: str, status: str, comment: str) -> bool:
         # No DB change needed for mock update
@@ -189,12 +272,13 @@ class DataSourceAdapter:
          if not os.path.exists(self.mock_file):
             return False
             
+         read_stamp = _file_stamp(self.mock_file)
          with open(self.mock_file, "r") as f:
             data = json.load(f)
          # ... existing update logic ...
          items = data.get("current_evidence", [])
          updated = False
-         real_id = evidence_id.split("_INHERITED_")[0]
+         real_id = evidence_id.split(INHERITED_SEPARATOR)[0]
          for item in items:
             if item.get("id") == real_id:
                 item["status"] = status
@@ -203,8 +287,16 @@ class DataSourceAdapter:
                 updated = True
                 break
          if updated:
-            with open(self.mock_file, "w") as f:
-                json.dump(data, f, indent=2)
+            with _views_lock:
+                with open(self.mock_file, "w") as f:
+                    json.dump(data, f, indent=2)
+                # Write-through: patch cached views and re-stamp them with the file we just wrote
+                stamp = _file_stamp(self.mock_file)
+                for views in list(_views.values()):
+                    view = views.get((AuditMode.SIMULATION, self.mock_file))
+                    if view is not None and view.key[1] == read_stamp: # Otherwise the file changed under it: rebuild
+                        view.apply_review(real_id, status, comment)
+                        view.key = (view.key[0], stamp)
          return updated
 
     def _load_from_db(self, db: SessionLocal) -> List[Dict]:
@@ -0,0 +1,289 @@
+"""
+Extract-once document text pipeline.
+
+Uploaded PDFs / DOCX / text files are parsed a single time per content hash.
+The result keeps pages separate (with a page map) and joins them only up to the
+length a caller asks for. Results are cached in memory (LRU by characters) and
+on disk next to the blob store (LRU by bytes), so re-reviews and worker processes reuse them.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Iterator, List, Optional
+
+from app.config import settings
+
+IMAGE_EXTS = {"png", "jpg", "jpeg"}
+DOCX_PAGE_CHARS = 3000 # DOCX has no pages; paragraphs are grouped into blocks of about this size
+EXTRACTOR_VERSION = 1 # Bump to invalidate cached extractions when parsing changes
+TEMP_FILE_GRACE_SECONDS = 3600 # Older .tmp files are abandoned writes
+
+
+@dataclass
+class ExtractedDocument:
+    content_hash: str
+    ext: str
+    pages: List[str] = field(default_factory=list)
+    image_base64: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def is_image(self) -> bool:
+        return self.ext in IMAGE_EXTS
+
+    @property
+    def char_count(self) -> int:
+        return sum(len(p) for p in self.pages)
+
+    @property
+    def page_map(self) -> List[dict]:
+        """[{page, start, length}] offsets into text() for citing where findings came from."""
+        entries = []
+        offset = 0
+        for number, page in enumerate(self.pages, 1):
+            entries.append({"page": number, "start": offset, "length": len(page)})
+            offset += len(page)
+        return entries
+
+    def text(self, limit: Optional[int] = None) -> str:
+        """Joined text, truncated lazily: pages past the limit are never concatenated."""
+        if limit is None:
+            return "".join(self.pages)
+        parts = []
+        remaining = limit
+        for page in self.pages:
+            if remaining <= 0:
+                break
+            parts.append(page[:remaining])
+            remaining -= len(parts[-1])
+        return "".join(parts)
+
+
+def _iter_pages(source, ext: str) -> Iterator[str]:
+    if ext == "pdf":
+        import pypdf
+        for page in pypdf.PdfReader(source).pages:
+            yield (page.extract_text() or "") + "\n"
+    elif ext == "docx":
+        import docx
+        block = []
+        size = 0
+        for para in docx.Document(source).paragraphs:
+            block.append(para.text + "\n")
+            size += len(block[-1])
+            if size >= DOCX_PAGE_CHARS:
+                yield "".join(block)
+                block, size = [], 0
+        if block:
+            yield "".join(block)
+    else:
+        # Assume text/md
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8", errors="ignore") as f:
+                yield f.read()
+        else:
+            yield source.read().decode("utf-8", errors="ignore")
+
+
+def _extract(source, ext: str, content_hash: str) -> ExtractedDocument:
+    doc = ExtractedDocument(content_hash=content_hash, ext=ext)
+    try:
+        if ext in IMAGE_EXTS:
+            if isinstance(source, str):
+                with open(source, "rb") as f:
+                    doc.image_base64 = base64.b64encode(f.read()).decode("utf-8")
+            else:
+                doc.image_base64 = base64.b64encode(source.read()).decode("utf-8")
+        else:
+            doc.pages = list(_iter_pages(source, ext))
+    except Exception as e:
+        print(f"Error extracting document text: {e}")
+        doc.error = str(e)
+    return doc
+
+
+def _hash_source(source) -> str:
+    digest = hashlib.sha256()
+    handle = open(source, "rb") if isinstance(source, str) else source
+    try:
+        while True:
+            chunk = handle.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    finally:
+        if isinstance(source, str):
+            handle.close()
+        else:
+            source.seek(0)
+    return digest.hexdigest()
+
+
+class DocumentTextCache:
+    """
+    Two tiers keyed by (sha256, ext): in-process LRU bounded by characters, then JSON on disk
+    bounded by bytes (file mtime is the recency; disk hits touch it).
+    """
+
+    def __init__(self, root: str = None, max_chars: int = None, max_disk_bytes: int = None):
+        self.root = root or settings.DOCUMENT_TEXT_CACHE_DIR
+        self.max_chars = settings.DOCUMENT_TEXT_CACHE_MAX_CHARS if max_chars is None else max_chars
+        self.max_disk_bytes = settings.DOCUMENT_TEXT_CACHE_MAX_DISK_BYTES if max_disk_bytes is None else max_disk_bytes
+        self._entries: "OrderedDict[str, ExtractedDocument]" = OrderedDict()
+        self._chars = 0
+        self._disk_bytes = None # Unknown until the first prune() scans the directory
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(content_hash: str, ext: str) -> str:
+        return f"{content_hash}.{ext}.v{EXTRACTOR_VERSION}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def _size(self, doc: ExtractedDocument) -> int:
+        return doc.char_count + len(doc.image_base64 or "")
+
+    def _remember(self, key: str, doc: ExtractedDocument):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = doc
+            self._chars += self._size(doc)
+            while self._chars > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= self._size(evicted)
+
+    def get(self, content_hash: str, ext: str) -> Optional[ExtractedDocument]:
+        key = self._key(content_hash, ext)
+        with self._lock:
+            doc = self._entries.get(key)
+            if doc is not None:
+                self._entries.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+                return doc
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                doc = ExtractedDocument(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            self.metrics["misses"] += 1
+            return None
+        self.metrics["disk_hits"] += 1
+        try:
+            os.utime(path) # Recently used: pruned last
+        except OSError:
+            pass
+        self._remember(key, doc)
+        return doc
+
+    def put(self, doc: ExtractedDocument):
+        if doc.error or doc.is_image:
+            return # Don't pin a transient parse failure; images need no parsing
+        key = self._key(doc.content_hash, doc.ext)
+        self._remember(key, doc)
+        path = self._path(key)
+        payload = json.dumps(asdict(doc)).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"[DocumentText] Could not persist extraction {key}: {e}")
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(payload)
+            over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Trims the disk tier to max_disk_bytes, least recently used first. Extractions from
+        older EXTRACTOR_VERSIONs and abandoned temp files are always removed.
+        Returns the number of files deleted.
+        """
+        if not self._prune_lock.acquire(blocking=False):
+            return 0 # Another thread is already pruning
+        try:
+            current_suffix = f".v{EXTRACTOR_VERSION}.json"
+            temp_cutoff = time.time() - TEMP_FILE_GRACE_SECONDS
+            kept, removed = [], 0
+            for dirpath, _, names in os.walk(self.root):
+                for name in names:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                        if name.endswith(".tmp"):
+                            if stat.st_mtime < temp_cutoff:
+                                os.remove(path)
+                                removed += 1
+                        elif not name.endswith(current_suffix):
+                            os.remove(path)
+                            removed += 1
+                        else:
+                            kept.append((stat.st_mtime, stat.st_size, path))
+                    except OSError:
+                        continue
+
+            total = sum(size for _, size, _ in kept)
+            kept.sort()
+            for _, size, path in kept:
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+            with self._lock:
+                self._disk_bytes = total
+            if removed:
+                print(f"[DocumentText] Pruned {removed} cached extractions ({total} bytes kept).")
+            return removed
+        finally:
+            self._prune_lock.release()
+
+
+def extract_document(source, filename: str, content_hash: str = None, cache: bool = True, store: bool = True) -> ExtractedDocument:
+    """
+    source: file path or seekable binary stream (rewound after use).
+    cache=False for confidential uploads: nothing is kept in memory or written to disk.
+    store=False reuses a cached extraction but leaves storing a new one to the caller
+    (document_text_cache.put), e.g. until a PII verdict says the text may be kept.
+    """
+    ext = (filename or (source if isinstance(source, str) else "")).lower().split(".")[-1]
+    if content_hash is None:
+        content_hash = _hash_source(source) if cache else ""
+
+    if cache:
+        cached = document_text_cache.get(content_hash, ext)
+        if cached is not None:
+            return cached
+
+    if not isinstance(source, str):
+        source.seek(0)
+    doc = _extract(source, ext, content_hash)
+    if not isinstance(source, str):
+        source.seek(0)
+
+    if cache and store:
+        document_text_cache.put(doc)
+    return doc
+
+
+document_text_cache = DocumentTextCache()
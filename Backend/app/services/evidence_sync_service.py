@@ -1,10 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, insert, literal, union_all, and_, exists
+from typing import Iterable, List, Tuple
 from app.models.evidence import Evidence
 from app.models.control import Control
 from app.models.universal_intent import UniversalIntent
 from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
 from app.models.framework import Framework
-import copy
+
+# Max (evidence, intent) pairs per resolution statement; keeps the literal union bounded
+SYNC_CHUNK_SIZE = 500
+
 
 def sync_evidence_by_intent(db: Session, evidence_id: int, master_intent_id: str):
     """
@@ -12,94 +17,150 @@ def sync_evidence_by_intent(db: Session, evidence_id: int, master_intent_id: str
     Finds all controls linked to the given intent_id and propagates the evidence to them.
     """
     print(f"[Evidence Gravity] Syncing Evidence {evidence_id} for Intent '{master_intent_id}'...")
-    
-    # 1. Get Source Evidence
-    source_evidence = db.query(Evidence).filter(Evidence.id == evidence_id).first()
-    if not source_evidence:
-        print(f"[Evidence Gravity] Evidence {evidence_id} not found.")
-        return
-
-    # 2. Get/Validate Universal Intent
-    intent = db.query(UniversalIntent).filter(UniversalIntent.intent_id == master_intent_id).first()
-    if not intent:
-        print(f"[Evidence Gravity] UniversalIntent '{master_intent_id}' not found. Creating placeholder...")
-        # Auto-create intent to allow system to learn
-        intent = UniversalIntent(
-            intent_id=master_intent_id,
-            description=f"Auto-generated intent for {master_intent_id}",
+    return sync_evidence_bulk(db, [(evidence_id, master_intent_id)])
+
+
+def sync_intents_bulk(db: Session, master_intent_ids: Iterable[str], commit: bool = True):
+    """
+    Backfill helper: propagate every evidence item already tagged with one of the
+    given intents to all crosswalk-linked controls, in one transaction.
+    """
+    intent_keys = list(set(master_intent_ids))
+    if not intent_keys:
+        return 0
+    rows = db.query(Evidence.id, Evidence.master_intent_id).filter(
+        Evidence.master_intent_id.in_(intent_keys)
+    ).all()
+    return sync_evidence_bulk(db, [(eid, key) for eid, key in rows], commit=commit)
+
+
+def sync_evidence_bulk(db: Session, items: Iterable[Tuple[int, str]], commit: bool = True):
+    """
+    Set-based Evidence Gravity for many (evidence_id, master_intent_id) pairs.
+
+    Constant number of statements regardless of fan-out:
+    1. Load source evidence rows
+    2. Resolve / auto-create UniversalIntents
+    3. One join (pairs -> intent -> crosswalk -> framework -> control) with an
+       anti-join against existing clones (same control, filename, intent)
+    4. Bulk insert the missing clones
+    Returns the number of evidence rows created.
+    """
+    pairs = list(dict.fromkeys((int(eid), key) for eid, key in items if eid is not None and key))
+    if not pairs:
+        return 0
+
+    # 1. Source Evidence
+    evidence_ids = {eid for eid, _ in pairs}
+    sources = {ev.id: ev for ev in db.query(Evidence).filter(Evidence.id.in_(evidence_ids)).all()}
+    missing = evidence_ids - sources.keys()
+    if missing:
+        print(f"[Evidence Gravity] Evidence {sorted(missing)} not found.")
+    pairs = [(eid, key) for eid, key in pairs if eid in sources]
+    if not pairs:
+        return 0
+
+    # 2. Get/Validate Universal Intents (auto-create to allow system to learn)
+    intent_keys = {key for _, key in pairs}
+    known = {i.intent_id for i in db.query(UniversalIntent.intent_id).filter(UniversalIntent.intent_id.in_(intent_keys)).all()}
+    new_intents = [
+        UniversalIntent(
+            intent_id=key,
+            description=f"Auto-generated intent for {key}",
             category="General"
         )
-        db.add(intent)
-        db.flush() 
-
-    # 3. Find Crosswalk Mappings
-    # (In a real scenario, this relies on seeded Crosswalk data. 
-    # For now, we look for CROSSWALKS that match this intent.)
-    
-    # OPTIMIZATION: If no crosswalks exist yet, we can't sync.
-    # But we can try to find controls that *should* be mapped if we had logic.
-    # For this implementation, we rely on `IntentFrameworkCrosswalk`.
-    
-    mappings = db.query(IntentFrameworkCrosswalk).filter(IntentFrameworkCrosswalk.intent_id == intent.id).all()
-    
-    targets_orphaned = 0
-    targets_synced = 0
-    
-    found_controls = []
-    
-    # Resolve Mappings to Controls
-    for mapping in mappings:
-        # Find Framework ID
-        fw = db.query(Framework).filter(Framework.code == mapping.framework_id).first()
-        if not fw:
-            continue
-            
-        # Find Control
-        target_ctrl = db.query(Control).filter(
-            Control.control_id == mapping.control_reference,
-            Control.framework_id == fw.id
-        ).first()
-        
-        if target_ctrl:
-            found_controls.append(target_ctrl)
-    
-    # 4. Propagate Evidence (Clone)
-    for ctrl in found_controls:
-        if ctrl.id == source_evidence.control_id:
-            continue # Skip self validation
-            
-        # Check if already exists linked to this control (avoid dupes)
-        existing = db.query(Evidence).filter(
-            Evidence.control_id == ctrl.id,
-            Evidence.filename == source_evidence.filename,
-            Evidence.master_intent_id == master_intent_id
-        ).first()
-        
-        if existing:
-            print(f" -> Skipping {ctrl.control_id} (Evidence already exists)")
-            continue
-            
-        # CLONE
-        new_evidence = Evidence(
-            filename=source_evidence.filename,
-            file_path=source_evidence.file_path,
-            file_size=source_evidence.file_size,
-            file_type=source_evidence.file_type,
-            tenant_id=source_evidence.tenant_id,
-            title=source_evidence.title,
-            description=source_evidence.description,
-            control_id=ctrl.id,
-            uploaded_by=source_evidence.uploaded_by,
-            collection_date=source_evidence.collection_date,
-            tags=source_evidence.tags,
-            status=source_evidence.status,
-            validation_source="automated_gravity",
-            master_intent_id=master_intent_id
-        )
-        db.add(new_evidence)
-        targets_synced += 1
-        print(f" -> Synced to {ctrl.control_id} ({ctrl.framework.code})")
+        for key in sorted(intent_keys - known)
+    ]
+    if new_intents:
+        print(f"[Evidence Gravity] UniversalIntents {[i.intent_id for i in new_intents]} not found. Creating placeholders...")
+        db.add_all(new_intents)
+        db.flush()
+
+    # 3. Resolve targets + anti-join existing clones
+    targets = []
+    for start in range(0, len(pairs), SYNC_CHUNK_SIZE):
+        targets.extend(_resolve_missing_targets(db, pairs[start:start + SYNC_CHUNK_SIZE]))
+
+    # 4. Bulk insert clones
+    seen = set()
+    rows = []
+    for evidence_id, intent_key, target_control_id, target_ref, framework_code in targets:
+        source = sources[evidence_id]
+        dedupe_key = (target_control_id, source.filename, intent_key)
+        if dedupe_key in seen:
+            continue # Same control reached via several crosswalk rows / items
+        seen.add(dedupe_key)
+        rows.append({
+            "filename": source.filename,
+            "file_path": source.file_path,
+            "file_size": source.file_size,
+            "file_type": source.file_type,
+            "content_hash": source.content_hash,
+            "tenant_id": source.tenant_id,
+            "title": source.title,
+            "description": source.description,
+            "control_id": target_control_id,
+            "uploaded_by": source.uploaded_by,
+            "collection_date": source.collection_date,
+            "tags": source.tags,
+            "status": source.status,
+            "validation_source": "automated_gravity",
+            "master_intent_id": intent_key,
+        })
+        print(f" -> Synced to {target_ref} ({framework_code})")
+
+    if rows:
+        db.execute(insert(Evidence), rows)
+
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    print(f"[Evidence Gravity] Sync Complete. Propagated {len(rows)} clones for {len(pairs)} evidence/intent pairs.")
+    return len(rows)
+
 
-    db.commit()
-    print(f"[Evidence Gravity] Sync Complete. Propagated to {targets_synced} controls.")
+def _resolve_missing_targets(db: Session, pairs: List[Tuple[int, str]]):
+    """
+    Returns (evidence_id, intent_key, control.id, control.control_id, framework.code)
+    for every crosswalk-linked control that doesn't already hold a clone.
+    """
+    pair_rows = union_all(*[
+        select(literal(eid).label("evidence_id"), literal(key).label("intent_key"))
+        for eid, key in pairs
+    ]).subquery("pairs")
+
+    source = aliased(Evidence)
+    existing = aliased(Evidence)
+
+    already_cloned = exists().where(
+        existing.control_id == Control.id,
+        existing.filename == source.filename,
+        existing.master_intent_id == pair_rows.c.intent_key
+    )
+
+    stmt = select(
+        pair_rows.c.evidence_id,
+        pair_rows.c.intent_key,
+        Control.id,
+        Control.control_id,
+        Framework.code
+    ).select_from(pair_rows).join(
+        source, source.id == pair_rows.c.evidence_id
+    ).join(
+        UniversalIntent, UniversalIntent.intent_id == pair_rows.c.intent_key
+    ).join(
+        IntentFrameworkCrosswalk, IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
+    ).join(
+        Framework, Framework.code == IntentFrameworkCrosswalk.framework_id
+    ).join(
+        Control, and_(
+            Control.control_id == IntentFrameworkCrosswalk.control_reference,
+            Control.framework_id == Framework.id
+        )
+    ).where(
+        Control.id != source.control_id, # Skip self
+        ~already_cloned
+    ).order_by(pair_rows.c.evidence_id, Control.id)
 
+    return db.execute(stmt).all()
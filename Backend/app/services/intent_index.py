@@ -0,0 +1,195 @@
+import threading
+import weakref
+from typing import Dict, FrozenSet, List, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.models.control import Control
+from app.models.control_mapping import ControlMapping
+from app.models.universal_intent import UniversalIntent
+from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
+from app.utils.table_version import TableVersion
+
+EMPTY: FrozenSet = frozenset()
+
+
+class IntentControlIndex:
+    """
+    Cross-framework crosswalk graph: intents <-> control references <-> controls <-> ControlMapping edges.
+
+    Sources:
+    - ACTIONABLE_TITLES: control reference -> actionable title (the upload "intent")
+    - IntentFrameworkCrosswalk: UniversalIntent -> control references
+    - Control: control PK <-> control reference
+    - ControlMapping: control PK -> control PK edges
+    All lookups, including transitive closure, are dict hits; the snapshot is immutable
+    once built and carries the mapping-table version it was built from.
+    """
+
+    def __init__(self, title_to_refs, ref_to_title, intent_to_refs, ref_to_intents, mapped_ids,
+                 intent_categories=None, control_refs=None, mapping_targets=None, version=0):
+        self.title_to_refs: Dict[str, FrozenSet[str]] = title_to_refs
+        self.ref_to_title: Dict[str, str] = ref_to_title
+        self.intent_to_refs: Dict[str, FrozenSet[str]] = intent_to_refs
+        self.ref_to_intents: Dict[str, FrozenSet[str]] = ref_to_intents
+        self.mapped_ids: Dict[int, FrozenSet[int]] = mapped_ids
+        self.intent_categories: Dict[str, str] = intent_categories or {}
+        self.control_refs: Dict[int, str] = control_refs or {}
+        self.mapping_targets: Dict[int, Tuple[int, ...]] = mapping_targets or {}
+        self.version = version
+
+        ref_to_ids: Dict[str, Set[int]] = {}
+        for control_pk, ref in self.control_refs.items():
+            ref_to_ids.setdefault(ref, set()).add(control_pk)
+        self.ref_to_ids: Dict[str, FrozenSet[int]] = {k: frozenset(v) for k, v in ref_to_ids.items()}
+        self.components: Dict[int, FrozenSet[int]] = self._connected_components()
+
+    def _connected_components(self) -> Dict[int, FrozenSet[int]]:
+        """Union-find over controls sharing an intent (via their reference) or a ControlMapping edge."""
+        parent: Dict[int, int] = {}
+
+        def find(node):
+            root = parent.setdefault(node, node)
+            while root != parent[root]:
+                root = parent[root]
+            while node != root: # Path compression
+                parent[node], node = root, parent[node]
+            return root
+
+        def union(first, others):
+            root = find(first)
+            for other in others:
+                other_root = find(other)
+                if other_root != root:
+                    parent[other_root] = root
+
+        for refs in self.intent_to_refs.values():
+            ids = [pk for ref in refs for pk in self.ref_to_ids.get(ref, EMPTY)]
+            if ids:
+                union(ids[0], ids[1:])
+        for source_id, targets in self.mapped_ids.items():
+            union(source_id, targets)
+
+        members: Dict[int, Set[int]] = {}
+        for node in parent:
+            members.setdefault(find(node), set()).add(node)
+        components = {}
+        for group in members.values():
+            if len(group) > 1:
+                frozen = frozenset(group)
+                for node in group:
+                    components[node] = frozen
+        return components
+
+    @classmethod
+    def build(cls, db: Session, version: int = 0) -> "IntentControlIndex":
+        from app.api.processes import ACTIONABLE_TITLES
+
+        title_to_refs: Dict[str, Set[str]] = {}
+        for ref, title in ACTIONABLE_TITLES.items():
+            title_to_refs.setdefault(title, set()).add(ref)
+
+        intent_to_refs: Dict[str, Set[str]] = {}
+        ref_to_intents: Dict[str, Set[str]] = {}
+        intent_categories: Dict[str, str] = {}
+        crosswalk_rows = db.query(
+            UniversalIntent.intent_id, UniversalIntent.category, IntentFrameworkCrosswalk.control_reference
+        ).join(
+            IntentFrameworkCrosswalk, IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
+        ).all()
+        for intent_key, category, ref in crosswalk_rows:
+            intent_to_refs.setdefault(intent_key, set()).add(ref)
+            ref_to_intents.setdefault(ref, set()).add(intent_key)
+            intent_categories[intent_key] = category
+
+        mapped_ids: Dict[int, Set[int]] = {}
+        mapping_targets: Dict[int, List[int]] = {}
+        mapping_rows = db.query(ControlMapping.source_control_id, ControlMapping.target_control_id).order_by(ControlMapping.id)
+        for source_id, target_id in mapping_rows.all():
+            mapped_ids.setdefault(source_id, set()).add(target_id)
+            mapped_ids.setdefault(target_id, set()).add(source_id)
+            mapping_targets.setdefault(source_id, []).append(target_id)
+
+        control_refs = dict(db.query(Control.id, Control.control_id).all())
+
+        return cls(
+            title_to_refs={k: frozenset(v) for k, v in title_to_refs.items()},
+            ref_to_title=dict(ACTIONABLE_TITLES),
+            intent_to_refs={k: frozenset(v) for k, v in intent_to_refs.items()},
+            ref_to_intents={k: frozenset(v) for k, v in ref_to_intents.items()},
+            mapped_ids={k: frozenset(v) for k, v in mapped_ids.items()},
+            intent_categories=intent_categories,
+            control_refs=control_refs,
+            mapping_targets={k: tuple(v) for k, v in mapping_targets.items()},
+            version=version,
+        )
+
+    def refs_for_title(self, actionable_title: str) -> FrozenSet[str]:
+        """Control references sharing an actionable title (reverse of ACTIONABLE_TITLES)."""
+        return self.title_to_refs.get(actionable_title, EMPTY)
+
+    def linked_refs(self, control_ref: str) -> Set[str]:
+        """Control references sharing an actionable title or a UniversalIntent with control_ref."""
+        linked = set()
+        title = self.ref_to_title.get(control_ref)
+        if title is not None:
+            linked |= self.title_to_refs.get(title, EMPTY)
+        for intent_key in self.ref_to_intents.get(control_ref, EMPTY):
+            linked |= self.intent_to_refs.get(intent_key, EMPTY)
+        linked.discard(control_ref)
+        return linked
+
+    def mapped_control_ids(self, control_pk: int) -> FrozenSet[int]:
+        """Control PKs linked through ControlMapping (either direction)."""
+        return self.mapped_ids.get(control_pk, EMPTY)
+
+    def mapping_targets_of(self, control_pk: int) -> Tuple[int, ...]:
+        """Control PKs this control maps to (ControlMapping source -> target, in row order)."""
+        return self.mapping_targets.get(control_pk, ())
+
+    def shared_intent_controls(self, control_ref: str) -> List[Tuple[str, int]]:
+        """(intent_key, control PK) for controls whose reference shares a UniversalIntent with control_ref."""
+        pairs = []
+        for intent_key in self.ref_to_intents.get(control_ref, EMPTY):
+            for ref in self.intent_to_refs.get(intent_key, EMPTY):
+                if ref != control_ref:
+                    pairs.extend((intent_key, control_pk) for control_pk in self.ref_to_ids.get(ref, EMPTY))
+        return pairs
+
+    def closure(self, control_pk: int) -> FrozenSet[int]:
+        """Every control PK transitively reachable through shared intents or ControlMapping edges (includes control_pk)."""
+        return self.components.get(control_pk) or frozenset((control_pk,))
+
+
+_snapshots = weakref.WeakKeyDictionary() # engine -> IntentControlIndex
+_lock = threading.Lock()
+
+# Bumped whenever a mapping table changes; snapshots carry the version they were built at.
+# Intent status changes are frequent and irrelevant here; crosswalk rows carry the links.
+# Controls only matter for their reference, intents for their category.
+mapping_version = TableVersion("intent_index")
+mapping_version.watch(ControlMapping)
+mapping_version.watch(IntentFrameworkCrosswalk)
+mapping_version.watch(Control, "control_id")
+mapping_version.watch(UniversalIntent, "category", events=("after_update",))
+
+
+def get_intent_index(db: Session) -> IntentControlIndex:
+    """
+    Returns the shared snapshot for db's engine, rebuilding it if mapping tables changed since
+    it was built. A rebuild is swapped in whole, so readers never see a half-built graph.
+    """
+    engine = db.get_bind().engine
+    snapshot = _snapshots.get(engine)
+    if snapshot is not None and snapshot.version == mapping_version.value:
+        return snapshot
+    with _lock:
+        snapshot = _snapshots.get(engine)
+        if snapshot is None or snapshot.version != mapping_version.value:
+            version = mapping_version.value # Changes during the build leave this snapshot stale
+            snapshot = IntentControlIndex.build(db, version=version)
+            _snapshots[engine] = snapshot
+    return snapshot
+
+
+def invalidate_intent_index(*_args, **_kwargs):
+    mapping_version.bump()
@@ -0,0 +1,119 @@
+"""
+Background job handlers. Each handler receives (ctx: JobContext, payload: dict)
+and returns a JSON-serialisable result stored on the Job row.
+Imported lazily by the job queue (API process on enqueue, workers on start).
+"""
+import asyncio
+
+from fastapi import HTTPException
+
+from app.services.job_queue import job_cleanup, job_handler, NonRetryableJobError, PartialJobError
+import app.services.search_index  # noqa: F401  (keeps the search index in sync on write)
+
+
+@job_handler("policy.generate")
+def generate_policy_job(ctx, payload: dict):
+    from app.services.ai_policy_service import PolicyGenerationService
+
+    ctx.progress(0.1, f"Generating {payload['policy_name']}")
+    result = PolicyGenerationService().generate_policy(
+        policy_name=payload["policy_name"],
+        company_name=payload.get("company_name", "AssuRisk"),
+        temperature=payload.get("temperature", 0.1),
+        tenant_id=ctx.tenant_id
+    )
+    if not result.get("success"):
+        raise RuntimeError(result.get("error") or "Policy generation failed")
+    return result
+
+
+@job_handler("policy.generate_batch")
+def generate_policy_batch_job(ctx, payload: dict):
+    from app.services.batch_policy_engine import BatchPolicyEngine
+
+    def report(progress):
+        eta = f", ETA {progress['eta_seconds']:.0f}s" if progress["eta_seconds"] is not None else ""
+        ctx.progress(
+            progress["completed"] / max(progress["total"], 1),
+            f"{progress['completed']}/{progress['total']} policies "
+            f"({progress['throughput_per_minute']}/min{eta})"
+        )
+
+    summary = BatchPolicyEngine().run(
+        payload.get("policy_names", []),
+        company_profile=payload,
+        tenant_id=ctx.tenant_id,
+        on_progress=report
+    )
+    if summary["failed"]:
+        # Retryable: completed policies are checkpointed, so the retry only regenerates the failures.
+        # The summary is kept on the job so the jobs API still shows what succeeded.
+        failed = [name for name, result in summary["policies"].items() if not result["success"]]
+        raise PartialJobError(f"{len(failed)} of {summary['total_policies']} policies failed: {', '.join(failed)}", summary)
+    return summary
+
+
+@job_handler("gap_analysis.control")
+def gap_analysis_job(ctx, payload: dict):
+    from app.api.requirements import gap_analysis_for_control
+
+    ctx.progress(0.1, f"Analysing {payload['control_id']}")
+    db = ctx.session_factory()
+    try:
+        return gap_analysis_for_control(db, payload["control_id"], ctx.tenant_id or "default_tenant")
+    except HTTPException as e:
+        raise NonRetryableJobError(e.detail)
+    finally:
+        db.close()
+
+
+@job_handler("document.review_revision")
+def review_revision_job(ctx, payload: dict):
+    from app.api.documents import _review_revision
+    from app.services.blob_store import blob_store
+
+    spool_path = payload["spool_path"]
+    if not blob_store.backend.exists(spool_path):
+        raise NonRetryableJobError("Uploaded file is no longer available")
+
+    ctx.progress(0.1, "Scanning for PII and analysing gaps")
+    file_stream = open(spool_path, "rb")
+    try:
+        result = asyncio.run(_review_revision(
+            file_stream,
+            spool_path,
+            payload["file_hash"],
+            payload["filename"],
+            payload["control_id"],
+            payload.get("user_id", "unknown"),
+            False,
+            ctx.tenant_id
+        ))
+    except HTTPException as e:
+        # PII rejection etc. - retrying gives the same answer
+        raise NonRetryableJobError(e.detail)
+    finally:
+        file_stream.close()
+    return result
+
+
+@job_cleanup("document.review_revision")
+def discard_review_upload(payload: dict):
+    # Final failure or cancellation: the spooled upload was never promoted
+    from app.services.blob_store import blob_store
+
+    if payload.get("spool_path"):
+        blob_store.backend.discard(payload["spool_path"])
+
+
+@job_handler("report.auditor_pack")
+def auditor_pack_job(ctx, payload: dict):
+    from report_generator import ComplianceReporter
+
+    ctx.progress(0.1, "Building auditor pack")
+    reporter = ComplianceReporter(tenant_id=ctx.tenant_id, shared_tenant_id=payload.get("shared_tenant_id"))
+    try:
+        path, filename = reporter.generate_auditor_pack()
+    finally:
+        reporter.close()
+    return {"path": path, "filename": filename, "media_type": "application/zip"}
@@ -0,0 +1,404 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus, TERMINAL_JOB_STATUSES
+
+STALE_SWEEP_INTERVAL_SECONDS = 60
+
+# job_type -> handler(ctx: JobContext, payload: dict) -> JSON-serialisable result
+JOB_HANDLERS: Dict[str, Callable] = {}
+# job_type -> cleanup(payload: dict), run once a job ends without succeeding
+JOB_CLEANUPS: Dict[str, Callable] = {}
+
+
+def job_handler(job_type: str):
+    """Registers a handler for a job type. Handlers live in app.services.job_handlers."""
+    def decorator(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+
+def job_cleanup(job_type: str):
+    """
+    Registers a hook that releases what a job's payload holds (e.g. a spooled upload) once
+    the job fails for good or is cancelled. Successful handlers clean up after themselves.
+    """
+    def decorator(fn):
+        JOB_CLEANUPS[job_type] = fn
+        return fn
+    return decorator
+
+
+def _run_cleanup(job_type: str, payload: Optional[dict]):
+    if job_type not in JOB_HANDLERS:
+        _load_handlers()
+    cleanup = JOB_CLEANUPS.get(job_type)
+    if cleanup is None:
+        return
+    try:
+        cleanup(dict(payload or {}))
+    except Exception as e:
+        print(f"[JobQueue] Cleanup failed for {job_type}: {e}")
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler (via ctx.progress / ctx.check_cancelled) once cancellation is requested."""
+
+
+class NonRetryableJobError(Exception):
+    """Handler failure that retrying cannot fix (bad input, rejected upload)."""
+
+
+class PartialJobError(Exception):
+    """Retryable failure that still produced a result worth showing; stored on Job.result either way."""
+
+    def __init__(self, message: str, result):
+        super().__init__(message)
+        self.result = result
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cooperative cancellation."""
+
+    def __init__(self, job_id: str, tenant_id: str, session_factory=SessionLocal):
+        self.job_id = job_id
+        self.tenant_id = tenant_id
+        self.session_factory = session_factory
+
+    def progress(self, fraction: float, message: str = None):
+        """Records progress (0.0 - 1.0) and heartbeat; raises JobCancelled if cancel was requested."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(Job).where(Job.id == self.job_id).values(
+                    progress=max(0.0, min(1.0, fraction)),
+                    progress_message=message,
+                    heartbeat_at=datetime.utcnow()
+                )
+            )
+            db.commit()
+            cancelled = db.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+        finally:
+            db.close()
+        if cancelled:
+            raise JobCancelled()
+
+    def check_cancelled(self):
+        db = self.session_factory()
+        try:
+            cancelled = db.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+        finally:
+            db.close()
+        if cancelled:
+            raise JobCancelled()
+
+
+# --- Producer side ---
+
+def enqueue(db: Session, job_type: str, payload: dict, tenant_id: str, created_by: str = None,
+            max_attempts: int = 3, retry_backoff_seconds: int = 30) -> Job:
+    if job_type not in JOB_HANDLERS:
+        _load_handlers()
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    job = Job(
+        job_type=job_type,
+        payload=payload,
+        tenant_id=tenant_id,
+        created_by=created_by,
+        max_attempts=max_attempts,
+        retry_backoff_seconds=retry_backoff_seconds,
+        next_run_at=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    print(f"[JobQueue] Enqueued {job.job_type} job {job.id} for tenant {tenant_id}")
+    return job
+
+
+def cancel_job(db: Session, job: Job) -> Job:
+    """Queued jobs are cancelled immediately; running ones at their next progress checkpoint."""
+    cancelled = job.status == JobStatus.QUEUED.value
+    if cancelled:
+        job.status = JobStatus.CANCELLED.value
+        job.finished_at = datetime.utcnow()
+    elif job.status == JobStatus.RUNNING.value:
+        job.cancel_requested = True
+    db.commit()
+    db.refresh(job)
+    if cancelled:
+        _run_cleanup(job.job_type, job.payload)
+    return job
+
+
+# --- Consumer side ---
+
+def claim_jobs(db: Session, worker_id: str, limit: int, tenant_cap: int = None) -> List[str]:
+    """
+    Atomically claims up to `limit` due jobs, oldest first, without exceeding
+    `tenant_cap` running jobs per tenant. Returns the claimed job ids.
+    """
+    if limit <= 0:
+        return []
+    tenant_cap = tenant_cap or settings.JOB_TENANT_CONCURRENCY
+    now = datetime.utcnow()
+
+    running = dict(db.execute(
+        select(Job.tenant_id, func.count(Job.id))
+        .where(Job.status == JobStatus.RUNNING.value)
+        .group_by(Job.tenant_id)
+    ).all())
+
+    candidates = db.execute(
+        select(Job.id, Job.tenant_id)
+        .where(Job.status == JobStatus.QUEUED.value, Job.next_run_at <= now)
+        .order_by(Job.next_run_at, Job.created_at)
+        .limit(limit * 10)
+    ).all()
+
+    claimed = []
+    for job_id, tenant_id in candidates:
+        if len(claimed) >= limit:
+            break
+        if running.get(tenant_id, 0) >= tenant_cap:
+            continue
+        # Compare-and-set: another dispatcher may have taken it
+        rowcount = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+            .values(
+                status=JobStatus.RUNNING.value,
+                locked_by=worker_id,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=Job.attempts + 1
+            )
+        ).rowcount
+        if rowcount == 1:
+            claimed.append(job_id)
+            running[tenant_id] = running.get(tenant_id, 0) + 1
+    db.commit()
+    return claimed
+
+
+def requeue_stale_jobs(db: Session, stale_seconds: int = None) -> int:
+    """
+    Running jobs whose worker stopped heartbeating (crash / restart) go back to the queue.
+    Jobs that already used all their attempts fail instead, so a job that keeps killing its
+    worker (OOM, parser segfault) isn't claimed forever. Returns the number requeued.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=stale_seconds or settings.JOB_STALE_SECONDS)
+    stale = (Job.status == JobStatus.RUNNING.value, Job.heartbeat_at < cutoff)
+    exhausted = db.execute(
+        select(Job.id, Job.job_type, Job.payload).where(*stale, Job.attempts >= Job.max_attempts)
+    ).all()
+    failed = db.execute(
+        update(Job)
+        .where(*stale, Job.id.in_([row.id for row in exhausted]))
+        .values(status=JobStatus.FAILED.value, locked_by=None, finished_at=now,
+                error="Worker stopped responding on the final attempt")
+    ).rowcount if exhausted else 0
+    requeued = db.execute(
+        update(Job)
+        .where(*stale)
+        .values(status=JobStatus.QUEUED.value, locked_by=None, next_run_at=now)
+    ).rowcount
+    db.commit()
+    for row in exhausted:
+        _run_cleanup(row.job_type, row.payload)
+    if failed:
+        print(f"[JobQueue] Failed {failed} stale running jobs with no attempts left.")
+    if requeued:
+        print(f"[JobQueue] Requeued {requeued} stale running jobs.")
+    return requeued
+
+
+def _load_handlers():
+    import app.services.job_handlers  # noqa: F401  (registers JOB_HANDLERS)
+
+
+def _heartbeat_loop(job_id: str, session_factory, stop: threading.Event):
+    # Keeps long handler calls (one big LLM request) from looking stale to requeue_stale_jobs
+    interval = max(1.0, settings.JOB_STALE_SECONDS / 4)
+    while not stop.wait(interval):
+        db = session_factory()
+        try:
+            db.execute(update(Job).where(Job.id == job_id).values(heartbeat_at=datetime.utcnow()))
+            db.commit()
+        except Exception as e:
+            print(f"[JobQueue] Heartbeat failed for {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def run_job(job_id: str, session_factory=SessionLocal) -> str:
+    """
+    Executes one claimed job to completion and records the outcome.
+    Returns the final status. Safe to call in a worker process or inline.
+    """
+    _load_handlers()
+    db = session_factory()
+    try:
+        job = db.get(Job, job_id)
+        if job is None or job.status != JobStatus.RUNNING.value:
+            return job.status if job else "missing"
+        job_type = job.job_type
+        handler = JOB_HANDLERS.get(job_type)
+        ctx = JobContext(job.id, job.tenant_id, session_factory)
+        payload = dict(job.payload or {})
+        db.commit() # Release the read transaction while the handler runs
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat_loop, args=(job_id, session_factory, stop_heartbeat), daemon=True)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise NonRetryableJobError(f"No handler registered for {job_type}")
+            ctx.check_cancelled()
+            result = handler(ctx, payload)
+            outcome = {"status": JobStatus.SUCCEEDED.value, "result": result, "progress": 1.0, "error": None}
+        except JobCancelled:
+            outcome = {"status": JobStatus.CANCELLED.value, "error": "Cancelled by user"}
+        except NonRetryableJobError as e:
+            outcome = {"status": JobStatus.FAILED.value, "error": str(e)}
+        except Exception as e:
+            print(f"[JobQueue] Job {job_id} failed: {e}\n{traceback.format_exc()}")
+            outcome = {"status": JobStatus.FAILED.value, "error": str(e)}
+            job = db.get(Job, job_id)
+            if job.attempts < job.max_attempts and not job.cancel_requested:
+                delay = job.retry_backoff_seconds * (2 ** (job.attempts - 1))
+                outcome = {
+                    "status": JobStatus.QUEUED.value,
+                    "error": f"Attempt {job.attempts} failed: {e}",
+                    "next_run_at": datetime.utcnow() + timedelta(seconds=delay),
+                    "locked_by": None,
+                }
+            if isinstance(e, PartialJobError):
+                outcome["result"] = e.result
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join(timeout=5)
+
+        if outcome["status"] in TERMINAL_JOB_STATUSES:
+            outcome["finished_at"] = datetime.utcnow()
+        db.execute(update(Job).where(Job.id == job_id).values(**outcome))
+        db.commit()
+        if outcome["status"] in (JobStatus.FAILED.value, JobStatus.CANCELLED.value):
+            _run_cleanup(job_type, payload)
+        return outcome["status"]
+    finally:
+        db.close()
+
+
+def _worker_init():
+    # Spawned worker: fresh interpreter, fresh engine pool, handlers registered once
+    _load_handlers()
+
+
+class JobWorkerPool:
+    """
+    Dispatcher thread + worker pool. The dispatcher claims due jobs from the DB
+    (respecting per-tenant caps) and hands job ids to worker processes.
+    """
+
+    def __init__(self, max_workers: int = None, use_processes: bool = True, poll_interval: float = None,
+                 session_factory=SessionLocal):
+        self.max_workers = max_workers or settings.JOB_WORKER_PROCESSES
+        self.use_processes = use_processes
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL_SECONDS
+        self.session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.use_processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job-worker")
+        db = self.session_factory()
+        try:
+            requeue_stale_jobs(db)
+        finally:
+            db.close()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self._thread.start()
+        print(f"[JobQueue] Started {self.max_workers} {'process' if self.use_processes else 'thread'} workers ({self.worker_id}).")
+
+    def stop(self, wait: bool = False):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def _done(self, future):
+        with self._lock:
+            self._inflight -= 1
+        error = future.exception()
+        if error is not None:
+            print(f"[JobQueue] Worker crashed: {error}")
+
+    def _dispatch_loop(self):
+        last_reap = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_reap >= STALE_SWEEP_INTERVAL_SECONDS:
+                    last_reap = time.monotonic()
+                    db = self.session_factory()
+                    try:
+                        requeue_stale_jobs(db)
+                    finally:
+                        db.close()
+                with self._lock:
+                    free = self.max_workers - self._inflight
+                claimed = []
+                if free > 0:
+                    db = self.session_factory()
+                    try:
+                        claimed = claim_jobs(db, self.worker_id, free)
+                    finally:
+                        db.close()
+                for job_id in claimed:
+                    with self._lock:
+                        self._inflight += 1
+                    if self.use_processes:
+                        future = self._executor.submit(run_job, job_id)
+                    else:
+                        future = self._executor.submit(run_job, job_id, self.session_factory)
+                    future.add_done_callback(self._done)
+                if claimed:
+                    continue # More work may be waiting
+            except Exception as e:
+                print(f"[JobQueue] Dispatcher error: {e}")
+            self._stop.wait(self.poll_interval)
+
+
+job_workers = JobWorkerPool()
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.llm_cache_entry import LLMCacheEntry
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc) # SQLite drops tzinfo
+
+
+class LLMResponseCache:
+    """
+    DB-backed cache in front of the AI gateway.
+    Key: SHA-256 of model, messages and generation parameters (the full request body).
+    Entries expire after a TTL; beyond max_entries the least recently used are evicted.
+    """
+
+    def __init__(self, session_factory=None, ttl_seconds: int = None, max_entries: int = None):
+        self.session_factory = session_factory or SessionLocal
+        self.ttl_seconds = settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def fingerprint(payload: dict) -> str:
+        material = {k: v for k, v in payload.items() if v is not None}
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _count(self, metric: str, n: int = 1):
+        with self._lock:
+            self.metrics[metric] += n
+
+    def get(self, payload: dict) -> Optional[str]:
+        key = self.fingerprint(payload)
+        db = self.session_factory()
+        try:
+            entry = db.get(LLMCacheEntry, key)
+            if entry is None or (entry.expires_at is not None and _as_utc(entry.expires_at) <= _now()):
+                self._count("misses")
+                return None
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_accessed_at = _now()
+            content = entry.content
+            db.commit()
+            self._count("hits")
+            return content
+        finally:
+            db.close()
+
+    def put(self, payload: dict, content: str, purpose: str = None, tenant_id: str = None):
+        key = self.fingerprint(payload)
+        now = _now()
+        db = self.session_factory()
+        try:
+            entry = db.get(LLMCacheEntry, key)
+            if entry is None:
+                entry = LLMCacheEntry(fingerprint=key)
+                db.add(entry)
+            entry.content = content
+            entry.model = payload.get("model")
+            entry.purpose = purpose
+            entry.created_by_tenant = tenant_id
+            entry.prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+            entry.hit_count = 0
+            entry.created_at = now
+            entry.last_accessed_at = now
+            entry.expires_at = now + timedelta(seconds=self.ttl_seconds) if self.ttl_seconds else None
+            db.flush()
+            self._evict(db)
+            db.commit()
+            self._count("stores")
+        finally:
+            db.close()
+
+    def _evict(self, db):
+        # 1. Expired entries
+        expired = db.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.expires_at.isnot(None), LLMCacheEntry.expires_at <= _now())
+        ).rowcount or 0
+        # 2. LRU overflow
+        overflow = 0
+        if self.max_entries:
+            total = db.scalar(select(func.count()).select_from(LLMCacheEntry))
+            if total > self.max_entries:
+                stale_keys = select(LLMCacheEntry.fingerprint).order_by(
+                    LLMCacheEntry.last_accessed_at.asc()
+                ).limit(total - self.max_entries).scalar_subquery()
+                overflow = db.execute(
+                    delete(LLMCacheEntry).where(LLMCacheEntry.fingerprint.in_(stale_keys))
+                ).rowcount or 0
+        if expired or overflow:
+            self._count("evictions", expired + overflow)
+
+    def stats(self) -> dict:
+        db = self.session_factory()
+        try:
+            entries = db.scalar(select(func.count()).select_from(LLMCacheEntry))
+            by_purpose = dict(db.execute(
+                select(LLMCacheEntry.purpose, func.sum(LLMCacheEntry.hit_count)).group_by(LLMCacheEntry.purpose)
+            ).all())
+        finally:
+            db.close()
+        with self._lock:
+            metrics = dict(self.metrics)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_ratio"] = round(metrics["hits"] / lookups, 3) if lookups else 0.0
+        metrics["entries"] = entries
+        metrics["stored_hits_by_purpose"] = {k or "unknown": int(v or 0) for k, v in by_purpose.items()}
+        return metrics
+
+
+def _is_valid_json_reply(content: str) -> bool:
+    cleaned = content.replace("```json", "").replace("```", "")
+    try:
+        json.loads(cleaned)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def _lookup(payload: dict, purpose: str, regenerate: bool) -> Optional[str]:
+    if regenerate:
+        llm_cache._count("bypassed")
+        return None
+    try:
+        cached = llm_cache.get(payload)
+    except Exception as e:
+        print(f"[LLM Cache] Lookup failed, calling model: {e}")
+        return None
+    if cached is not None:
+        print(f"[LLM Cache] HIT ({purpose})")
+    return cached
+
+
+def _store(payload: dict, content: str, purpose: str, tenant_id: str):
+    # JSON-mode replies are only worth keeping if they parse
+    if payload.get("response_format") and not _is_valid_json_reply(content):
+        return
+    try:
+        llm_cache.put(payload, content, purpose=purpose, tenant_id=tenant_id)
+    except Exception as e:
+        print(f"[LLM Cache] Store failed: {e}")
+
+
+def cached_chat(payload: dict, purpose: str, tenant_id: str = "default_tenant", regenerate: bool = False) -> str:
+    """
+    Cache-first chat completion through the AI gateway.
+    regenerate=True skips the lookup but still refreshes the stored entry.
+    """
+    from app.services.ai_gateway import ai_gateway
+
+    if not settings.LLM_CACHE_ENABLED:
+        return ai_gateway.chat(payload, tenant_id)
+
+    cached = _lookup(payload, purpose, regenerate)
+    if cached is not None:
+        return cached
+    content = ai_gateway.chat(payload, tenant_id)
+    _store(payload, content, purpose, tenant_id)
+    return content
+
+
+async def acached_chat(payload: dict, purpose: str, tenant_id: str = "default_tenant", regenerate: bool = False) -> str:
+    """Async twin of cached_chat: cache reads/writes run in a worker thread, the model call is awaited."""
+    from app.services.ai_gateway import ai_gateway
+
+    if not settings.LLM_CACHE_ENABLED:
+        return await ai_gateway.achat(payload, tenant_id)
+
+    cached = await asyncio.to_thread(_lookup, payload, purpose, regenerate)
+    if cached is not None:
+        return cached
+    content = await ai_gateway.achat(payload, tenant_id)
+    await asyncio.to_thread(_store, payload, content, purpose, tenant_id)
+    return content
+
+
+llm_cache = LLMResponseCache()
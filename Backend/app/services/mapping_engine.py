@@ -1,9 +1,80 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import update
 from app.database import SessionLocal
 from app.models.requirement import RequirementMaster, RequirementStatus
 from app.models.policy import Policy
-from sqlalchemy import or_
+from app.utils.aho_corasick import AhoCorasick
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
 import datetime
+import threading
+
+# Per policy, the strongest signal wins (same order as the original per-policy checks)
+REASON_CONTENT_ID = "Content Match (ID)"
+REASON_POLICY_NAME = "Policy Name Match"
+REASON_METADATA = "Explicit Metadata Link"
+POLICY_FETCH_BATCH = 50 # Policies are streamed; only this many contents are held at once
+
+
+@dataclass
+class PolicyMatch:
+    policy_id: int
+    policy_version: Optional[str]
+    reason: str
+    field: str # content / name / mapped_controls
+    offset: int # Character offset of the match within that field
+
+    def recorded_in(self, metadata: Optional[dict]) -> bool:
+        """True if verification_metadata already describes this exact match."""
+        metadata = metadata or {}
+        return (metadata.get("reason"), metadata.get("field"), metadata.get("offset"), metadata.get("policy_version")) \
+            == (self.reason, self.field, self.offset, self.policy_version)
+
+
+class RequirementMatcher:
+    """
+    Aho-Corasick automata over requirement control IDs and titles. Each policy's
+    content, name and mapped_controls are scanned once, whatever the number of requirements.
+    """
+
+    def __init__(self, requirements: Iterable):
+        self._ids = AhoCorasick()
+        self._titles = AhoCorasick()
+        for req in requirements:
+            self._ids.add((req.control_id or "").lower(), req.status_id)
+            self._titles.add((req.control_title or "").lower(), req.status_id)
+        self._ids.build()
+        self._titles.build()
+
+    def scan(self, policy) -> Dict[int, tuple]:
+        """status_id -> (reason, field, offset) for every requirement this policy satisfies."""
+        hits = {}
+        for field, automaton, reason, text in (
+            ("content", self._ids, REASON_CONTENT_ID, policy.content),
+            ("name", self._titles, REASON_POLICY_NAME, policy.name),
+            ("mapped_controls", self._ids, REASON_METADATA, policy.mapped_controls),
+        ):
+            if not text:
+                continue
+            for status_id, offset in automaton.first_matches(text.lower()).items():
+                if status_id not in hits:
+                    hits[status_id] = (reason, field, offset)
+        return hits
+
+
+_matcher_cache = {"key": None, "matcher": None}
+_matcher_lock = threading.Lock()
+
+
+def _matcher_for(requirements: List) -> RequirementMatcher:
+    """Reuses the last automaton while the requirement set is unchanged (policy edits are the common case)."""
+    key = hash(tuple((r.status_id, r.control_id, r.control_title) for r in requirements))
+    with _matcher_lock:
+        if _matcher_cache["key"] != key:
+            _matcher_cache["matcher"] = RequirementMatcher(requirements)
+            _matcher_cache["key"] = key
+        return _matcher_cache["matcher"]
+
 
 class MappingEngine:
     def __init__(self, db: Session):
@@ -11,73 +82,115 @@ class MappingEngine:
 
     def run_global_scan(self):
         print("Starting Global Mapping Scan...")
-        
-        # 1. Fetch all requirements (Status entries)
-        req_statuses = self.db.query(RequirementStatus).all()
-        
-        # 2. Fetch all Policies
-        policies = self.db.query(Policy).all()
-        
-        updated_count = 0
-        
-        for status_entry in req_statuses:
-            req = status_entry.requirement
-            
-            # Reset status first (Conservative approach)
-            # status_entry.status = "GAP" 
-            # status_entry.mapped_policy_id = None
-            # status_entry.mapped_section = None
-            
-            mapped = False
-            
-            # 3. Simple Keyword Matching / Heuristic
-            # Logic: If Policy Content contains the "Control ID" or key phrases from Requirement
-            # Improvement: Use vector embeddings in future (pgvector/Pinecone)
-            
-            keywords = [req.control_id, req.control_title]
-            
-            # Clean keywords
-            keywords = [k for k in keywords if k and len(k) > 3]
-
-            for policy in policies:
-                content = (policy.content or "").lower()
-                name = (policy.name or "").lower()
-                
-                # Check for direct ID match (Strong signal)
-                if req.control_id.lower() in content:
-                    self._map_requirement(status_entry, policy, "Content Match (ID)")
-                    mapped = True
-                    break
-                
-                # Check for Title match in Policy Name (Strong signal)
-                if req.control_title.lower() in name:
-                     self._map_requirement(status_entry, policy, "Policy Name Match")
-                     mapped = True
-                     break
-                     
-                # Check for "Mapped Controls" metadata in Policy (if user manually linked)
-                # Assumes policy.mapped_controls is JSON list of IDs
-                if policy.mapped_controls and req.control_id in policy.mapped_controls:
-                     self._map_requirement(status_entry, policy, "Explicit Metadata Link")
-                     mapped = True
-                     break
-
-            if mapped:
-                updated_count += 1
-        
-        self.db.commit()
+        updated_count = self.remap()
         print(f"Mapping Complete. Updated {updated_count} requirements to MET.")
+        return updated_count
+
+    def remap(self, policy_ids: Optional[Iterable[int]] = None, requirement_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Maps requirements to the first policy (by id) that mentions them. With no arguments
+        every requirement is checked against every policy. Otherwise only what changed:
+        - requirement_ids (RequirementMaster ids) are re-decided against all policies
+        - policy_ids are scanned on their own; a requirement moves to one of them only if it
+          comes before its current policy, and is re-recorded if its current policy still
+          matches at a different reason/field/offset. Requirements whose current policy changed
+          (or was deleted) and no longer matches are re-decided against all policies.
+        Requirements nothing matches are left as they are (conservative approach).
+        Returns the number of requirements updated.
+        """
+        requirements = self._load_requirements()
+
+        if policy_ids is None and requirement_ids is None:
+            return self._apply(self._best_matches(requirements))
+
+        changed_policies = set(policy_ids or [])
+        changed_requirements = set(requirement_ids or [])
+        rescan = {r.status_id for r in requirements if r.requirement_id in changed_requirements}
+        updates = {}
+
+        if changed_policies:
+            current = {r.status_id: r.mapped_policy_id for r in requirements if r.status_id not in rescan}
+            recorded = {r.status_id: r.verification_metadata for r in requirements}
+            hits = self._best_matches(requirements, changed_policies, only=current)
+            for status_id, mapped_policy_id in current.items():
+                match = hits.get(status_id)
+                if mapped_policy_id in changed_policies and (match is None or match.policy_id > mapped_policy_id):
+                    # Lost its policy: a later, unchanged policy may now be the first match
+                    rescan.add(status_id)
+                elif match is not None and (mapped_policy_id is None or match.policy_id < mapped_policy_id):
+                    updates[status_id] = match
+                elif match is not None and match.policy_id == mapped_policy_id and not match.recorded_in(recorded[status_id]):
+                    # Same policy, but the match moved (e.g. text inserted before it)
+                    updates[status_id] = match
+
+        if rescan:
+            updates.update(self._best_matches(requirements, only=rescan))
+        return self._apply(updates)
+
+    def _load_requirements(self) -> List:
+        return self.db.query(
+            RequirementStatus.id.label("status_id"),
+            RequirementStatus.mapped_policy_id,
+            RequirementStatus.verification_metadata,
+            RequirementMaster.id.label("requirement_id"),
+            RequirementMaster.control_id,
+            RequirementMaster.control_title
+        ).join(RequirementMaster, RequirementStatus.requirement_id == RequirementMaster.id).all()
+
+    def _best_matches(self, requirements: List, policy_ids: Optional[set] = None, only=None) -> Dict[int, PolicyMatch]:
+        """status_id -> match in the first policy (by id) that satisfies it; only= limits the status ids kept."""
+        if not requirements:
+            return {}
+        matcher = _matcher_for(requirements)
+        query = self.db.query(
+            Policy.id, Policy.name, Policy.content, Policy.mapped_controls, Policy.version
+        ).order_by(Policy.id)
+        if policy_ids is not None:
+            query = query.filter(Policy.id.in_(policy_ids))
+
+        best = {}
+        for policy in query.execution_options(yield_per=POLICY_FETCH_BATCH):
+            for status_id, (reason, field, offset) in matcher.scan(policy).items():
+                if status_id not in best and (only is None or status_id in only):
+                    best[status_id] = PolicyMatch(policy.id, policy.version, reason, field, offset)
+        return best
+
+    def _apply(self, updates: Dict[int, PolicyMatch]) -> int:
+        if not updates:
+            return 0
+        now = datetime.datetime.utcnow()
+        self.db.execute(update(RequirementStatus), [
+            {
+                "id": status_id,
+                "status": "MET",
+                "mapped_policy_id": match.policy_id,
+                "mapped_section": f"Mapped via {match.reason} (offset {match.offset})",
+                "last_verified": now,
+                "verification_metadata": {
+                    "mapped_by": "Global Scanner",
+                    "reason": match.reason,
+                    "policy_version": match.policy_version,
+                    "field": match.field,
+                    "offset": match.offset
+                }
+            }
+            for status_id, match in updates.items()
+        ])
+        self.db.commit()
+        return len(updates)
+
+
+def remap_in_background(policy_ids: Optional[List[int]] = None, requirement_ids: Optional[List[int]] = None):
+    """BackgroundTasks entry point: own session, failures logged rather than raised."""
+    db = SessionLocal()
+    try:
+        updated = MappingEngine(db).remap(policy_ids=policy_ids, requirement_ids=requirement_ids)
+        print(f"[MappingEngine] Incremental remap updated {updated} requirements.")
+    except Exception as e:
+        print(f"[MappingEngine] Incremental remap failed: {e}")
+    finally:
+        db.close()
 
-    def _map_requirement(self, status_entry, policy, reason):
-        status_entry.status = "MET"
-        status_entry.mapped_policy_id = policy.id
-        status_entry.mapped_section = f"Mapped via {reason}"
-        status_entry.last_verified = datetime.datetime.utcnow()
-        status_entry.verification_metadata = {
-            "mapped_by": "Global Scanner",
-            "reason": reason,
-            "policy_version": policy.version
-        }
 
 if __name__ == "__main__":
     db = SessionLocal()
@@ -143,44 +143,18 @@ class MetadataScrubberService:
     def ingest_resources(tenant_id: str, provider: str, db: Session):
         """
         Orchestrates Fetch -> Scrub -> ENCRYPT -> Save
+        Batched: one existence lookup + bulk upsert per batch, encryption on a worker pool
+        (app.services.resource_ingest).
         """
+        from app.services.resource_ingest import ingest_stream
+
         print(f"[{tenant_id}] Fetching raw resources from {provider}...")
         raw_resources = fetch_raw_mock_data(provider)
-        
-        count = 0
-        for item in raw_resources:
-            r_type = item["resource_type"]
-            r_id = item["resource_id"]
-            raw = item["raw_data"]
-            
-            # SCRUB
-            cleaned_metadata = MetadataScrubberService.scrub_resource(r_type, raw)
-            
-            # ENCRYPT
-            encrypted_payload = SecurityManager.encrypt_metadata(cleaned_metadata)
-            
-            # SAVE (Update or Create)
-            # Check existing
-            existing = db.query(CloudResource).filter(
-                CloudResource.resource_id == r_id,
-                CloudResource.tenant_id == tenant_id
-            ).first()
-            
-            if existing:
-                existing.compliance_metadata = encrypted_payload
-                print(f"  -> Updated {r_id} (Encrypted)")
-            else:
-                new_res = CloudResource(
-                    tenant_id=tenant_id,
-                    provider=provider,
-                    resource_type=r_type,
-                    resource_id=r_id,
-                    compliance_metadata=encrypted_payload
-                )
-                db.add(new_res)
-                print(f"  -> Created {r_id} (Encrypted)")
-            
-            count += 1
-        
-        db.commit()
-        return count
+
+        stats = ingest_stream(db, tenant_id, provider, raw_resources)
+        print(
+            f"[{tenant_id}] Ingested {stats.processed} {provider} resources "
+            f"({stats.created} created, {stats.updated} updated, encrypted) in {stats.total_seconds:.2f}s "
+            f"({stats.per_second:.0f}/s)"
+        )
+        return stats.processed
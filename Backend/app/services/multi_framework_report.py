@@ -1,55 +1,156 @@
+import json
+import threading
+import weakref
+from typing import Dict, Iterator, Optional
+
 from sqlalchemy.orm import Session
 from app.models.universal_intent import UniversalIntent, IntentStatus
 from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
-from app.models.control import Control
-from app.models.compliance_result import ComplianceResult
+from app.utils.table_version import TableVersion
+
+REPORT_FETCH_BATCH = 500 # Intent/crosswalk rows per round trip while pivoting
+
+_reports = weakref.WeakKeyDictionary() # engine -> {tenant_id: (version, report)}
+_lock = threading.Lock()
+
+report_version = TableVersion("unified_report") # Cached reports carry the version they were built at
+report_version.watch(UniversalIntent)
+report_version.watch(IntentFrameworkCrosswalk)
+
+
+class _ReportSummary:
+    def __init__(self):
+        self.total_intents = 0
+        self.completed_intents = 0
+        self.standards_covered = {} # Insertion-ordered set
+
+    def add(self, entry: dict, completed: bool):
+        self.total_intents += 1
+        self.completed_intents += int(completed)
+        for framework_id in entry["impact"]:
+            self.standards_covered.setdefault(framework_id, None)
+
+    def as_dict(self) -> dict:
+        return {
+            "total_intents": self.total_intents,
+            "completed_intents": self.completed_intents,
+            "standards_covered": list(self.standards_covered)
+        }
+
 
 class MultiFrameworkReportService:
     """
     Generates the "Unified Controls Evidence Report".
     Pivots data by Universal Intent to show the "One-to-Many" benefits.
     """
-    
+
     @staticmethod
     def generate_unified_report(db: Session, tenant_id: str):
-        # 1. Fetch All Universal Intents
-        intents = db.query(UniversalIntent).all()
-        
-        report_data = {
-            "summary": {
-                "total_intents": len(intents),
-                "completed_intents": len([i for i in intents if i.status == IntentStatus.COMPLETED]),
-                "standards_covered": set() # Will populate below
-            },
-            "intents": []
-        }
-        
-        for intent in intents:
-            # Get Crosswalks
-            mappings = db.query(IntentFrameworkCrosswalk).filter(
-                IntentFrameworkCrosswalk.intent_id == intent.id
-            ).all()
-            
-            # Group by Framework
-            impact_map = {}
-            for m in mappings:
-                if m.framework_id not in impact_map:
-                    impact_map[m.framework_id] = []
-                    report_data["summary"]["standards_covered"].add(m.framework_id)
-                impact_map[m.framework_id].append(m.control_reference)
-            
-            # Format Intent Entry
+        """Full report, cached per tenant until an intent or crosswalk row changes. Treat as read-only."""
+        cached = _cached_report(db, tenant_id)
+        if cached is not None:
+            return cached
+
+        version = report_version.value # Taken before reading: a change mid-build leaves the result uncached
+        summary = _ReportSummary()
+        entries = []
+        for entry, completed in _iter_intent_entries(db):
+            summary.add(entry, completed)
+            entries.append(entry)
+
+        report_data = {"summary": summary.as_dict(), "intents": entries}
+        _store_report(db, tenant_id, version, report_data)
+        return report_data
+
+    @staticmethod
+    def iter_unified_report(db: Session, tenant_id: str, fmt: str = "ndjson") -> Iterator[str]:
+        """
+        Streams the report while it is being pivoted.
+        - ndjson: one {"type": "intent", ...} line per intent, then a {"type": "summary", ...} line
+        - json: the generate_unified_report document, with "intents" ahead of "summary"
+        A cached report is replayed; otherwise the streamed result is cached once complete.
+        """
+        cached = _cached_report(db, tenant_id)
+        if cached is not None:
+            entries = ((entry, None) for entry in cached["intents"])
+        else:
+            entries = _iter_intent_entries(db)
+        version = report_version.value
+        summary = _ReportSummary()
+        built = []
+
+        if fmt == "json":
+            yield '{"intents": ['
+        for index, (entry, completed) in enumerate(entries):
+            if cached is None:
+                summary.add(entry, completed)
+                built.append(entry)
+            if fmt == "json":
+                yield ("," if index else "") + json.dumps(entry)
+            else:
+                yield json.dumps({"type": "intent", **entry}) + "\n"
+
+        if cached is None:
+            cached = {"summary": summary.as_dict(), "intents": built}
+            _store_report(db, tenant_id, version, cached)
+        if fmt == "json":
+            yield '], "summary": ' + json.dumps(cached["summary"]) + "}"
+        else:
+            yield json.dumps({"type": "summary", **cached["summary"]}) + "\n"
+
+
+def _iter_intent_entries(db: Session):
+    """(entry, completed) per intent from one intent -> crosswalk outer join, pivoted in a single pass."""
+    rows = db.query(
+        UniversalIntent.id,
+        UniversalIntent.intent_id,
+        UniversalIntent.description,
+        UniversalIntent.category,
+        UniversalIntent.status,
+        IntentFrameworkCrosswalk.framework_id,
+        IntentFrameworkCrosswalk.control_reference
+    ).outerjoin(
+        IntentFrameworkCrosswalk, IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
+    ).order_by(UniversalIntent.id, IntentFrameworkCrosswalk.id).execution_options(yield_per=REPORT_FETCH_BATCH)
+
+    current_id, entry, completed = None, None, False
+    for row in rows:
+        if row.id != current_id:
+            if entry is not None:
+                yield _finish(entry), completed
+            current_id = row.id
+            completed = row.status == IntentStatus.COMPLETED
             entry = {
-                "intent_id": intent.intent_id,
-                "description": intent.description,
-                "category": intent.category,
-                "status": intent.status.value,
-                "impact": impact_map, # e.g. {"ISO_27001": ["A.5.15"], "SOC2": ["CC6.1"]}
-                "impact_count": sum(len(v) for v in impact_map.values())
+                "intent_id": row.intent_id,
+                "description": row.description,
+                "category": row.category,
+                "status": row.status.value if row.status is not None else None,
+                "impact": {}, # e.g. {"ISO_27001": ["A.5.15"], "SOC2": ["CC6.1"]}
             }
-            report_data["intents"].append(entry)
-            
-        # Convert set to list for JSON serialization
-        report_data["summary"]["standards_covered"] = list(report_data["summary"]["standards_covered"])
-            
-        return report_data
+        if row.framework_id is not None:
+            entry["impact"].setdefault(row.framework_id, []).append(row.control_reference)
+    if entry is not None:
+        yield _finish(entry), completed
+
+
+def _finish(entry: dict) -> dict:
+    entry["impact_count"] = sum(len(v) for v in entry["impact"].values())
+    return entry
+
+
+def _cached_report(db: Session, tenant_id: str) -> Optional[dict]:
+    cached = _reports.get(db.get_bind().engine, {}).get(tenant_id)
+    if cached is not None and cached[0] == report_version.value:
+        return cached[1]
+    return None
+
+
+def _store_report(db: Session, tenant_id: str, version: int, report_data: dict):
+    with _lock:
+        if version == report_version.value:
+            reports: Dict = _reports.setdefault(db.get_bind().engine, {})
+            reports[tenant_id] = (version, report_data)
+
+
+def invalidate_unified_report(*_args, **_kwargs):
+    report_version.bump()
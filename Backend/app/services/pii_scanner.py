@@ -0,0 +1,166 @@
+"""
+Local, deterministic PII pre-scan for uploaded documents.
+
+Runs compiled regex + checksum detectors before any LLM call. Clear-cut results
+(nothing found, or only validated identifiers) are returned directly in the same
+shape as ai_service.detect_and_redact_pii; only ambiguous text is escalated.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+REDACTION = "[REDACTED]"
+
+# Severity mirrors the DPO prompt's risk rules
+REJECT_KINDS = {"passport", "drivers_license", "national_id"}
+MASK_KINDS = {"email", "iban", "credit_card", "ssn", "person_name"}
+TAG_KINDS = {"ip_address"}
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+IBAN_RE = re.compile(r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?\b")
+CARD_RE = re.compile(r"\b(?:\d[ -]?){12,18}\d\b")
+SSN_RE = re.compile(r"\b(?!000|666|9\d\d)\d{3}-(?!00)\d{2}-(?!0000)\d{4}\b")
+IPV4_RE = re.compile(r"\b(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\b")
+# Identity document numbers only count when labelled; policies mention "passport" on their own all the time
+ID_DOCUMENT_RE = re.compile(
+    r"\b(?P<label>passport|driver'?s?\s+licen[cs]e|national\s+id(?:entity)?(?:\s+card)?)"
+    r"(?:\s+(?:no\.?|number|num|#))?\s*[:#]?\s*(?P<number>[A-Z0-9]{0,3}\d[A-Z0-9]{4,11})\b",
+    re.IGNORECASE
+)
+NAME_RE = re.compile(r"\b([A-Z][a-z]{1,15})\s+([A-Z][a-z]{1,20}(?:-[A-Z][a-z]{1,20})?)\b")
+
+# Common given names; a hit is a hint, not proof ("Grace Period", "Mark Complete"), so names escalate
+FIRST_NAMES = frozenset("""
+aaron adam adrian ahmed aisha alan albert alex alexander alice amanda amy andrea andrew angela anna anne
+anthony arjun barbara ben benjamin brian carlos carol catherine charles chris christina christopher claire
+daniel david deborah dennis diana donald dorothy edward elena elizabeth emily emma eric fatima frank gary
+george hannah helen henry ian isabella jack james jane jason jennifer jessica john jonathan jose joseph
+joshua julia karen kevin laura linda lisa maria mark mary matthew michael michelle mohammed nancy nicole
+olivia patricia paul peter priya rachel rahul raj rebecca richard robert ryan sandra sarah scott sophia
+stephen steven susan thomas timothy victoria vikas william
+""".split())
+
+
+def luhn_valid(digits: str) -> bool:
+    total = 0
+    for i, char in enumerate(reversed(digits)):
+        n = int(char)
+        if i % 2 == 1:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return total % 10 == 0
+
+
+def iban_valid(value: str) -> bool:
+    compact = value.replace(" ", "")
+    if not 15 <= len(compact) <= 34:
+        return False
+    rearranged = compact[4:] + compact[:4]
+    numeric = "".join(str(int(c, 36)) for c in rearranged)
+    return int(numeric) % 97 == 1
+
+
+@dataclass
+class PIIFinding:
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+@dataclass
+class PIIScanResult:
+    findings: List[PIIFinding] = field(default_factory=list)
+    redacted_text: Optional[str] = None
+    ambiguous: bool = False
+
+    @property
+    def kinds(self) -> set:
+        return {f.kind for f in self.findings}
+
+    @property
+    def action(self) -> str:
+        kinds = self.kinds
+        if kinds & REJECT_KINDS:
+            return "REJECT"
+        if kinds & MASK_KINDS:
+            return "MASK"
+        if kinds & TAG_KINDS:
+            return "TAG"
+        return "NONE"
+
+    def to_response(self) -> dict:
+        """Same contract as detect_and_redact_pii, tagged with its source."""
+        kinds = sorted(self.kinds)
+        return {
+            "pii_found": bool(self.findings),
+            "action": self.action,
+            "reasoning": f"Local scan: {', '.join(kinds)} detected." if kinds else "Local scan: no PII detected.",
+            "sensitive_strings": list(dict.fromkeys(f.value for f in self.findings)),
+            "redacted_text": self.redacted_text,
+            "source": "local_scanner"
+        }
+
+
+def _find_all(text: str) -> List[PIIFinding]:
+    findings = []
+    for m in ID_DOCUMENT_RE.finditer(text):
+        label = m.group("label").lower()
+        kind = "passport" if label.startswith("passport") else "drivers_license" if label.startswith("driver") else "national_id"
+        findings.append(PIIFinding(kind, m.group("number"), m.start("number"), m.end("number")))
+    for m in EMAIL_RE.finditer(text):
+        findings.append(PIIFinding("email", m.group(), m.start(), m.end()))
+    for m in IBAN_RE.finditer(text):
+        if iban_valid(m.group()):
+            findings.append(PIIFinding("iban", m.group(), m.start(), m.end()))
+    for m in CARD_RE.finditer(text):
+        digits = re.sub(r"[ -]", "", m.group())
+        if 13 <= len(digits) <= 19 and luhn_valid(digits):
+            findings.append(PIIFinding("credit_card", m.group(), m.start(), m.end()))
+    for m in SSN_RE.finditer(text):
+        findings.append(PIIFinding("ssn", m.group(), m.start(), m.end()))
+    for m in IPV4_RE.finditer(text):
+        findings.append(PIIFinding("ip_address", m.group(), m.start(), m.end()))
+    for m in NAME_RE.finditer(text):
+        if m.group(1).lower() in FIRST_NAMES:
+            findings.append(PIIFinding("person_name", m.group(), m.start(), m.end()))
+    return findings
+
+
+def _drop_overlaps(findings: List[PIIFinding]) -> List[PIIFinding]:
+    # Earlier kinds win (ID numbers before cards, cards before IPs); then by position
+    kept = []
+    taken = []
+    for f in findings:
+        if any(f.start < end and start < f.end for start, end in taken):
+            continue
+        kept.append(f)
+        taken.append((f.start, f.end))
+    return sorted(kept, key=lambda f: f.start)
+
+
+def redact(text: str, findings: List[PIIFinding]) -> str:
+    parts = []
+    cursor = 0
+    for f in findings:
+        parts.append(text[cursor:f.start])
+        parts.append(REDACTION)
+        cursor = f.end
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def scan_text(text: str) -> PIIScanResult:
+    """
+    Scans the full text. ambiguous=True means the LLM should decide:
+    only dictionary name matches were found, which are often false positives.
+    """
+    if not text or not text.strip():
+        return PIIScanResult()
+    findings = _drop_overlaps(_find_all(text))
+    if not findings:
+        return PIIScanResult()
+    ambiguous = all(f.kind == "person_name" for f in findings)
+    return PIIScanResult(findings=findings, redacted_text=redact(text, findings), ambiguous=ambiguous)
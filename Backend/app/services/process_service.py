@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Session
-from app.models.process import Process
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.models.process import Process, SubProcess
 from app.models.universal_intent import UniversalIntent
 from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
 from app.models.control import Control
@@ -13,15 +14,44 @@ class ProcessService:
         Returns a list of processes with their specific Mapped Controls nested inside.
         Structure: Process -> [Controls]
         """
+        # Fixed number of set-based queries regardless of process / control counts:
+        # framework, processes, sub-processes, mapped controls (+owners), intent-resolved controls (+owners)
+
         # 1. Get Framework ID
         fw = db.query(Framework).filter(Framework.code == framework_code).first()
         if not fw:
             return []
             
-        # 2. Get Processes for this Framework (Tagging/Filtering)
+        # 2. Get Processes for this Framework (Tagging/Filtering), whole graph eagerly
         # Logic: Matches Process.framework_code 
-        processes = db.query(Process).filter(Process.framework_code == framework_code).all()
-        
+        processes = db.query(Process).filter(Process.framework_code == framework_code).options(
+            selectinload(Process.sub_processes).selectinload(SubProcess.controls).joinedload(Control.owner_rel)
+        ).order_by(Process.id).all()
+        if not processes:
+            return []
+
+        # 3. Intent-resolved controls for every process category in one join
+        # Process.name (Category) -> UniversalIntent.category -> Crosswalk -> Control
+        categories = {proc.name.strip() for proc in processes}
+        intent_controls = {}
+        rows = db.query(UniversalIntent.category, Control).join(
+            IntentFrameworkCrosswalk,
+            and_(
+                IntentFrameworkCrosswalk.intent_id == UniversalIntent.id,
+                IntentFrameworkCrosswalk.framework_id == framework_code
+            )
+        ).join(
+            Control,
+            and_(
+                Control.control_id == IntentFrameworkCrosswalk.control_reference,
+                Control.framework_id == fw.id
+            )
+        ).filter(
+            UniversalIntent.category.in_(categories)
+        ).options(joinedload(Control.owner_rel)).order_by(Control.id).all()
+        for category, control in rows:
+            intent_controls.setdefault(category, []).append(control)
+
         result = []
         
         for proc in processes:
@@ -35,55 +65,39 @@ class ProcessService:
             # Track seen controls to avoid duplicates
             seen_control_ids = set()
 
-            # A. Fetch explicitly mapped controls via SubProcesses
+            # A. Explicitly mapped controls via SubProcesses
             for sp in proc.sub_processes:
                 for c in sp.controls:
-                    if c.id not in seen_control_ids:
-                        if c.framework_id == fw.id: # Ensure framework match
-                            proc_data["controls"].append({
-                                "id": c.id,
-                                "control_id": c.control_id,
-                                "title": c.title,
-                                "description": c.description,
-                                "status": c.status,
-                                "framework_id": c.framework_id,
-                                "assignee": {"name": c.owner_rel.name, "initials": c.owner_rel.initials} if c.owner_rel else None
-                            })
-                            seen_control_ids.add(c.id)
+                    if c.id not in seen_control_ids and c.framework_id == fw.id: # Ensure framework match
+                        proc_data["controls"].append(_control_payload(c))
+                        seen_control_ids.add(c.id)
 
-            # B. Resolve Controls via Intent (Fallback/Auto-Map)
-            # Process.name (Category) -> UniversalIntent.category
-            proc_name_clean = proc.name.strip()
-            intents = db.query(UniversalIntent).filter(UniversalIntent.category == proc_name_clean).all()
-            intent_ids = [i.id for i in intents]
-            
-            if intent_ids:
-                crosswalks = db.query(IntentFrameworkCrosswalk).filter(
-                    IntentFrameworkCrosswalk.intent_id.in_(intent_ids),
-                    IntentFrameworkCrosswalk.framework_id == framework_code
-                ).all()
-                
-                control_refs = [cw.control_reference for cw in crosswalks]
-                
-                if control_refs:
-                    controls = db.query(Control).filter(
-                        Control.framework_id == fw.id,
-                        Control.control_id.in_(control_refs)
-                    ).all()
-                    
-                    for c in controls:
-                        if c.id not in seen_control_ids:
-                             proc_data["controls"].append({
-                                "id": c.id,
-                                "control_id": c.control_id,
-                                "title": c.title,
-                                "description": c.description,
-                                "status": c.status,
-                                "framework_id": c.framework_id,
-                                "assignee": {"name": c.owner_rel.name, "initials": c.owner_rel.initials} if c.owner_rel else None
-                            })
-                             seen_control_ids.add(c.id)
+            # B. Controls resolved via Intent (Fallback/Auto-Map)
+            for c in intent_controls.get(proc.name.strip(), []):
+                if c.id not in seen_control_ids:
+                    proc_data["controls"].append(_control_payload(c))
+                    seen_control_ids.add(c.id)
             
             result.append(proc_data)
             
         return result
+
+
+def _assignee(person):
+    if person is None:
+        return None
+    name = getattr(person, "name", None) or person.full_name
+    initials = getattr(person, "initials", None) or "".join(part[0] for part in name.split()[:2]).upper()
+    return {"name": name, "initials": initials}
+
+
+def _control_payload(c) -> dict:
+    return {
+        "id": c.id,
+        "control_id": c.control_id,
+        "title": c.title,
+        "description": c.description,
+        "status": c.status,
+        "framework_id": c.framework_id,
+        "assignee": _assignee(c.owner_rel)
+    }
@@ -3,14 +3,62 @@ from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from app.models.requirement import RequirementMaster, RequirementStatus
-import pandas as pd
+from openpyxl import Workbook
 import datetime
 import os
 
+EXCEL_COLUMNS = ["Control ID", "Domain", "Requirement", "Target Control", "Status", "Mapped Evidence", "Module"]
+FETCH_BATCH_SIZE = 1000 # Rows per server-side fetch
+PDF_DETAIL_MAX_ROWS = 2000 # Per PDF detail section; the Excel export always has every row
+PDF_ROWS_PER_TABLE = 50 # Detail tables are split so layout works on one page-sized chunk at a time
+
+
 class ReportGeneratorV2:
     def __init__(self, db):
         self.db = db
 
+    def _iter_rows(self):
+        """
+        Streams the RequirementMaster x RequirementStatus outer join as report rows.
+        Plain columns (no ORM identity map) fetched in batches from a server-side cursor.
+        """
+        query = self.db.query(
+            RequirementMaster.control_id,
+            RequirementMaster.domain,
+            RequirementMaster.requirement_text,
+            RequirementMaster.target_control,
+            RequirementMaster.module_source,
+            RequirementStatus.id.label("status_id"),
+            RequirementStatus.status,
+            RequirementStatus.mapped_section
+        ).outerjoin(
+            RequirementStatus, RequirementMaster.id == RequirementStatus.requirement_id
+        ).order_by(RequirementMaster.id).execution_options(stream_results=True, yield_per=FETCH_BATCH_SIZE)
+
+        for r in query:
+            # No status row (left join) -> GAP / Unmapped
+            has_status = r.status_id is not None
+            text = r.requirement_text or ""
+            yield {
+                "Control ID": r.control_id,
+                "Domain": r.domain,
+                "Requirement": text[:200] + "..." if len(text) > 200 else text,
+                "Target Control": r.target_control,
+                "Status": r.status if has_status else "GAP",
+                "Mapped Evidence": r.mapped_section if has_status else "Unmapped",
+                "Module": r.module_source
+            }
+
+    def _paged_table(self, rows, col_widths, style):
+        """Splits a detail table into fixed-size chunks, each repeating the header row."""
+        header, body = rows[0], rows[1:]
+        tables = []
+        for start in range(0, len(body), PDF_ROWS_PER_TABLE):
+            t = Table([header] + body[start:start + PDF_ROWS_PER_TABLE], colWidths=col_widths, repeatRows=1)
+            t.setStyle(TableStyle(style))
+            tables.append(t)
+        return tables
+
     def generate_compliance_report(self, workspace_id, output_dir="reports"):
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
@@ -19,41 +67,43 @@ class ReportGeneratorV2:
         pdf_path = os.path.join(output_dir, f"AI_Compliance_Report_{timestamp}.pdf")
         excel_path = os.path.join(output_dir, f"AI_Compliance_Report_{timestamp}.xlsx")
 
-        # 1. Fetch Data (3-way Join Logic)
-        query = self.db.query(RequirementMaster, RequirementStatus).\
-            outerjoin(RequirementStatus, RequirementMaster.id == RequirementStatus.requirement_id).all()
-            
-        data = []
+        # 1. Single streaming pass: Excel rows written as they arrive, module stats and
+        #    a bounded sample of PDF detail rows accumulated alongside.
         module_stats = {}
+        mapped_rows = [["ID", "Requirement", "Evidence Source (Deep Link)"]]
+        gap_rows = [["ID", "Requirement", "Module"]]
+        overflow = {"mapped": 0, "gap": 0}
+
+        wb = Workbook(write_only=True) # Rows are flushed to a temp file, not kept in memory
+        ws = wb.create_sheet("Sheet1")
+        ws.append(EXCEL_COLUMNS)
+
+        for row in self._iter_rows():
+            st_val = row["Status"]
+            mod = row["Module"]
 
-        for req, status in query:
-            # Safe access to status fields (might be None if left join, though we init them)
-            st_val = status.status if status else "GAP"
-            mapped_sec = status.mapped_section if status else "Unmapped"
-            
             # Module Stats
-            mod = req.module_source
             if mod not in module_stats:
                 module_stats[mod] = {"total": 0, "met": 0}
             module_stats[mod]["total"] += 1
             if st_val == "MET":
                 module_stats[mod]["met"] += 1
-            
-            # Prepare row for Excel/PDF
-            row = {
-                "Control ID": req.control_id,
-                "Domain": req.domain,
-                "Requirement": req.requirement_text[:200] + "..." if len(req.requirement_text) > 200 else req.requirement_text,
-                "Target Control": req.target_control,
-                "Status": st_val,
-                "Mapped Evidence": mapped_sec,
-                "Module": mod
-            }
-            data.append(row)
+
+            ws.append([row[col] for col in EXCEL_COLUMNS])
+
+            if st_val == "MET":
+                if len(mapped_rows) <= PDF_DETAIL_MAX_ROWS:
+                    mapped_rows.append([row["Control ID"], row["Requirement"][:50]+"...", row["Mapped Evidence"]])
+                else:
+                    overflow["mapped"] += 1
+            else:
+                if len(gap_rows) <= PDF_DETAIL_MAX_ROWS:
+                    gap_rows.append([row["Control ID"], row["Requirement"][:50]+"...", row["Module"]])
+                else:
+                    overflow["gap"] += 1
 
         # 2. Generate Excel
-        df = pd.DataFrame(data)
-        df.to_excel(excel_path, index=False)
+        wb.save(excel_path)
         print(f"Generated Excel: {excel_path}")
 
         # 3. Generate PDF
@@ -93,20 +143,10 @@ class ReportGeneratorV2:
         # Let's show "Met Requirements" then "Unmapped"
         
         elements.append(Paragraph("Mapped Requirements (Evidence Linked)", styles['Heading3']))
-        # Table of Mapped
-        mapped_rows = [["ID", "Requirement", "Evidence Source (Deep Link)"]]
-        gap_rows = [["ID", "Requirement", "Module"]]
-        
-        for d in data:
-            if d["Status"] == "MET":
-                mapped_rows.append([d["Control ID"], d["Requirement"][:50]+"...", d["Mapped Evidence"]])
-            else:
-                gap_rows.append([d["Control ID"], d["Requirement"][:50]+"...", d["Module"]])
-                
         if len(mapped_rows) > 1:
-            t_map = Table(mapped_rows, colWidths=[60, 250, 200])
-            t_map.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.grey)]))
-            elements.append(t_map)
+            elements.extend(self._paged_table(mapped_rows, [60, 250, 200], [('GRID', (0, 0), (-1, -1), 0.5, colors.grey)]))
+            if overflow["mapped"]:
+                elements.append(Paragraph(f"... {overflow['mapped']} more verified requirements in the Excel export.", styles['Normal']))
         else:
             elements.append(Paragraph("No requirements verified yet.", styles['Normal']))
             
@@ -114,9 +154,9 @@ class ReportGeneratorV2:
         
         elements.append(Paragraph("Gap Analysis (Unmapped Requirements)", styles['Heading3']))
         if len(gap_rows) > 1:
-            t_gap = Table(gap_rows, colWidths=[60, 300, 150])
-            t_gap.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.grey), ('TEXTCOLOR', (0,0), (-1,-1), colors.red)]))
-            elements.append(t_gap)
+            elements.extend(self._paged_table(gap_rows, [60, 300, 150], [('GRID', (0, 0), (-1, -1), 0.5, colors.grey), ('TEXTCOLOR', (0,0), (-1,-1), colors.red)]))
+            if overflow["gap"]:
+                elements.append(Paragraph(f"... {overflow['gap']} more open requirements in the Excel export.", styles['Normal']))
             
         doc.build(elements)
         print(f"Generated PDF: {pdf_path}")
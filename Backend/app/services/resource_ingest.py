@@ -0,0 +1,207 @@
+"""
+Bulk cloud resource ingestion: scrub -> encrypt -> upsert, in batches.
+
+Resources are consumed from any iterable (a provider paginator can stream straight in),
+so only two batches are held at a time. Per batch:
+1. Scrubbed in the calling thread (whitelist filtering is cheap)
+2. Encrypted on a worker pool; the next batch encrypts while this one is written
+3. Matched to existing rows with one tenant + resource_id IN lookup
+4. Written with one bulk UPDATE (by primary key) and one bulk INSERT. The insert is a
+   native upsert (ON CONFLICT) where the dialect and uq_cloud_resource_key allow it,
+   so a concurrent sync inserting the same resource can't create a duplicate.
+Everything is committed once at the end, like the per-resource loop this replaces.
+"""
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, inspect as sa_inspect, insert, text, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.cloud_resource import CloudResource
+from app.utils.encryption import SecurityManager
+
+UPSERT_KEY = ("tenant_id", "resource_id")
+UPSERT_KEY_NAME = "uq_cloud_resource_key"
+
+_upsert_engines = weakref.WeakKeyDictionary() # engine -> bool (native upsert usable)
+
+
+@dataclass
+class IngestStats:
+    processed: int = 0 # Resources consumed, duplicates within a batch included
+    created: int = 0 # Not found by the batch lookup
+    updated: int = 0
+    batches: int = 0
+    encrypt_wait_seconds: float = 0.0 # Writer idle, waiting on the encryption pool
+    write_seconds: float = 0.0 # Lookups + bulk writes
+    total_seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.processed / self.total_seconds if self.total_seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "per_second": round(self.per_second, 1)}
+
+
+# --- SCHEMA ---
+
+def ensure_cloud_resource_schema(engine) -> bool:
+    """
+    Adds the (tenant_id, resource_id) unique key to databases created before it existed.
+    Returns False (ingestion still works, without native upserts) if duplicates prevent it.
+    """
+    if _has_upsert_key(sa_inspect(engine)):
+        return True
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {UPSERT_KEY_NAME} ON cloud_resources (tenant_id, resource_id)"
+            ))
+    except Exception as e:
+        print(f"[ResourceIngest] Could not add {UPSERT_KEY_NAME} (duplicate resources?); using plain inserts: {e}")
+        return False
+    _upsert_engines.pop(engine, None)
+    print(f"[ResourceIngest] Added {UPSERT_KEY_NAME}.")
+    return True
+
+
+def _has_upsert_key(inspector) -> bool:
+    if not inspector.has_table(CloudResource.__tablename__):
+        return False
+    key = set(UPSERT_KEY)
+    uniques = [set(u["column_names"]) for u in inspector.get_unique_constraints(CloudResource.__tablename__)]
+    uniques += [set(i["column_names"]) for i in inspector.get_indexes(CloudResource.__tablename__) if i.get("unique")]
+    return key in uniques
+
+
+def _native_upsert(connection) -> bool:
+    """connection: the session's connection (inspecting the engine would borrow another one)."""
+    engine = connection.engine
+    usable = _upsert_engines.get(engine)
+    if usable is None:
+        usable = connection.dialect.name in ("sqlite", "postgresql") and _has_upsert_key(sa_inspect(connection))
+        _upsert_engines[engine] = usable
+    return usable
+
+
+# --- PIPELINE ---
+
+def _batches(items: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _scrub(batch: List[dict]) -> List[dict]:
+    """Scrubbed rows, one per resource_id (the last occurrence in the batch wins)."""
+    from app.services.metadata_scrubber import MetadataScrubberService
+
+    rows = {}
+    for item in batch:
+        rows[item["resource_id"]] = {
+            "resource_type": item["resource_type"],
+            "resource_id": item["resource_id"],
+            "metadata": MetadataScrubberService.scrub_resource(item["resource_type"], item["raw_data"]),
+        }
+    return list(rows.values())
+
+
+def _encrypt_chunk(payloads: List[dict]) -> List[str]:
+    return [SecurityManager.encrypt_metadata(p) for p in payloads]
+
+
+def _submit_encryption(pool: ThreadPoolExecutor, rows: List[dict], workers: int):
+    payloads = [row["metadata"] for row in rows]
+    chunk = max(1, -(-len(payloads) // workers))
+    return [pool.submit(_encrypt_chunk, payloads[start:start + chunk]) for start in range(0, len(payloads), chunk)]
+
+
+def _write_batch(db: Session, tenant_id: str, provider: str, rows: List[dict], encrypted: List[str], stats: IngestStats):
+    existing: Dict[str, List[int]] = {}
+    for pk, resource_id in db.query(CloudResource.id, CloudResource.resource_id).filter(
+        CloudResource.tenant_id == tenant_id,
+        CloudResource.resource_id.in_([row["resource_id"] for row in rows])
+    ):
+        existing.setdefault(resource_id, []).append(pk)
+
+    updates, inserts = [], []
+    for row, payload in zip(rows, encrypted):
+        pks = existing.get(row["resource_id"])
+        if pks:
+            # Pre-constraint databases may hold duplicates; keep them all in step
+            updates.extend({"id": pk, "compliance_metadata": payload} for pk in pks)
+        else:
+            inserts.append({
+                "tenant_id": tenant_id,
+                "provider": provider,
+                "resource_type": row["resource_type"],
+                "resource_id": row["resource_id"],
+                "compliance_metadata": payload,
+            })
+
+    if updates:
+        db.execute(update(CloudResource), updates)
+    if inserts:
+        connection = db.connection()
+        if _native_upsert(connection):
+            if connection.dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            stmt = dialect_insert(CloudResource)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(UPSERT_KEY),
+                set_={"compliance_metadata": stmt.excluded.compliance_metadata, "updated_at": func.now()}
+            )
+            db.execute(stmt, inserts)
+        else:
+            db.execute(insert(CloudResource), inserts)
+
+    stats.created += len(inserts)
+    stats.updated += len(rows) - len(inserts)
+
+
+def ingest_stream(db: Session, tenant_id: str, provider: str, resources: Iterable[dict],
+                  batch_size: Optional[int] = None, workers: Optional[int] = None) -> IngestStats:
+    """
+    Ingests {"resource_type", "resource_id", "raw_data"} items for one tenant/provider.
+    Returns throughput metrics; the session is committed on success.
+    """
+    batch_size = batch_size or settings.RESOURCE_INGEST_BATCH_SIZE
+    workers = max(1, workers or settings.RESOURCE_INGEST_WORKERS)
+    stats = IngestStats()
+    started = time.perf_counter()
+
+    def flush(rows, futures):
+        wait_start = time.perf_counter()
+        encrypted = [token for future in futures for token in future.result()]
+        write_start = time.perf_counter()
+        stats.encrypt_wait_seconds += write_start - wait_start
+        _write_batch(db, tenant_id, provider, rows, encrypted, stats)
+        stats.write_seconds += time.perf_counter() - write_start
+        stats.batches += 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resource-encrypt") as pool:
+        pending = None
+        for batch in _batches(resources, batch_size):
+            stats.processed += len(batch)
+            rows = _scrub(batch)
+            futures = _submit_encryption(pool, rows, workers)
+            if pending is not None:
+                flush(*pending) # Previous batch is written while this one encrypts
+            pending = (rows, futures)
+        if pending is not None:
+            flush(*pending)
+
+    db.commit()
+    stats.total_seconds = time.perf_counter() - started
+    return stats
@@ -0,0 +1,274 @@
+"""
+Full-text search over controls, evidence and policies.
+
+SQLite: an FTS5 virtual table (porter stemming, bm25 ranking, title weighted).
+Postgres: a table with a generated, weighted tsvector column and a GIN index.
+Rows are kept in step by an after_flush hook in the writing transaction, so
+search never sees uncommitted or rolled-back data. Writes that bypass the ORM
+(raw SQL, bulk inserts) need rebuild_search_index().
+"""
+import re
+import weakref
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import event, inspect as sa_inspect, text
+from sqlalchemy.orm import Session
+
+from app.models.control import Control
+from app.models.evidence import Evidence
+from app.models.policy import Policy
+
+SEARCH_TABLE = "search_index"
+TITLE_WEIGHT = 10.0 # bm25 column weight for titles vs bodies (SQLite)
+MAX_QUERY_TERMS = 12
+
+# kind -> (model, code). SQLite rowid = ref_id * KIND_SLOTS + code, so updates are rowid lookups
+KINDS = {"control": (Control, 1), "evidence": (Evidence, 2), "policy": (Policy, 3)}
+KIND_SLOTS = 4
+# Kinds every tenant can see, as get_policies lists them; these skip the tenant filter
+SHARED_KINDS = ("policy",)
+
+_TRACKED_ATTRS = {
+    Control: ("control_id", "title", "description", "ai_explanation", "tenant_id"),
+    Evidence: ("title", "description", "tenant_id"),
+    Policy: ("name", "content", "tenant_id"),
+}
+
+_ready_engines = weakref.WeakKeyDictionary() # engine -> bool (index table present)
+
+
+@dataclass
+class SearchHit:
+    kind: str
+    id: int
+    title: str
+    snippet: str
+    score: float
+    tenant_id: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "id": self.id, "title": self.title, "snippet": self.snippet, "score": self.score}
+
+
+def _kind_of(obj) -> Optional[str]:
+    for kind, (model, _) in KINDS.items():
+        if isinstance(obj, model):
+            return kind
+    return None
+
+
+def document_for(obj) -> dict:
+    """Indexed fields for one ORM object: title (weighted) and body."""
+    if isinstance(obj, Control):
+        title = " ".join(p for p in (obj.control_id, obj.title) if p)
+        body = "\n".join(p for p in (obj.description, obj.ai_explanation) if p)
+    elif isinstance(obj, Evidence):
+        title, body = obj.title or "", obj.description or ""
+    else:
+        title, body = obj.name or "", obj.content or ""
+    return {"kind": _kind_of(obj), "ref_id": obj.id, "tenant_id": obj.tenant_id, "title": title, "body": body}
+
+
+# --- SCHEMA ---
+
+def ensure_search_schema(engine) -> bool:
+    """Creates the index table for the engine's dialect. Returns False where unsupported."""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                    "title, body, kind UNINDEXED, ref_id UNINDEXED, tenant_id UNINDEXED, "
+                    "tokenize='porter unicode61')"
+                ))
+            elif dialect == "postgresql":
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                    "kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, tenant_id VARCHAR, "
+                    "title TEXT, body TEXT, "
+                    "document tsvector GENERATED ALWAYS AS ("
+                    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                    "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED, "
+                    "PRIMARY KEY (kind, ref_id))"
+                ))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_tenant ON {SEARCH_TABLE} (tenant_id)"))
+            else:
+                _ready_engines[engine] = False
+                return False
+    except Exception as e:
+        print(f"[SearchIndex] Full-text index unavailable on {dialect}: {e}")
+        _ready_engines[engine] = False
+        return False
+    _ready_engines[engine] = True
+    return True
+
+
+def search_available(bind) -> bool:
+    """bind: engine or connection. Inside a flush pass the flush's connection, never the engine."""
+    engine = getattr(bind, "engine", bind)
+    ready = _ready_engines.get(engine)
+    if ready is None:
+        ready = engine.dialect.name in ("sqlite", "postgresql") and sa_inspect(bind).has_table(SEARCH_TABLE)
+        _ready_engines[engine] = ready
+    return ready
+
+
+# --- WRITES ---
+
+def _rowid(kind: str, ref_id: int) -> int:
+    return ref_id * KIND_SLOTS + KINDS[kind][1]
+
+
+def _upsert(connection, docs: List[dict]):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+                           [{"rowid": _rowid(d["kind"], d["ref_id"])} for d in docs])
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, ref_id, tenant_id) "
+            "VALUES (:rowid, :title, :body, :kind, :ref_id, :tenant_id)"
+        ), [{**d, "rowid": _rowid(d["kind"], d["ref_id"])} for d in docs])
+    else:
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (kind, ref_id, tenant_id, title, body) "
+            "VALUES (:kind, :ref_id, :tenant_id, :title, :body) "
+            "ON CONFLICT (kind, ref_id) DO UPDATE SET tenant_id = EXCLUDED.tenant_id, "
+            "title = EXCLUDED.title, body = EXCLUDED.body"
+        ), docs)
+
+
+def _delete(connection, keys: List[tuple]):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+                           [{"rowid": _rowid(kind, ref_id)} for kind, ref_id in keys])
+    else:
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE kind = :kind AND ref_id = :ref_id"),
+                           [{"kind": kind, "ref_id": ref_id} for kind, ref_id in keys])
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Re-indexes everything. Needed once for existing data and after writes that bypass the ORM."""
+    connection = db.connection()
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    total = 0
+    for kind, (model, _) in KINDS.items():
+        batch = []
+        for obj in db.query(model).yield_per(500):
+            batch.append(document_for(obj))
+            if len(batch) >= 500:
+                _upsert(connection, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            _upsert(connection, batch)
+            total += len(batch)
+    db.commit()
+    return total
+
+
+def ensure_search_backfilled(db: Session) -> int:
+    """Backfill on first run: index empty but indexable rows exist."""
+    if not search_available(db.connection()):
+        return 0
+    if db.execute(text(f"SELECT 1 FROM {SEARCH_TABLE} LIMIT 1")).first() is not None:
+        return 0
+    if not any(db.query(model.id).first() for model, _ in KINDS.values()):
+        return 0
+    return rebuild_search_index(db)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_search_index(session, flush_context):
+    upserts, deletes = [], []
+    for obj in list(session.new) + list(session.dirty):
+        attrs = _TRACKED_ATTRS.get(type(obj))
+        if attrs is None or obj.id is None:
+            continue
+        state = sa_inspect(obj)
+        if obj in session.dirty and not any(state.attrs[a].history.has_changes() for a in attrs):
+            continue
+        upserts.append(document_for(obj))
+    for obj in session.deleted:
+        if type(obj) in _TRACKED_ATTRS and obj.id is not None:
+            deletes.append((_kind_of(obj), obj.id))
+
+    if not upserts and not deletes:
+        return
+    connection = session.connection()
+    if not search_available(connection):
+        return
+    if deletes:
+        _delete(connection, deletes)
+    if upserts:
+        _upsert(connection, upserts)
+
+
+# --- QUERIES ---
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", (query or "").lower())[:MAX_QUERY_TERMS]
+
+
+def search(db: Session, query: str, tenant_ids: Sequence[str], kinds: Optional[Iterable[str]] = None,
+           limit: int = 20, offset: int = 0) -> List[SearchHit]:
+    """
+    Ranked matches for every query term (prefix match on the last word), limited to tenant_ids
+    (SHARED_KINDS match for any tenant).
+    Returns [] for empty queries or when no index is available.
+    """
+    terms = _terms(query)
+    if not terms or not tenant_ids or not search_available(db.connection()):
+        return []
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+    if not kinds:
+        return []
+
+    params = {"limit": limit, "offset": offset}
+    tenant_params = {f"t{i}": t for i, t in enumerate(tenant_ids)}
+    kind_params = {f"k{i}": k for i, k in enumerate(kinds)}
+    params.update(tenant_params)
+    params.update(kind_params)
+    tenant_in = ", ".join(f":{p}" for p in tenant_params)
+    kind_in = ", ".join(f":{p}" for p in kind_params)
+    scope = f"tenant_id IN ({tenant_in})"
+    shared = [k for k in kinds if k in SHARED_KINDS]
+    if shared:
+        shared_params = {f"s{i}": k for i, k in enumerate(shared)}
+        params.update(shared_params)
+        scope = f"({scope} OR kind IN ({', '.join(f':{p}' for p in shared_params)}))"
+
+    if db.get_bind().dialect.name == "sqlite":
+        # Each term quoted (FTS5 syntax characters are literal); the last one as a prefix
+        params["match"] = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        rows = db.execute(text(
+            f"SELECT kind, ref_id, tenant_id, title, "
+            f"snippet({SEARCH_TABLE}, 1, '[', ']', '...', 12) AS snippet, "
+            f"bm25({SEARCH_TABLE}, {TITLE_WEIGHT}, 1.0) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+            f"AND {scope} AND kind IN ({kind_in}) "
+            f"ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), params).all()
+        score = lambda rank: round(-rank, 4) # bm25 is lower-is-better
+    else:
+        params["tsquery"] = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        rows = db.execute(text(
+            f"SELECT kind, ref_id, tenant_id, title, "
+            f"ts_headline('english', coalesce(body, ''), to_tsquery('english', :tsquery), "
+            f"'StartSel=[, StopSel=], MaxWords=24, MinWords=8') AS snippet, "
+            f"ts_rank_cd(document, to_tsquery('english', :tsquery)) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', :tsquery) "
+            f"AND {scope} AND kind IN ({kind_in}) "
+            f"ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+        score = lambda rank: round(float(rank), 4)
+
+    return [SearchHit(r.kind, int(r.ref_id), r.title, r.snippet, score(r.rank), r.tenant_id) for r in rows]
+
+
+def search_ids(db: Session, kind: str, query: str, tenant_ids: Sequence[str], limit: int = 1000) -> Optional[List[int]]:
+    """Ranked ids of one kind, or None when no index is available (callers fall back to LIKE)."""
+    if not search_available(db.connection()):
+        return None
+    return [hit.id for hit in search(db, query, tenant_ids, kinds=[kind], limit=limit)]
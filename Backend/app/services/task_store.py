@@ -0,0 +1,125 @@
+import json
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from app.models.review_task import ReviewTask
+
+
+def create_task(db: Session, title: str, description: str = None, document_id: str = None, control_id: str = None,
+                assigned_to: str = "Admin", task_type: str = None) -> ReviewTask:
+    task = ReviewTask(
+        title=title,
+        description=description,
+        document_id=document_id,
+        control_id=control_id,
+        assigned_to=assigned_to,
+        task_type=task_type,
+        status="PENDING"
+    )
+    db.add(task)
+    db.commit() # The id comes from the database; concurrent creates get distinct ids
+    db.refresh(task)
+    return task
+
+
+def list_tasks(db: Session, status: str = None, assigned_to: str = None, control_id: str = None,
+               limit: int = 100, offset: int = 0) -> Tuple[int, List[ReviewTask]]:
+    query = db.query(ReviewTask)
+    if status:
+        query = query.filter(ReviewTask.status == status)
+    if assigned_to:
+        query = query.filter(ReviewTask.assigned_to == assigned_to)
+    if control_id:
+        query = query.filter(ReviewTask.control_id == control_id)
+    total = query.count()
+    return total, query.order_by(ReviewTask.id).offset(offset).limit(limit).all()
+
+
+def set_task_status(db: Session, task_ref: str, status: str, outcome: str = None) -> bool:
+    """Single-row UPDATE by primary key. Returns False if the task doesn't exist."""
+    task_id = ReviewTask.id_from_ref(task_ref)
+    if task_id is None:
+        return False
+    rowcount = db.execute(
+        update(ReviewTask).where(ReviewTask.id == task_id).values(
+            status=status, outcome=outcome, completed_at=datetime.now()
+        )
+    ).rowcount
+    db.commit()
+    return rowcount == 1
+
+
+def complete_document_tasks(db: Session, document_id: str, outcome: str = "APPROVED") -> int:
+    """Closes every pending task for a document version in one statement."""
+    rowcount = db.execute(
+        update(ReviewTask)
+        .where(ReviewTask.document_id == document_id, ReviewTask.status == "PENDING")
+        .values(status="COMPLETED", outcome=outcome, completed_at=datetime.now())
+    ).rowcount
+    db.commit()
+    return rowcount
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    for parse in (datetime.fromisoformat, lambda v: datetime.strptime(v, "%Y-%m-%d %H:%M:%S")):
+        try:
+            return parse(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def import_tasks_json(db: Session, path: str) -> int:
+    """
+    One-shot migration of the legacy tasks.json. Keeps TASK-xxxx ids where they are
+    unique (the file could hold duplicates from racing writers; those get new ids).
+    The file is renamed to <path>.migrated afterwards. Returns the number imported.
+    """
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path, "r") as f:
+            legacy = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[TaskStore] Could not read {path}: {e}")
+        return 0
+
+    taken = set(db.scalars(select(ReviewTask.id)).all())
+    rows = []
+    for item in legacy:
+        task_id = ReviewTask.id_from_ref(str(item.get("id", "")))
+        if task_id is None or task_id < 1 or task_id in taken:
+            task_id = None # Allocated by the database
+        else:
+            taken.add(task_id)
+        rows.append(ReviewTask(
+            id=task_id,
+            title=item.get("title") or "Untitled task",
+            description=item.get("description"),
+            document_id=item.get("document_id"),
+            control_id=item.get("control_id"),
+            assigned_to=item.get("assigned_to") or "Admin",
+            status=item.get("status") or "PENDING",
+            task_type=item.get("type"),
+            outcome=item.get("outcome"),
+            created_at=_parse_datetime(item.get("created_at")) or datetime.now(),
+            completed_at=_parse_datetime(item.get("completed_at"))
+        ))
+
+    # Explicit ids first so auto-allocated ones land after them
+    for task in sorted(rows, key=lambda t: t.id is None):
+        db.add(task)
+        db.flush()
+    if db.bind.dialect.name == "postgresql":
+        # Explicit ids don't advance the serial sequence
+        db.execute(text("SELECT setval(pg_get_serial_sequence('review_tasks', 'id'), COALESCE(MAX(id), 1)) FROM review_tasks"))
+    db.commit()
+    os.replace(path, f"{path}.migrated")
+    print(f"[TaskStore] Migrated {len(rows)} tasks from {path}.")
+    return len(rows)
@@ -0,0 +1,107 @@
+import json
+import os
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models.document_version import DocumentVersion
+
+# Stored revision names: <control_id>_<YYYYmmdd>_<HHMMSS>_<original name>
+VERSION_FILENAME_RE = re.compile(r"^(?P<control>.+?)_(?P<date>\d{8})_(?P<time>\d{6})_(?P<name>.+)$")
+
+
+def parse_version_filename(filename: str) -> Optional[Tuple[str, datetime, str]]:
+    """Returns (control_id, timestamp, original name), or None for names that don't follow the scheme."""
+    match = VERSION_FILENAME_RE.match(filename)
+    if not match:
+        return None
+    try:
+        timestamp = datetime.strptime(match.group("date") + match.group("time"), "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+    return match.group("control"), timestamp, match.group("name")
+
+
+def record_version(db: Session, tenant_id: Optional[str], control_id: str, filename: str, receipt: dict,
+                   file_hash: str = None, original_filename: str = None, version_timestamp: datetime = None,
+                   is_witnessed: bool = False, uploaded_by: str = None) -> DocumentVersion:
+    version = DocumentVersion(
+        tenant_id=tenant_id,
+        control_id=control_id,
+        filename=filename,
+        original_filename=original_filename,
+        file_hash=file_hash,
+        version_timestamp=version_timestamp,
+        ai_status=(receipt or {}).get("final_verdict") or "PENDING",
+        ai_receipt=receipt,
+        is_witnessed=is_witnessed,
+        uploaded_by=uploaded_by
+    )
+    db.add(version)
+    db.commit()
+    return version
+
+
+def list_versions(db: Session, tenant_id: str, control_id: str, limit: int = 50, offset: int = 0) -> Tuple[int, List[DocumentVersion]]:
+    """Newest first. Legacy (tenant-less) revisions stay visible, as they were before the catalog."""
+    query = db.query(DocumentVersion).filter(
+        DocumentVersion.control_id == control_id,
+        or_(DocumentVersion.tenant_id == tenant_id, DocumentVersion.tenant_id.is_(None))
+    )
+    total = query.count()
+    rows = query.order_by(
+        DocumentVersion.version_timestamp.desc(), DocumentVersion.id.desc()
+    ).offset(offset).limit(limit).all()
+    return total, rows
+
+
+def import_version_directory(db: Session, directory: str, tenant_id: Optional[str] = None) -> int:
+    """
+    Indexes revisions already on disk (and their .json receipts). Idempotent:
+    filenames already in the catalog are skipped. Returns the number imported.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    names = set(os.listdir(directory))
+    known = set(db.scalars(select(DocumentVersion.filename)).all())
+
+    # Confidential revisions left only a receipt (<name>.json); index those as witnessed
+    candidates = {n for n in names if not n.endswith(".json")}
+    candidates |= {n[:-5] for n in names if n.endswith(".json") and n[:-5] not in names}
+
+    imported = 0
+    for filename in sorted(candidates):
+        if filename in known:
+            continue
+        parsed = parse_version_filename(filename)
+        if parsed is None:
+            continue
+        control_id, timestamp, original = parsed
+
+        receipt = None
+        if f"{filename}.json" in names:
+            try:
+                with open(os.path.join(directory, f"{filename}.json"), "r") as f:
+                    receipt = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[VersionCatalog] Unreadable receipt for {filename}: {e}")
+
+        db.add(DocumentVersion(
+            tenant_id=tenant_id,
+            control_id=control_id,
+            filename=filename,
+            original_filename=original,
+            file_hash=(receipt or {}).get("file_hash"),
+            version_timestamp=timestamp,
+            ai_status=(receipt or {}).get("final_verdict") or "PENDING",
+            ai_receipt=receipt,
+            is_witnessed=filename not in names
+        ))
+        imported += 1
+    db.commit()
+    if imported:
+        print(f"[VersionCatalog] Indexed {imported} existing revisions from {directory}.")
+    return imported
@@ -0,0 +1,177 @@
+"""
+Streaming ZIP64 writer for large exports (auditor packs).
+
+The archive is produced as an iterator of byte chunks, so it can be handed
+straight to a StreamingResponse or written to a file without staging it first.
+File entries are read and SHA-256 hashed by a small thread pool a few chunks
+ahead of the compressor; the digests are emitted as a manifest entry last.
+Memory stays bounded to roughly workers * READ_AHEAD_CHUNKS * CHUNK_SIZE.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+CHUNK_SIZE = 1024 * 1024 # 1 MiB
+READ_AHEAD_CHUNKS = 4 # Per file being read ahead
+QUEUE_POLL_SECONDS = 0.5
+
+# Already-compressed formats are stored as-is; deflating them costs CPU for no gain
+STORED_EXTS = {
+    ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".zip", ".gz", ".7z", ".docx", ".xlsx", ".pptx", ".mp4", ".mov"
+}
+
+
+@dataclass
+class ZipSource:
+    """One archive entry: either a file on disk (streamed) or small in-memory content."""
+    arcname: str
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+@dataclass
+class _Digest:
+    sha256: str
+
+
+class _ChunkSink:
+    """Write-only file object. No tell()/seek(), so zipfile writes data descriptors instead of seeking back."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _compress_type(arcname: str) -> int:
+    return zipfile.ZIP_STORED if os.path.splitext(arcname)[1].lower() in STORED_EXTS else zipfile.ZIP_DEFLATED
+
+
+def _put(out: queue.Queue, item, cancelled: threading.Event) -> bool:
+    while not cancelled.is_set():
+        try:
+            out.put(item, timeout=QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _read_and_hash(path: str, out: queue.Queue, cancelled: threading.Event):
+    """Reader thread: chunks go to the compressor, the digest (or the OSError) comes last."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                if not _put(out, chunk, cancelled):
+                    return
+    except OSError as e:
+        _put(out, e, cancelled)
+        return
+    _put(out, _Digest(digest.hexdigest()), cancelled)
+
+
+def _zip_info(source: ZipSource) -> zipfile.ZipInfo:
+    try:
+        info = zipfile.ZipInfo.from_file(source.path, source.arcname)
+    except (OSError, TypeError):
+        info = zipfile.ZipInfo(source.arcname, date_time=datetime.now().timetuple()[:6])
+    info.compress_type = _compress_type(source.arcname)
+    return info
+
+
+def _write_file(zf: zipfile.ZipFile, sink: _ChunkSink, source: ZipSource, chunks: queue.Queue):
+    """Generator: streams one file entry, yielding archive bytes. Returns the digest, or None if unreadable."""
+    item = chunks.get()
+    if isinstance(item, OSError):
+        print(f"[ZipStream] Skipping unreadable file {source.path}: {item}")
+        return None
+
+    with zf.open(_zip_info(source), "w", force_zip64=True) as dest:
+        while not isinstance(item, _Digest):
+            if isinstance(item, OSError):
+                raise item # Part of the entry is already sent; the archive can't be repaired
+            dest.write(item)
+            data = sink.drain()
+            if data:
+                yield data
+            item = chunks.get()
+    return item.sha256
+
+
+def stream_zip(sources: Iterable[ZipSource], manifest_name: Optional[str] = None, workers: int = 4,
+               skipped: Optional[list] = None) -> Iterator[bytes]:
+    """
+    Yields a ZIP64 archive of sources, in order. With manifest_name, a JSON map of
+    arcname -> SHA-256 is appended as the final entry. Unreadable files are left
+    out (and their arcnames appended to skipped, if given).
+    """
+    sink = _ChunkSink()
+    manifest = {}
+    cancelled = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="zip-hash")
+    pending = deque()
+    remaining = iter(sources)
+
+    def read_ahead():
+        while len(pending) < max(1, workers):
+            source = next(remaining, None)
+            if source is None:
+                return
+            chunks = None
+            if source.path is not None:
+                chunks = queue.Queue(maxsize=READ_AHEAD_CHUNKS)
+                pool.submit(_read_and_hash, source.path, chunks, cancelled)
+            pending.append((source, chunks))
+
+    try:
+        with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+            read_ahead()
+            while pending:
+                source, chunks = pending.popleft()
+                read_ahead()
+                if chunks is None:
+                    data = source.data or b""
+                    zf.writestr(zipfile.ZipInfo(source.arcname, date_time=datetime.now().timetuple()[:6]),
+                                data, compress_type=_compress_type(source.arcname))
+                    manifest[source.arcname] = hashlib.sha256(data).hexdigest()
+                else:
+                    sha256 = yield from _write_file(zf, sink, source, chunks)
+                    if sha256 is None:
+                        if skipped is not None:
+                            skipped.append(source.arcname)
+                    else:
+                        manifest[source.arcname] = sha256
+                data = sink.drain()
+                if data:
+                    yield data
+
+            if manifest_name:
+                zf.writestr(manifest_name, json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        yield sink.drain()
+    finally:
+        # Client went away or a read failed: stop readers blocked on full queues
+        cancelled.set()
+        pool.shutdown(wait=True)
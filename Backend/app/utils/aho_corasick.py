@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Dict, Hashable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher. add() patterns, build() once, then iter_matches()
+    finds every occurrence of every pattern in a single pass over the text.
+    Matching is exact; callers normalize case before adding and scanning.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Hashable]]] = [[]] # (pattern length, key) ending at this node
+        self._out_link: List[int] = [0] # Nearest suffix node that has output (0 = none)
+        self._built = False
+
+    def __len__(self):
+        return sum(len(o) for o in self._out)
+
+    def add(self, pattern: str, key: Hashable):
+        if not pattern:
+            return # An empty pattern would match everywhere
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._out_link.append(0)
+            node = nxt
+        self._out[node].append((len(pattern), key))
+        self._built = False
+
+    def build(self):
+        """Computes failure and output links breadth-first."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail = self._goto[fallback].get(char, 0)
+                self._fail[child] = fail
+                self._out_link[child] = fail if self._out[fail] else self._out_link[fail]
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, Hashable]]:
+        """Yields (start offset, key) for every occurrence, in order of match end."""
+        if not self._built:
+            self.build()
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            hit = node if out[node] else out_link[node]
+            while hit:
+                for length, key in out[hit]:
+                    yield index - length + 1, key
+                hit = out_link[hit]
+
+    def first_matches(self, text: str) -> Dict[Hashable, int]:
+        """key -> offset of its first occurrence."""
+        first = {}
+        for start, key in self.iter_matches(text):
+            if key not in first or start < first[key]:
+                first[key] = start
+        return first
@@ -0,0 +1,108 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+
+
+@dataclass(frozen=True)
+class ResolvedIdentity:
+    """
+    Everything the request pipeline needs to know about the caller, resolved once.
+    Only plain values are stored so an instance can be shared across DB sessions.
+    """
+    username: str
+    tenant_slug: str              # Effective tenant (token claim or masquerade target)
+    tenant_uuid: str              # Tenant.internal_tenant_id (falls back to tenant_slug)
+    default_tenant_uuid: str      # internal_tenant_id of the shared 'default_tenant'
+    tenant_exists: bool = False
+    token_tenant_id: Optional[str] = None
+    masquerade_target: Optional[str] = None
+    user_id: Optional[int] = None
+    user_tenant_id: Optional[str] = None
+    role: Optional[str] = None
+    is_superuser: bool = False
+    is_active: bool = True
+
+
+class IdentityCache:
+    """
+    Process-wide TTL cache of ResolvedIdentity objects.
+    Key: (token jti or sub, token tenant claim, effective tenant slug).
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(payload: dict, effective_tenant: Optional[str]):
+        subject = payload.get("jti") or payload.get("sub")
+        return (subject, payload.get("tenant_id"), effective_tenant)
+
+    def get(self, key) -> Optional[ResolvedIdentity]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires_at, identity = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return identity
+
+    def set(self, key, identity: ResolvedIdentity):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then the oldest half if still full
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                if len(self._entries) >= self.max_entries:
+                    ordered = sorted(self._entries.items(), key=lambda kv: kv[1][0])
+                    self._entries = dict(ordered[len(ordered) // 2:])
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, identity)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def _get_ttl() -> int:
+    from app.config import settings
+    return settings.IDENTITY_CACHE_TTL_SECONDS
+
+
+identity_cache = IdentityCache(ttl_seconds=_get_ttl())
+
+
+def invalidate_identity_cache(*_args, **_kwargs):
+    """Drop every cached identity. Signature accepts SQLAlchemy mapper event arguments."""
+    identity_cache.clear()
+
+
+def register_invalidation_listeners():
+    """
+    Invalidate on any ORM write to users, tenants or entitlements.
+    Raw SQL writes bypass mapper events; call invalidate_identity_cache() explicitly there.
+    """
+    from app.models.user import User
+    from app.models.tenant import Tenant
+    from app.models.tenant_framework import TenantFramework
+    from app.models.tenant_feature import TenantFeature
+
+    for model in (User, Tenant, TenantFramework, TenantFeature):
+        for event_name in ("after_insert", "after_update", "after_delete"):
+            if not event.contains(model, event_name, invalidate_identity_cache):
+                event.listen(model, event_name, invalidate_identity_cache)
+
+
+register_invalidation_listeners()
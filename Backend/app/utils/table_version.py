@@ -0,0 +1,76 @@
+import threading
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+_versions: List["TableVersion"] = []
+
+
+class TableVersion:
+    """
+    Version counter for caches derived from ORM tables.
+    Bumped on every ORM write to the watched models, on bulk update()/delete() statements
+    against them, and again when the writing transaction commits or rolls back (other
+    sessions only see the change then). Caches record .value when they start building and
+    are stale once it moves on.
+    Raw SQL writes bypass all of this; call bump() explicitly there.
+    """
+
+    def __init__(self, name: str):
+        self.value = 0
+        self._dirty_key = f"{name}_dirty"
+        self._bulk_models: Set[type] = set()
+        self._lock = threading.Lock()
+        _versions.append(self)
+
+    def bump(self, *_args, **_kwargs):
+        """Invalidate every cache built so far. Signature accepts SQLAlchemy event arguments."""
+        with self._lock:
+            self.value += 1
+
+    def watch(self, model, *attrs: str, events=("after_insert", "after_update", "after_delete")):
+        """
+        Track writes to model. With attrs, updates only count when one of them changed
+        (bulk update() statements always count; their values aren't inspected).
+        """
+        self._bulk_models.add(model)
+        for event_name in events:
+            if attrs and event_name == "after_update":
+                event.listen(model, event_name, self._on_attribute_change(attrs))
+            else:
+                event.listen(model, event_name, self._on_change)
+
+    def _on_change(self, mapper, connection, target):
+        self._mark(object_session(target))
+
+    def _on_attribute_change(self, attrs) -> Callable:
+        def listener(mapper, connection, target):
+            state = sa_inspect(target)
+            if any(state.attrs[attr].history.has_changes() for attr in attrs):
+                self._mark(object_session(target))
+        return listener
+
+    def _mark(self, session: Optional[Session]):
+        self.bump()
+        if session is not None:
+            session.info[self._dirty_key] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _on_transaction_end(session):
+    for version in _versions:
+        if session.info.pop(version._dirty_key, False):
+            version.bump()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_statement(orm_execute_state):
+    # update(Model) / delete(Model) statements skip the mapper events
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete) or orm_execute_state.bind_mapper is None:
+        return
+    model = orm_execute_state.bind_mapper.class_
+    for version in _versions:
+        if model in version._bulk_models:
+            version._mark(orm_execute_state.session)
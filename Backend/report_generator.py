@@ -1,20 +1,29 @@
 
 import os
 import json
-import zipfile
-import hashlib
 from datetime import datetime, timedelta
+from app.config import settings
 from app.database import SessionLocal
 from app.models.control import Control, ControlStatus
 from app.models.evidence import Evidence
-from sqlalchemy import func
+from app.services.zip_stream import ZipSource, stream_zip
+from sqlalchemy import func, or_
 
 REPORT_DIR = "data/reports"
 os.makedirs(REPORT_DIR, exist_ok=True)
 
 class ComplianceReporter:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, tenant_id=None, shared_tenant_id=None, db=None):
+        """
+        tenant_id scopes the SoA and auditor pack to one tenant's controls (plus shared_tenant_id's
+        shared controls) and to that tenant's own evidence files. None means every tenant (CLI only).
+        """
+        self.db = db or SessionLocal()
+        self.tenant_id = tenant_id
+        self.shared_tenant_id = shared_tenant_id
+
+    def _control_tenants(self):
+        return [t for t in dict.fromkeys((self.tenant_id, self.shared_tenant_id)) if t]
 
     def get_aggregated_metrics(self):
         """
@@ -90,42 +99,57 @@ class ComplianceReporter:
             }
         }
 
+    def auditor_pack_filename(self):
+        return f"Auditor_Pack_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+    def _pack_sources(self):
+        """
+        SoA plus the stored evidence files of implemented controls, grouped by clause.
+        Rejected / outdated evidence is left out.
+        """
+        sources = [ZipSource("Statement_of_Applicability.md", data=self._generate_soa().encode())]
+
+        query = self.db.query(Evidence.id, Evidence.filename, Evidence.file_path, Control.control_id).join(
+            Control, Evidence.control_id == Control.id
+        ).filter(
+            Control.status == ControlStatus.IMPLEMENTED,
+            or_(Evidence.status.is_(None), Evidence.status.notin_(["rejected", "outdated"]))
+        )
+        if self.tenant_id:
+            # Only this tenant's own files, even on shared controls
+            query = query.filter(Control.tenant_id.in_(self._control_tenants()), Evidence.tenant_id == self.tenant_id)
+        rows = query.order_by(Control.control_id, Evidence.id).all()
+
+        for evidence_id, filename, file_path, control_id in rows:
+            # Determine Clause Folder (e.g., A.5, A.8)
+            clause = control_id.split('.')[1] if '.' in control_id else "General"
+            folder = f"Annex_A_{clause}/{control_id}"
+            sources.append(ZipSource(f"{folder}/{evidence_id}_{os.path.basename(filename)}", path=file_path))
+        return sources
+
+    def iter_auditor_pack(self, start_date=None, end_date=None):
+        """
+        Streams the pack as ZIP64 chunks: SoA, evidence files, then Verification_Manifest.json.
+        All database reads happen before the first chunk, so the session can be closed while streaming.
+        """
+        sources = self._pack_sources()
+        skipped = []
+        yield from stream_zip(sources, manifest_name="Verification_Manifest.json",
+                              workers=settings.AUDITOR_PACK_HASH_WORKERS, skipped=skipped)
+        if skipped:
+            print(f"[AuditorPack] {len(skipped)} evidence files missing from storage: {skipped[:10]}")
+
     def generate_auditor_pack(self, start_date=None, end_date=None):
         """
-        Zips 'Pass' evidence and generates SoA.
+        Writes the streamed pack to REPORT_DIR (background jobs hand out a download path).
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"Auditor_Pack_{timestamp}.zip"
+        zip_filename = self.auditor_pack_filename()
         zip_path = os.path.join(REPORT_DIR, zip_filename)
-        
-        manifest = {}
-        
-        with zipfile.ZipFile(zip_path, 'w') as zf:
-            # 1. Statement of Applicability (Dynamic Generation)
-            soa_content = self._generate_soa()
-            zf.writestr("Statement_of_Applicability.md", soa_content)
-            manifest["Statement_of_Applicability.md"] = hashlib.sha256(soa_content.encode()).hexdigest()
-            
-            # 2. Evidence Files (Grouped by Clause)
-            # Fetch 'IMPLEMENTED' controls as proxy for 'Pass' evidence if no file records
-            controls = self.db.query(Control).filter(Control.status == ControlStatus.IMPLEMENTED).all()
-            
-            for c in controls:
-                # Mock Evidence Content if file doesn't exist
-                evidence_content = f"Evidence for Control {c.control_id}\nVerified on: {datetime.now()}\nStatus: PASS\n"
-                
-                # Determine Clause Folder (e.g., A.5, A.8)
-                clause = c.control_id.split('.')[1] if '.' in c.control_id else "General"
-                folder = f"Annex_A_{clause}/{c.control_id}"
-                filename = f"{folder}/evidence_simulated.txt"
-                
-                zf.writestr(filename, evidence_content)
-                manifest[filename] = hashlib.sha256(evidence_content.encode()).hexdigest()
-
-            # 3. Verification Manifest
-            manifest_json = json.dumps(manifest, indent=2)
-            zf.writestr("Verification_Manifest.json", manifest_json)
-            
+
+        with open(zip_path, "wb") as f:
+            for chunk in self.iter_auditor_pack(start_date, end_date):
+                f.write(chunk)
+
         return zip_path, zip_filename
 
     def _generate_soa(self):
@@ -147,7 +171,10 @@ class ComplianceReporter:
             "|---|---|---|---|"
         ]
         
-        controls = self.db.query(Control).all()
+        query = self.db.query(Control)
+        if self.tenant_id:
+            query = query.filter(Control.tenant_id.in_(self._control_tenants()))
+        controls = query.all()
         for c in controls:
             status = "Applicable" # Simplification
             state = "Implemented" if c.status == ControlStatus.IMPLEMENTED else "Planned"
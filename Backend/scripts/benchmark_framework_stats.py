@@ -0,0 +1,158 @@
+"""
+Benchmark: framework completion stats for the dashboard landing call.
+
+Compares the legacy per-framework COUNT queries (4 per framework) against
+FrameworkStatsEngine (one grouped query for all frameworks) on a synthetic
+in-memory SQLite database. Reports query count and latency, and checks both
+produce identical numbers.
+
+Usage: python scripts/benchmark_framework_stats.py [frameworks] [controls_per_framework]
+"""
+import sys
+import os
+import time
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, or_, and_
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.models  # noqa: F401  (register all tables)
+from app.models.framework import Framework
+from app.models.control import Control, ControlStatus
+from app.models.universal_intent import UniversalIntent, IntentStatus
+from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
+from app.services.framework_stats import FrameworkStatsEngine, crosswalk_framework_code
+
+TENANT_UUID = "bench-tenant-uuid"
+DEFAULT_UUID = "bench-default-uuid"
+
+
+def legacy_framework_stats(db, framework, tenant_uuid, default_tenant_uuid):
+    """The pre-engine implementation: 4 COUNT queries per framework."""
+    tenant_filter = or_(Control.tenant_id == tenant_uuid, Control.tenant_id == default_tenant_uuid)
+    fw_code = crosswalk_framework_code(framework.code)
+
+    def joined():
+        return db.query(Control).outerjoin(
+            IntentFrameworkCrosswalk,
+            and_(
+                Control.control_id == IntentFrameworkCrosswalk.control_reference,
+                IntentFrameworkCrosswalk.framework_id == fw_code
+            )
+        ).outerjoin(
+            UniversalIntent,
+            IntentFrameworkCrosswalk.intent_id == UniversalIntent.id
+        ).filter(Control.framework_id == framework.id, tenant_filter)
+
+    open_intent = or_(UniversalIntent.status != IntentStatus.COMPLETED, UniversalIntent.status == None)
+    total = db.query(Control).filter(Control.framework_id == framework.id, tenant_filter).count()
+    implemented = joined().filter(
+        or_(Control.status == ControlStatus.IMPLEMENTED, UniversalIntent.status == IntentStatus.COMPLETED)
+    ).count()
+    in_progress = joined().filter(Control.status == ControlStatus.IN_PROGRESS, open_intent).count()
+    not_started = joined().filter(Control.status == ControlStatus.NOT_STARTED, open_intent).count()
+
+    return {
+        "total_controls": total,
+        "implemented_controls": implemented,
+        "in_progress_controls": in_progress,
+        "not_started_controls": not_started,
+    }
+
+
+def build_synthetic_db(n_frameworks, controls_per_framework, seed=42):
+    rng = random.Random(seed)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    intents = [
+        UniversalIntent(
+            intent_id=f"INT-{i:04d}",
+            description=f"Intent {i}",
+            category="General",
+            status=IntentStatus.COMPLETED if rng.random() < 0.3 else IntentStatus.PENDING
+        )
+        for i in range(max(10, controls_per_framework // 2))
+    ]
+    db.add_all(intents)
+    db.flush()
+
+    statuses = [ControlStatus.NOT_STARTED, ControlStatus.IN_PROGRESS, ControlStatus.IMPLEMENTED]
+    frameworks = []
+    for f in range(n_frameworks):
+        code = "ISO27001" if f == 0 else f"FW{f}"
+        fw = Framework(name=f"Framework {f}", code=code)
+        db.add(fw)
+        db.flush()
+        frameworks.append(fw)
+        for c in range(controls_per_framework):
+            ref = f"{code}-{c}"
+            db.add(Control(
+                control_id=ref,
+                title=f"Control {ref}",
+                framework_id=fw.id,
+                tenant_id=TENANT_UUID if c % 2 else DEFAULT_UUID,
+                status=rng.choice(statuses).value
+            ))
+            if rng.random() < 0.6:
+                db.add(IntentFrameworkCrosswalk(
+                    intent_id=rng.choice(intents).id,
+                    framework_id=code,
+                    control_reference=ref
+                ))
+    db.commit()
+    # Reload expired attributes now so refreshes aren't counted in either measurement
+    for fw in frameworks:
+        _ = fw.code
+    return engine, db, frameworks
+
+
+def measure(engine, fn):
+    counter = {"queries": 0}
+
+    def _count(*_args, **_kwargs):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    start = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    event.remove(engine, "before_cursor_execute", _count)
+    return result, counter["queries"], elapsed_ms
+
+
+def main():
+    n_frameworks = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    controls_per_framework = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f"Building synthetic DB: {n_frameworks} frameworks x {controls_per_framework} controls...")
+    engine, db, frameworks = build_synthetic_db(n_frameworks, controls_per_framework)
+
+    legacy, legacy_queries, legacy_ms = measure(
+        engine,
+        lambda: {fw.id: legacy_framework_stats(db, fw, TENANT_UUID, DEFAULT_UUID) for fw in frameworks}
+    )
+    engine_result, engine_queries, engine_ms = measure(
+        engine,
+        lambda: FrameworkStatsEngine(db).compute(frameworks, TENANT_UUID, DEFAULT_UUID)
+    )
+
+    mismatches = [fid for fid in legacy if legacy[fid] != engine_result[fid]]
+
+    print(f"{'':<22}{'queries':>10}{'latency (ms)':>16}")
+    print(f"{'Legacy (per framework)':<22}{legacy_queries:>10}{legacy_ms:>16.2f}")
+    print(f"{'FrameworkStatsEngine':<22}{engine_queries:>10}{engine_ms:>16.2f}")
+    if engine_ms > 0:
+        print(f"Speedup: {legacy_ms / engine_ms:.1f}x")
+    print("Results identical." if not mismatches else f"MISMATCH for frameworks: {mismatches}")
+
+    db.close()
+    return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark: cloud resource ingestion on a synthetic provider dump.
+
+Compares the legacy per-resource loop (existence query, encrypt, ORM add/update, one
+print per resource) against the batched pipeline (app.services.resource_ingest) on a
+file-backed SQLite database. Half the dump already exists for the tenant, so both
+paths do a mix of inserts and updates. Legacy output is discarded rather than timed
+against a terminal; both runs must leave identical decrypted metadata behind.
+
+Usage: python scripts/benchmark_resource_ingest.py [resources] [batch_size] [workers]
+"""
+import sys
+import os
+import io
+import time
+import random
+import tempfile
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.models  # noqa: F401  (register all tables)
+from app.models.cloud_resource import CloudResource
+from app.services.metadata_scrubber import MetadataScrubberService, COMPLIANCE_WHITELIST
+from app.services.resource_ingest import ingest_stream
+from app.utils.encryption import SecurityManager
+
+TENANT = "bench_tenant"
+
+
+def synthetic_dump(n_resources, seed=42):
+    """Provider-shaped items: whitelisted compliance fields plus the usual noise."""
+    rng = random.Random(seed)
+    types = list(COMPLIANCE_WHITELIST)
+    dump = []
+    for i in range(n_resources):
+        r_type = types[i % len(types)]
+        raw = {key: rng.choice([True, False, "AES256", 7, "required"]) for key in COMPLIANCE_WHITELIST[r_type]}
+        raw.update({
+            "Name": f"resource-{i}",
+            "Owner": {"DisplayName": "admin", "ID": str(rng.randint(10000, 99999))},
+            "Tags": [{"Key": "CostCenter", "Value": str(rng.randint(1000, 9999))} for _ in range(5)],
+            "Endpoint": {"Address": f"host-{i}.internal", "Port": 5432},
+        })
+        dump.append({"resource_type": r_type, "resource_id": f"arn:aws:{r_type}:us-east-1:123:{i}", "raw_data": raw})
+    return dump
+
+
+def fresh_db(path, existing):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.bulk_insert_mappings(CloudResource, [
+        {"tenant_id": TENANT, "provider": "aws", "resource_type": item["resource_type"],
+         "resource_id": item["resource_id"], "compliance_metadata": "stale"}
+        for item in existing
+    ])
+    db.commit()
+    return engine, db
+
+
+def legacy_ingest(db, provider, resources):
+    """The pre-pipeline loop from MetadataScrubberService.ingest_resources."""
+    count = 0
+    for item in resources:
+        cleaned = MetadataScrubberService.scrub_resource(item["resource_type"], item["raw_data"])
+        payload = SecurityManager.encrypt_metadata(cleaned)
+        existing = db.query(CloudResource).filter(
+            CloudResource.resource_id == item["resource_id"],
+            CloudResource.tenant_id == TENANT
+        ).first()
+        if existing:
+            existing.compliance_metadata = payload
+            print(f"  -> Updated {item['resource_id']} (Encrypted)")
+        else:
+            db.add(CloudResource(tenant_id=TENANT, provider=provider, resource_type=item["resource_type"],
+                                 resource_id=item["resource_id"], compliance_metadata=payload))
+            print(f"  -> Created {item['resource_id']} (Encrypted)")
+        count += 1
+    db.commit()
+    return count
+
+
+def snapshot(db):
+    return {
+        r.resource_id: SecurityManager.decrypt_metadata(r.compliance_metadata)
+        for r in db.query(CloudResource).filter(CloudResource.tenant_id == TENANT)
+    }
+
+
+def main():
+    n_resources = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    print(f"Building synthetic provider dump: {n_resources} resources (half already stored)...")
+    dump = synthetic_dump(n_resources)
+    existing = dump[::2]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, db = fresh_db(os.path.join(tmp, "legacy.db"), existing)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_ingest(db, "aws", dump)
+        legacy_s = time.perf_counter() - start
+        legacy_rows = snapshot(db)
+        db.close()
+        engine.dispose()
+
+        engine, db = fresh_db(os.path.join(tmp, "pipeline.db"), existing)
+        stats = ingest_stream(db, TENANT, "aws", iter(dump), batch_size=batch_size, workers=workers)
+        pipeline_rows = snapshot(db)
+        db.close()
+        engine.dispose()
+
+    print(f"{'':<34}{'seconds':>12}{'resources/s':>14}")
+    print(f"{'Legacy per-resource loop':<34}{legacy_s:>12.2f}{n_resources / legacy_s:>14.0f}")
+    print(f"{f'Pipeline (batch {batch_size}, {workers} workers)':<34}{stats.total_seconds:>12.2f}{stats.per_second:>14.0f}")
+    print(f"  waiting on encryption {stats.encrypt_wait_seconds:.2f}s, writing {stats.write_seconds:.2f}s, "
+          f"{stats.batches} batches, {stats.created} created / {stats.updated} updated")
+    if stats.total_seconds > 0:
+        print(f"Speedup: {legacy_s / stats.total_seconds:.1f}x")
+
+    identical = legacy_rows == pipeline_rows and len(pipeline_rows) == n_resources
+    print("Stored metadata identical." if identical else "MISMATCH between legacy and pipeline results.")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+import httpx
+from app.services.ai_gateway import AIGateway, AIGatewayError, chat_payload
+
+
+class StubLLM:
+    """Local stand-in for the chat-completions endpoint."""
+
+    def __init__(self, delay=0.05, failures=0, status=429):
+        self.delay = delay
+        self.failures = failures
+        self.status = status
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    async def __call__(self, request: httpx.Request):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        try:
+            await asyncio.sleep(self.delay)
+            if fail:
+                return httpx.Response(self.status, headers={"retry-after": "0"}, text="slow down")
+            return httpx.Response(200, json={"choices": [{"message": {"content": f"ok {request.url.path}"}}]})
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _gateway(stub, **kwargs):
+    return AIGateway(base_url="http://stub.local/v1", api_key="test", transport=httpx.MockTransport(stub),
+                     backoff_base=0.01, **kwargs)
+
+
+def _payload(text):
+    return chat_payload("system", text, "stub-model", 10, 0.0)
+
+
+def test_coalesces_identical_prompts_and_bounds_concurrency():
+    stub = StubLLM(delay=0.1)
+    gateway = _gateway(stub, max_concurrency=2, tenant_rate_per_minute=6000, tenant_burst=100)
+
+    async def run():
+        same = [gateway.achat(_payload("same prompt")) for _ in range(10)]
+        distinct = [gateway.achat(_payload(f"prompt {i}")) for i in range(6)]
+        return await asyncio.gather(*same, *distinct)
+
+    results = asyncio.run(run())
+    assert results[0] == "ok /v1/chat/completions"
+    assert stub.calls == 7 # 10 identical prompts -> 1 upstream call
+    assert stub.peak <= 2
+    assert gateway.stats["coalesced"] == 9
+    gateway.close()
+
+
+def test_retries_with_backoff_then_gives_up():
+    stub = StubLLM(delay=0, failures=2)
+    gateway = _gateway(stub, max_retries=3)
+    assert gateway.chat(_payload("retry me")) == "ok /v1/chat/completions"
+    assert stub.calls == 3 and gateway.stats["retries"] == 2
+
+    stub = StubLLM(delay=0, failures=10, status=503)
+    gateway_fail = _gateway(stub, max_retries=1)
+    try:
+        gateway_fail.chat(_payload("always fails"))
+        assert False, "expected AIGatewayError"
+    except AIGatewayError as e:
+        assert e.status_code == 503
+    assert stub.calls == 2
+    gateway.close()
+    gateway_fail.close()
+
+
+def test_tenant_token_bucket_throttles_only_that_tenant():
+    stub = StubLLM(delay=0)
+    gateway = _gateway(stub, tenant_rate_per_minute=600, tenant_burst=1) # 10/s per tenant
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*[gateway.achat(_payload(f"a{i}"), tenant_id="acme") for i in range(4)])
+        throttled = time.monotonic() - start
+        start = time.monotonic()
+        await gateway.achat(_payload("b0"), tenant_id="globex")
+        return throttled, time.monotonic() - start
+
+    throttled, other = asyncio.run(run())
+    assert throttled >= 0.25 # burst 1, then ~0.1s per token
+    assert other < 0.1
+    gateway.close()
+
+
+def test_caller_loop_stays_free_during_slow_call():
+    stub = StubLLM(delay=0.3)
+    gateway = _gateway(stub)
+
+    async def run():
+        ticks = 0
+        task = asyncio.ensure_future(gateway.achat(_payload("slow")))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        return ticks, task.result()
+
+    ticks, result = asyncio.run(run())
+    assert result.startswith("ok")
+    assert ticks > 10
+    gateway.close()
+
+
+def test_service_calls_draw_from_the_callers_tenant_bucket(monkeypatch):
+    from app.config import settings
+    from app.services import ai_gateway as gateway_module
+    from app.services import ai_service
+
+    stub = StubLLM(delay=0)
+    gateway = _gateway(stub, tenant_rate_per_minute=600, tenant_burst=1) # 10/s per tenant
+    monkeypatch.setattr(gateway_module, "ai_gateway", gateway) # cached_chat looks it up per call
+    monkeypatch.setattr(ai_service, "ai_gateway", gateway)
+    monkeypatch.setattr(ai_service, "client", object())
+    monkeypatch.setattr(ai_service, "PROVIDER", "openai")
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+
+    start = time.monotonic()
+    for i in range(3):
+        ai_service.rewrite_text(f"draft {i}", "tighten", tenant_id="acme")
+    throttled = time.monotonic() - start
+
+    start = time.monotonic()
+    ai_service.suggest_justification("Backups", "A.8.13", "Technological", tenant_id="globex")
+    other = time.monotonic() - start
+
+    assert set(gateway._buckets) == {"acme", "globex"}
+    assert throttled >= 0.15 # acme drained its own burst
+    assert other < 0.1 # globex starts with a full bucket
+    assert stub.calls == 4
+    gateway.close()
+
+
+def test_async_ai_endpoints_await_the_gateway(monkeypatch):
+    from app.config import settings
+    from app.services import ai_gateway as gateway_module
+    from app.services import ai_service
+    from app.api import ai as ai_api
+
+    stub = StubLLM(delay=0.3)
+    gateway = _gateway(stub)
+    monkeypatch.setattr(gateway_module, "ai_gateway", gateway)
+    monkeypatch.setattr(ai_service, "ai_gateway", gateway)
+    monkeypatch.setattr(ai_service, "client", object())
+    monkeypatch.setattr(ai_service, "PROVIDER", "openai")
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+
+    async def run():
+        ticks = 0
+        calls = asyncio.gather(
+            ai_api.generate_artifact_endpoint(ai_api.ArtifactGenerationRequest(control_title="Backups", artifact_name="Backup Plan", context="AWS"), tenant_id="acme"),
+            ai_api.suggest_justification_endpoint(ai_api.JustificationRequest(control_id="A.8.13", title="Backups", category="Inclusion"), tenant_id="acme"),
+            ai_api.gap_analysis_endpoint(ai_api.GapAnalysisRequest(control_title="Backups", requirements=[{"name": "Backup log"}], uploaded_files=[]), tenant_id="acme"),
+        )
+        while not calls.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        return ticks, calls.result()
+
+    ticks, (artifact, justification, gap) = asyncio.run(run())
+    assert artifact["content"].startswith("ok")
+    assert justification["justification"].startswith("ok")
+    assert gap["status"] == "NOT_MET" # stub reply isn't JSON
+    assert stub.peak == 3 # all three in flight at once, on one loop
+    assert ticks > 10
+    gateway.close()
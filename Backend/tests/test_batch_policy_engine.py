@@ -0,0 +1,102 @@
+import threading
+import time
+from app.services.batch_policy_engine import BatchPolicyEngine, PolicyCheckpointStore, profile_key
+
+
+class StubPolicyService:
+    def __init__(self, fail=(), delay=0.0):
+        self.fail = set(fail)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_policy(self, policy_name, company_name, temperature, cloud_stack, tenant_id):
+        with self._lock:
+            self.calls.append((policy_name, tenant_id))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if policy_name in self.fail:
+            return {"success": False, "error": "upstream 503"}
+        return {
+            "success": True,
+            "policy_name": policy_name,
+            "content": f"# {policy_name} for {company_name}",
+            "metadata": {"word_count": 5},
+            "validation": {"valid": True},
+            "intent_coverage": {"audit_ready": True, "coverage_percentage": 100.0}
+        }
+
+
+def test_parallel_run_checkpoints_and_resumes(tmp_path):
+    names = [f"Policy {i}" for i in range(8)]
+    store = PolicyCheckpointStore(str(tmp_path))
+    progress = []
+
+    flaky = StubPolicyService(fail={"Policy 3"}, delay=0.05)
+    summary = BatchPolicyEngine(flaky, max_workers=4, checkpoints=store).run(
+        names, {"company_name": "Acme"}, tenant_id="t1", on_progress=progress.append
+    )
+    assert (summary["successful"], summary["failed"]) == (7, 1)
+    assert flaky.peak > 1 and flaky.peak <= 4
+    assert progress[-1]["completed"] == 8 and progress[-1]["eta_seconds"] in (None, 0.0)
+
+    # Resume: only the failed policy is generated again
+    retry = StubPolicyService()
+    summary = BatchPolicyEngine(retry, max_workers=4, checkpoints=store).run(names, {"company_name": "Acme"}, tenant_id="t1")
+    assert retry.calls == [("Policy 3", "t1")]
+    assert (summary["successful"], summary["reused"]) == (8, 7)
+
+
+def test_tenants_with_same_profile_share_results(tmp_path):
+    store = PolicyCheckpointStore(str(tmp_path))
+    service = StubPolicyService()
+    engine = BatchPolicyEngine(service, max_workers=2, checkpoints=store)
+
+    engine.run(["Access Control Policy"], {"company_name": "Acme ", "cloud_stack": None}, tenant_id="t1")
+    summary = engine.run(["Access Control Policy"], {"company_name": "Acme"}, tenant_id="t2")
+    assert len(service.calls) == 1
+    assert summary["reused"] == 1
+
+    engine.run(["Access Control Policy"], {"company_name": "Globex"}, tenant_id="t3")
+    assert len(service.calls) == 2
+    assert profile_key({"company_name": "Acme"}) != profile_key({"company_name": "Globex"})
+
+
+
+class _JobContext:
+    tenant_id = "tenant-a"
+
+    def progress(self, fraction, message=None):
+        pass
+
+
+def test_batch_job_with_failures_raises_so_the_retry_resumes(tmp_path, monkeypatch):
+    import pytest
+    import app.services.batch_policy_engine as batch_policy_engine
+    from app.services.job_handlers import generate_policy_batch_job
+    from app.services.job_queue import PartialJobError
+
+    store = PolicyCheckpointStore(str(tmp_path))
+    service = StubPolicyService(fail={"Policy 1"})
+
+    class TestEngine(BatchPolicyEngine):
+        def __init__(self):
+            super().__init__(service=service, checkpoints=store)
+
+    monkeypatch.setattr(batch_policy_engine, "BatchPolicyEngine", TestEngine)
+    payload = {"policy_names": ["Policy 0", "Policy 1", "Policy 2"]}
+
+    with pytest.raises(PartialJobError, match="Policy 1") as exc: # Not NonRetryableJobError: the queue retries
+        generate_policy_batch_job(_JobContext(), payload)
+    assert exc.value.result["failed"] == 1 and exc.value.result["policies"]["Policy 0"]["success"]
+
+    service.fail.clear()
+    service.calls.clear()
+    summary = generate_policy_batch_job(_JobContext(), payload)
+    assert summary["failed"] == 0 and summary["reused"] == 2
+    assert service.calls == [("Policy 1", "tenant-a")]
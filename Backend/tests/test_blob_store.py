@@ -0,0 +1,48 @@
+import io
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.framework import Framework
+from app.models.control import Control
+from app.models.evidence import Evidence
+from app.models.evidence_blob import EvidenceBlob
+from app.services.blob_store import BlobStore, LocalBlobBackend
+
+
+def test_blob_store_dedupes_and_collects_unreferenced(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    store = BlobStore(LocalBlobBackend(str(tmp_path)))
+
+    fw = Framework(name="Blob FW", code="BLOB")
+    db.add(fw)
+    db.flush()
+    control = Control(control_id="B.1", title="Blob", framework_id=fw.id)
+    db.add(control)
+    db.flush()
+
+    payload = b"%PDF-1.4 policy" * 200_000 # > several chunks
+    first = store.put_stream(db, io.BytesIO(payload), "policy.pdf")
+    second = store.put_stream(db, io.BytesIO(payload), "copy.pdf")
+    assert not first.deduplicated and second.deduplicated
+    assert first.storage_path == second.storage_path and first.size == len(payload)
+    assert db.query(EvidenceBlob).count() == 1
+    assert os.listdir(tmp_path / "tmp") == [] # temp copies cleaned up
+
+    for _ in range(2):
+        db.add(Evidence(filename="policy.pdf", file_path=first.storage_path, title="Policy",
+                        control_id=control.id, content_hash=first.sha256))
+    orphan = store.put_stream(db, io.BytesIO(b"unreferenced"), "orphan.txt")
+    db.commit()
+
+    # Grace period protects fresh uploads
+    assert store.collect_garbage(db, grace_seconds=3600) == 0
+    assert db.get(EvidenceBlob, first.sha256).ref_count == 2
+
+    assert store.collect_garbage(db, grace_seconds=-1) == 1
+    assert not os.path.exists(orphan.storage_path)
+    assert os.path.exists(first.storage_path)
+    db.close()
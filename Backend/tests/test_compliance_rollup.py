@@ -0,0 +1,76 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.framework import Framework
+from app.models.control import Control
+from app.models.compliance_result import ComplianceResult
+from app.models.compliance_rollup import ComplianceRollup
+from app.services.compliance_rollup import rebuild_compliance_rollup
+
+
+def _snapshot(db):
+    return sorted(
+        (r.tenant_id, r.framework_id, r.domain, r.total_count, r.pass_count,
+         r.fail_count, r.implemented_count, r.not_applicable_count)
+        for r in db.query(ComplianceRollup).all()
+    )
+
+
+def _assert_matches_full_rebuild(db):
+    incremental = _snapshot(db)
+    rebuild_compliance_rollup(db)
+    assert incremental == _snapshot(db)
+
+
+def test_rollup_incremental_matches_rebuild():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    fw = Framework(name="Rollup FW", code="ROLLUP")
+    db.add(fw)
+    db.flush()
+    db.add_all([
+        Control(control_id="R.1", title="One", framework_id=fw.id, domain="Access"),
+        Control(control_id="R.2", title="Two", framework_id=fw.id, domain="Access"),
+        Control(control_id="R.3", title="Three", framework_id=fw.id, domain=None),
+    ])
+    db.add_all([
+        ComplianceResult(tenant_id="acme", control_id="R.1", status="PASS"),
+        ComplianceResult(tenant_id="acme", control_id="R.2", status="FAIL"),
+        ComplianceResult(tenant_id="acme", control_id="R.3", status="PASS"),
+        ComplianceResult(tenant_id="globex", control_id="R.1", status="FAIL"),
+    ])
+    db.commit()
+
+    access = db.query(ComplianceRollup).filter_by(tenant_id="acme", domain="Access").one()
+    assert (access.total_count, access.pass_count, access.fail_count) == (2, 1, 1)
+    assert db.query(ComplianceRollup).filter_by(tenant_id="acme", domain="Uncategorized").one().pass_count == 1
+    _assert_matches_full_rebuild(db)
+
+    # Result status flip
+    result = db.query(ComplianceResult).filter_by(tenant_id="acme", control_id="R.2").one()
+    result.status = "PASS"
+    db.commit()
+    assert db.query(ComplianceRollup).filter_by(tenant_id="acme", domain="Access").one().pass_count == 2
+    _assert_matches_full_rebuild(db)
+
+    # Control moves domain; status and applicability change
+    control = db.query(Control).filter_by(control_id="R.1").one()
+    control.domain = "Operations"
+    control.status = "implemented"
+    control.is_applicable = False
+    db.commit()
+    ops = db.query(ComplianceRollup).filter_by(tenant_id="globex", domain="Operations").one()
+    assert (ops.total_count, ops.implemented_count, ops.not_applicable_count) == (1, 1, 1)
+    assert db.query(ComplianceRollup).filter_by(tenant_id="globex", domain="Access").first() is None
+    _assert_matches_full_rebuild(db)
+
+    # Result deletion
+    db.delete(db.query(ComplianceResult).filter_by(tenant_id="acme", control_id="R.3").one())
+    db.commit()
+    assert db.query(ComplianceRollup).filter_by(tenant_id="acme", domain="Uncategorized").first() is None
+    _assert_matches_full_rebuild(db)
+
+    db.close()
@@ -0,0 +1,64 @@
+import json
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models import Control, Evidence, Framework
+from app.services.framework_stats import ensure_requirement_counts, framework_compliance_summary
+
+
+def _seed(db, controls=12):
+    framework = Framework(name="ISO 27001", code="ISO27001")
+    db.add(framework)
+    db.flush()
+    statuses = ["implemented", "in_progress", "not_started", "Implemented", None, "deferred"]
+    for i in range(controls):
+        control = Control(control_id=f"C.{i}", title=f"Control {i}", framework_id=framework.id,
+                          status=statuses[i % len(statuses)])
+        if i % 3 == 0:
+            control.ai_requirements_json = json.dumps([{"Requirement": "r"}])
+        elif i % 3 == 1:
+            control.ai_requirements_json = "[]"
+        db.add(control)
+        db.flush()
+        if i % 2 == 0:
+            for n in range(2): # Several items on one control still count it once
+                db.add(Evidence(title=f"E{i}.{n}", filename="e.pdf", file_path="e.pdf", control_id=control.id))
+    db.commit()
+    return framework
+
+
+def test_summary_matches_legacy_shape_in_constant_queries():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    framework = _seed(db, controls=12)
+    db.refresh(framework)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    summary = framework_compliance_summary(db, framework)
+
+    assert len(statements) == 1
+    assert summary["total_controls"] == 12
+    assert summary["controls_with_requirements"] == 4
+    assert summary["controls_with_evidence"] == 6
+    assert summary["evidence_coverage_pct"] == 50.0
+    assert summary["status_breakdown"] == {"implemented": 4, "in_progress": 2, "not_started": 4, "other": 2}
+    assert summary["compliance_score"] == round(4 / 12 * 100, 1)
+
+
+def test_requirement_counts_backfilled_for_rows_written_outside_the_orm():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    framework = _seed(db, controls=3)
+    db.execute(text("UPDATE controls SET ai_requirements_count = NULL, ai_requirements_json = :j WHERE control_id = 'C.1'"),
+               {"j": json.dumps(["a", "b"])})
+    db.commit()
+
+    assert ensure_requirement_counts(engine, db) == 1
+    assert framework_compliance_summary(db, framework)["controls_with_requirements"] == 2
+    assert ensure_requirement_counts(engine, db) == 0
@@ -0,0 +1,67 @@
+import json
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models import Control, Framework
+from app.models.control_mapping import ControlMapping
+from app.services.data_adapter import AuditMode, DataSourceAdapter
+
+
+def _setup(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    fw = Framework(name="View FW", code="VIEW")
+    db.add(fw)
+    db.flush()
+    source = Control(control_id="A.5.1", title="Source", framework_id=fw.id)
+    target = Control(control_id="PR.AA-01", title="Target", framework_id=fw.id)
+    excluded = Control(control_id="PR.AA-02", title="Excluded", framework_id=fw.id, is_applicable=False)
+    db.add_all([source, target, excluded])
+    db.flush()
+    db.add_all([
+        ControlMapping(source_control_id=source.id, target_control_id=target.id),
+        ControlMapping(source_control_id=source.id, target_control_id=excluded.id),
+    ])
+    db.commit()
+
+    store = tmp_path / "mock_evidence_store.json"
+    store.write_text(json.dumps({"current_evidence": [
+        {"id": "EV-1", "control_id": "A.5.1", "status": "PENDING", "evidence_files": []},
+        {"id": "EV-2", "control_id": "A.5.2", "status": "VERIFIED", "evidence_files": []},
+    ]}))
+    adapter = DataSourceAdapter()
+    adapter.mode = AuditMode.SIMULATION
+    adapter.mock_file = str(store)
+    return engine, db, adapter, store
+
+
+def test_view_is_cached_indexed_and_written_through(tmp_path):
+    engine, db, adapter, store = _setup(tmp_path)
+
+    items = adapter.get_all_evidence(db)
+    assert [i["id"] for i in items] == ["EV-1", "EV-1_INHERITED_PR.AA-01", "EV-1_INHERITED_PR.AA-02", "EV-2"]
+    assert adapter.get_evidence_for_control(db, "PR.AA-01")[0]["source_control"] == "A.5.1"
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert adapter.get_evidence_by_id(db, "EV-2")["status"] == "VERIFIED"
+    assert adapter.get_status_counts(db) == {"PENDING": 2, "NOT_APPLICABLE": 1, "VERIFIED": 1}
+    assert statements == [] # Served from the cached view
+
+    # Review: persisted, patched into the view (SOA-excluded copy untouched), no rebuild
+    assert adapter.update_evidence_status("EV-1_INHERITED_PR.AA-01", "NON_CONFORMITY", "Missing scope")
+    assert json.loads(store.read_text())["current_evidence"][0]["status"] == "NON_CONFORMITY"
+    assert adapter.get_status_counts(db)["NON_CONFORMITY"] == 2
+    assert adapter.get_evidence_by_id(db, "EV-1_INHERITED_PR.AA-02")["status"] == "NOT_APPLICABLE"
+    assert statements == []
+    assert not adapter.update_evidence_status("EV-404", "VERIFIED")
+
+    # Control changes invalidate the view
+    db.query(Control).filter(Control.control_id == "PR.AA-02").one().is_applicable = True
+    db.commit()
+    assert adapter.get_evidence_by_id(db, "EV-1_INHERITED_PR.AA-02")["status"] == "NON_CONFORMITY"
+    db.close()
@@ -0,0 +1,66 @@
+import io
+import json
+import os
+from dataclasses import asdict
+
+import docx
+from app.services import document_extraction
+from app.services.document_extraction import DocumentTextCache, ExtractedDocument, extract_document
+
+
+def _docx_bytes(paragraphs):
+    buffer = io.BytesIO()
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_extract_once_per_hash_and_lazy_truncation(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_extraction, "document_text_cache", DocumentTextCache(str(tmp_path), max_chars=10_000_000))
+    parses = []
+    real_extract = document_extraction._extract
+    monkeypatch.setattr(document_extraction, "_extract", lambda *a: parses.append(a[1]) or real_extract(*a))
+
+    stream = _docx_bytes([f"Paragraph {i} " + "x" * 200 for i in range(40)])
+    first = extract_document(stream, "policy.docx")
+    assert stream.tell() == 0 # Rewound for the caller
+    assert len(first.pages) > 1 and first.page_map[1]["start"] == len(first.pages[0])
+    assert first.text(100) == first.text()[:100]
+
+    # Same bytes again (new stream, same hash): no re-parse; the disk tier survives a fresh process cache
+    again = extract_document(_docx_bytes([f"Paragraph {i} " + "x" * 200 for i in range(40)]), "policy.docx", content_hash=first.content_hash)
+    assert again is first
+    monkeypatch.setattr(document_extraction, "document_text_cache", DocumentTextCache(str(tmp_path)))
+    assert extract_document(io.BytesIO(b""), "policy.docx", content_hash=first.content_hash).pages == first.pages
+    assert parses == ["docx"]
+
+
+def test_confidential_extraction_is_not_cached(tmp_path, monkeypatch):
+    cache = DocumentTextCache(str(tmp_path))
+    monkeypatch.setattr(document_extraction, "document_text_cache", cache)
+    doc = extract_document(io.BytesIO(b"secret text"), "note.txt", content_hash="abc", cache=False)
+    assert isinstance(doc, ExtractedDocument) and doc.text() == "secret text"
+    assert cache.get("abc", "txt") is None
+    assert not any(tmp_path.iterdir())
+
+
+def test_disk_tier_is_pruned_least_recently_used_first(tmp_path):
+    docs = [ExtractedDocument(content_hash=f"{i:02d}" * 32, ext="txt", pages=["x" * 1000]) for i in range(4)]
+    doc_bytes = len(json.dumps(asdict(docs[0])).encode("utf-8"))
+    cache = DocumentTextCache(str(tmp_path), max_chars=10_000_000, max_disk_bytes=doc_bytes * 3)
+    paths = [cache._path(cache._key(d.content_hash, d.ext)) for d in docs]
+
+    (tmp_path / "old.txt.v0.json").write_text("{}") # Superseded extractor version
+    for i, doc in enumerate(docs[:3]):
+        cache.put(doc)
+        os.utime(paths[i], (1000 + i, 1000 + i))
+    # A disk hit makes the oldest entry the most recent one
+    assert DocumentTextCache(str(tmp_path)).get(docs[0].content_hash, "txt").pages == docs[0].pages
+
+    cache.put(docs[3])
+    remaining = [os.path.exists(p) for p in paths]
+    assert remaining == [True, False, True, True]
+    assert not (tmp_path / "old.txt.v0.json").exists()
@@ -0,0 +1,71 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.framework import Framework
+from app.models.control import Control
+from app.models.evidence import Evidence
+from app.models.universal_intent import UniversalIntent
+from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
+from app.services.evidence_sync_service import sync_evidence_by_intent, sync_intents_bulk
+
+
+def _setup(n_frameworks=6):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    intent = UniversalIntent(intent_id="INT-ORG-CHART", description="Org chart", category="Governance")
+    db.add(intent)
+    db.flush()
+
+    controls = []
+    for i in range(n_frameworks):
+        fw = Framework(name=f"FW {i}", code=f"FW{i}")
+        db.add(fw)
+        db.flush()
+        ctrl = Control(control_id=f"FW{i}-1", title=f"Control {i}", framework_id=fw.id)
+        db.add(ctrl)
+        db.flush()
+        controls.append(ctrl)
+        db.add(IntentFrameworkCrosswalk(intent_id=intent.id, framework_id=fw.code, control_reference=ctrl.control_id))
+
+    ev = Evidence(filename="org_chart.pdf", file_path="/tmp/org_chart.pdf", title="Org Chart",
+                  control_id=controls[0].id, master_intent_id="INT-ORG-CHART")
+    db.add(ev)
+    db.commit()
+    return engine, db, controls, ev
+
+
+def _count_queries(engine, fn):
+    counter = {"n": 0}
+
+    def _count(*_args, **_kwargs):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return result, counter["n"]
+
+
+def test_propagation_is_set_based_and_idempotent():
+    engine, db, controls, ev = _setup(n_frameworks=6)
+
+    created, queries_small = _count_queries(engine, lambda: sync_evidence_by_intent(db, ev.id, "INT-ORG-CHART"))
+    assert created == 5 # every mapped control except the source
+    assert db.query(Evidence).filter(Evidence.validation_source == "automated_gravity").count() == 5
+
+    # Re-running is a no-op thanks to the anti-join
+    assert sync_evidence_by_intent(db, ev.id, "INT-ORG-CHART") == 0
+    assert sync_intents_bulk(db, ["INT-ORG-CHART"]) == 0
+    db.close()
+
+    # Fan-out does not change the statement count
+    engine, db, controls, ev = _setup(n_frameworks=30)
+    created, queries_large = _count_queries(engine, lambda: sync_evidence_by_intent(db, ev.id, "INT-ORG-CHART"))
+    assert created == 29
+    assert queries_large == queries_small
+    db.close()
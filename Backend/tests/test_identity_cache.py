@@ -0,0 +1,110 @@
+import time
+import uuid
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import app.models  # noqa: F401
+from app.main import app
+from app.database import Base, get_db
+from app.models.user import User
+from app.models.tenant import Tenant
+from app.utils.security import create_access_token, get_password_hash
+from app.utils.identity_cache import IdentityCache, ResolvedIdentity, identity_cache
+
+client = TestClient(app)
+
+
+def _setup_tenant_user(Session):
+    slug = f"idcache_{uuid.uuid4().hex[:8]}"
+    username = f"idcache_user_{uuid.uuid4().hex[:8]}"
+    db = Session()
+    tenant = Tenant(name=slug, slug=slug, encryption_key="test-key")
+    db.add(tenant)
+    db.commit()
+    db.refresh(tenant)
+    user = User(
+        username=username,
+        email=f"{username}@test.com",
+        hashed_password=get_password_hash("pw"),
+        full_name=username,
+        tenant_id=tenant.internal_tenant_id,
+        is_active=True
+    )
+    db.add(user)
+    db.commit()
+    db.close()
+    return slug, username
+
+
+def _count_statements(engine, fn, needle):
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        response = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    return response, len([s for s in statements if needle in s])
+
+
+def test_ttl_cache_expiry_and_clear():
+    cache = IdentityCache(ttl_seconds=1)
+    key = IdentityCache.make_key({"sub": "alice", "tenant_id": "acme"}, "acme")
+    identity = ResolvedIdentity(username="alice", tenant_slug="acme", tenant_uuid="uuid-1", default_tenant_uuid="uuid-0")
+
+    cache.set(key, identity)
+    assert cache.get(key) is identity
+
+    cache.clear()
+    assert cache.get(key) is None
+
+    cache.set(key, identity)
+    time.sleep(1.1)
+    assert cache.get(key) is None
+
+
+def test_identity_resolved_once_and_invalidated_on_write():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    slug, username = _setup_tenant_user(Session)
+    token = create_access_token(data={"sub": username, "tenant_id": slug})
+    headers = {"Authorization": f"Bearer {token}"}
+    identity_cache.clear()
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        # Cold: tenants are resolved exactly once for the whole dependency chain
+        res, tenant_queries = _count_statements(engine, lambda: client.get("/api/v1/controls/", headers=headers), "FROM tenants")
+        assert res.status_code == 200
+        assert tenant_queries == 1
+
+        # Warm: no Tenant lookups at all
+        res, tenant_queries = _count_statements(engine, lambda: client.get("/api/v1/controls/", headers=headers), "FROM tenants")
+        assert res.status_code == 200
+        assert tenant_queries == 0
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    # Writing a user invalidates the cache
+    db = Session()
+    user = db.query(User).filter(User.username == username).first()
+    user.full_name = "Renamed"
+    db.commit()
+    db.close()
+    assert len(identity_cache) == 0
+
+if __name__ == "__main__":
+    test_ttl_cache_expiry_and_clear()
+    test_identity_resolved_once_and_invalidated_on_write()
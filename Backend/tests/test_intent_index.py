@@ -0,0 +1,111 @@
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.framework import Framework
+from app.models.control import Control
+from app.models.control_mapping import ControlMapping
+from app.models.universal_intent import UniversalIntent
+from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
+from app.services.intent_index import get_intent_index
+
+
+def test_index_links_crosswalk_and_mappings_and_refreshes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    fw = Framework(name="Index FW", code="IDX")
+    db.add(fw)
+    db.flush()
+    a, b, c = (Control(control_id=f"IDX-{n}", title=f"Control {n}", framework_id=fw.id) for n in (1, 2, 3))
+    db.add_all([a, b, c])
+    intent = UniversalIntent(intent_id="INT-IDX", description="Index", category="General")
+    db.add(intent)
+    db.flush()
+    db.add_all([
+        IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="IDX", control_reference="IDX-1"),
+        IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="IDX", control_reference="IDX-2"),
+    ])
+    db.commit()
+
+    index = get_intent_index(db)
+    assert index.linked_refs("IDX-1") == {"IDX-2"}
+    assert index.mapped_control_ids(a.id) == frozenset()
+
+    # New mapping invalidates the shared index
+    db.add(ControlMapping(source_control_id=a.id, target_control_id=c.id))
+    db.commit()
+    index = get_intent_index(db)
+    assert index.mapped_control_ids(c.id) == {a.id}
+    db.close()
+
+
+def test_graph_closure_shared_intents_and_versioned_rebuild():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    iso = Framework(name="Graph ISO", code="GISO")
+    soc = Framework(name="Graph SOC", code="GSOC")
+    db.add_all([iso, soc])
+    db.flush()
+    a = Control(control_id="G-1", title="A", framework_id=iso.id)
+    b = Control(control_id="CC-1", title="B", framework_id=soc.id)
+    c = Control(control_id="CC-2", title="C", framework_id=soc.id)
+    d = Control(control_id="G-9", title="D", framework_id=iso.id)
+    intent = UniversalIntent(intent_id="INT-GRAPH", description="Graph", category="Access Control")
+    db.add_all([a, b, c, d, intent])
+    db.flush()
+    db.add_all([
+        IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="GISO", control_reference="G-1"),
+        IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="GSOC", control_reference="CC-1"),
+        IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="GISO", control_reference="G-2"), # No control yet
+        ControlMapping(source_control_id=b.id, target_control_id=c.id),
+    ])
+    db.commit()
+
+    graph = get_intent_index(db)
+    assert graph.shared_intent_controls("G-1") == [("INT-GRAPH", b.id)]
+    assert graph.intent_categories["INT-GRAPH"] == "Access Control"
+    assert graph.mapping_targets_of(b.id) == (c.id,)
+    # a -> b via the shared intent, b -> c via ControlMapping
+    assert graph.closure(a.id) == {a.id, b.id, c.id}
+    assert graph.closure(d.id) == {d.id}
+    assert get_intent_index(db) is graph # Unchanged tables: same snapshot
+
+    # Status updates leave the snapshot alone; a new reference replaces it
+    d.status = "implemented"
+    db.commit()
+    assert get_intent_index(db) is graph
+    d.control_id = "G-2"
+    db.commit()
+    rebuilt = get_intent_index(db)
+    assert rebuilt is not graph and rebuilt.version > graph.version
+    assert rebuilt.closure(d.id) == {a.id, b.id, c.id, d.id}
+    db.close()
+
+
+def test_bulk_statements_refresh_the_index():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    fw = Framework(name="Bulk FW", code="BLK")
+    db.add(fw)
+    db.flush()
+    a, b = Control(control_id="BLK-1", title="A", framework_id=fw.id), Control(control_id="BLK-2", title="B", framework_id=fw.id)
+    db.add_all([a, b])
+    db.flush()
+    db.add(ControlMapping(source_control_id=a.id, target_control_id=b.id))
+    db.commit()
+    assert get_intent_index(db).mapped_control_ids(a.id) == {b.id}
+
+    db.execute(delete(ControlMapping).where(ControlMapping.source_control_id == a.id))
+    db.commit()
+    assert get_intent_index(db).mapped_control_ids(a.id) == frozenset()
+
+    db.execute(update(Control).where(Control.id == b.id).values(control_id="BLK-9"))
+    db.commit()
+    assert get_intent_index(db).control_refs[b.id] == "BLK-9"
+    db.close()
@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.job import Job, JobStatus
+from app.services import job_queue
+from app.services.job_queue import claim_jobs, enqueue, cancel_job, run_job, job_cleanup, job_handler, PartialJobError
+
+CALLS = []
+
+
+@job_handler("test.echo")
+def _echo(ctx, payload):
+    CALLS.append(payload)
+    ctx.progress(0.5, "halfway")
+    if payload.get("fail"):
+        raise RuntimeError("upstream 503")
+    return {"echo": payload.get("value")}
+
+
+@job_handler("test.partial")
+def _partial(ctx, payload):
+    raise PartialJobError("2 of 3 items failed", {"succeeded": ["a"], "failed": ["b", "c"]})
+
+
+CLEANED = []
+
+
+@job_cleanup("test.echo")
+def _release(payload):
+    CLEANED.append(payload.get("value"))
+
+
+def _session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_claim_respects_tenant_cap_and_run_succeeds():
+    factory = _session_factory()
+    db = factory()
+    acme = [enqueue(db, "test.echo", {"value": i}, tenant_id="acme") for i in range(3)]
+    other = enqueue(db, "test.echo", {"value": 9}, tenant_id="globex")
+
+    claimed = claim_jobs(db, "w1", limit=10, tenant_cap=2)
+    assert set(claimed) == {acme[0].id, acme[1].id, other.id}
+
+    assert run_job(acme[0].id, factory) == JobStatus.SUCCEEDED.value
+    db.expire_all()
+    job = db.get(Job, acme[0].id)
+    assert job.result == {"echo": 0}
+    assert (job.progress, job.attempts) == (1.0, 1)
+    assert job.finished_at is not None
+
+    # A slot freed up for acme
+    assert claim_jobs(db, "w1", limit=10, tenant_cap=2) == [acme[2].id]
+    db.close()
+
+
+def test_failure_retries_with_backoff_then_fails():
+    factory = _session_factory()
+    db = factory()
+    job = enqueue(db, "test.echo", {"fail": True}, tenant_id="acme", max_attempts=2, retry_backoff_seconds=10)
+
+    claim_jobs(db, "w1", limit=1)
+    assert run_job(job.id, factory) == JobStatus.QUEUED.value
+    db.expire_all()
+    job = db.get(Job, job.id)
+    assert job.next_run_at > datetime.utcnow() + timedelta(seconds=5)
+    assert claim_jobs(db, "w1", limit=1) == [] # Not due yet
+
+    job.next_run_at = datetime.utcnow()
+    db.commit()
+    claim_jobs(db, "w1", limit=1)
+    assert run_job(job.id, factory) == JobStatus.FAILED.value
+    db.expire_all()
+    assert db.get(Job, job.id).attempts == 2
+    assert "upstream 503" in db.get(Job, job.id).error
+    db.close()
+
+
+def test_cancel_queued_and_running_jobs():
+    factory = _session_factory()
+    db = factory()
+    queued = enqueue(db, "test.echo", {}, tenant_id="acme")
+    assert cancel_job(db, queued).status == JobStatus.CANCELLED.value
+    assert claim_jobs(db, "w1", limit=5) == []
+
+    running = enqueue(db, "test.echo", {}, tenant_id="acme")
+    claim_jobs(db, "w1", limit=5)
+    db.expire_all()
+    cancel_job(db, db.get(Job, running.id))
+    # The handler's progress checkpoint observes the request
+    assert run_job(running.id, factory) == JobStatus.CANCELLED.value
+    db.close()
+
+
+def test_unknown_job_type_is_rejected():
+    db = _session_factory()()
+    try:
+        enqueue(db, "test.missing", {}, tenant_id="acme")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert "document.review_revision" in job_queue.JOB_HANDLERS
+    db.close()
+
+
+def test_stale_jobs_requeue_until_attempts_run_out():
+    factory = _session_factory()
+    db = factory()
+    job = enqueue(db, "test.echo", {}, tenant_id="acme", max_attempts=2)
+    stale_at = datetime.utcnow() - timedelta(hours=1)
+
+    for attempt in (1, 2):
+        assert claim_jobs(db, "w1", limit=1) == [job.id]
+        # The worker dies without a final update
+        db.execute(update(Job).where(Job.id == job.id).values(heartbeat_at=stale_at))
+        db.commit()
+        assert job_queue.requeue_stale_jobs(db, stale_seconds=60) == (1 if attempt == 1 else 0)
+        db.expire_all()
+
+    job = db.get(Job, job.id)
+    assert (job.status, job.attempts) == (JobStatus.FAILED.value, 2)
+    assert job.finished_at is not None and "final attempt" in job.error
+    assert claim_jobs(db, "w1", limit=1) == []
+    db.close()
+
+
+def test_cleanup_runs_once_jobs_end_without_succeeding():
+    factory = _session_factory()
+    db = factory()
+    CLEANED.clear()
+
+    done = enqueue(db, "test.echo", {"value": "ok"}, tenant_id="acme")
+    claim_jobs(db, "w1", limit=1)
+    run_job(done.id, factory)
+    retried = enqueue(db, "test.echo", {"value": "failed", "fail": True}, tenant_id="acme", max_attempts=2)
+    claim_jobs(db, "w1", limit=1)
+    assert run_job(retried.id, factory) == JobStatus.QUEUED.value
+    assert CLEANED == [] # Success and retryable failures keep the payload's resources
+
+    retried = db.get(Job, retried.id)
+    retried.next_run_at = datetime.utcnow()
+    db.commit()
+    claim_jobs(db, "w1", limit=1)
+    assert run_job(retried.id, factory) == JobStatus.FAILED.value
+    cancel_job(db, enqueue(db, "test.echo", {"value": "cancelled"}, tenant_id="acme"))
+
+    crashed = enqueue(db, "test.echo", {"value": "crashed"}, tenant_id="acme", max_attempts=1)
+    claim_jobs(db, "w1", limit=1)
+    db.execute(update(Job).where(Job.id == crashed.id).values(heartbeat_at=datetime.utcnow() - timedelta(hours=1)))
+    db.commit()
+    job_queue.requeue_stale_jobs(db, stale_seconds=60)
+    assert CLEANED == ["failed", "cancelled", "crashed"]
+    db.close()
+
+
+def test_review_revision_cleanup_discards_the_spooled_upload(tmp_path):
+    spool = tmp_path / "upload.pdf"
+    spool.write_bytes(b"%PDF")
+    job_queue._run_cleanup("document.review_revision", {"spool_path": str(spool)})
+    assert not spool.exists()
+
+
+def test_partial_failure_keeps_its_result_on_the_job():
+    factory = _session_factory()
+    db = factory()
+    job = enqueue(db, "test.partial", {}, tenant_id="acme", max_attempts=2)
+
+    for expected in (JobStatus.QUEUED.value, JobStatus.FAILED.value):
+        db.execute(update(Job).where(Job.id == job.id).values(next_run_at=datetime.utcnow()))
+        db.commit()
+        claim_jobs(db, "w1", limit=1)
+        assert run_job(job.id, factory) == expected
+        db.expire_all()
+        assert db.get(Job, job.id).result == {"succeeded": ["a"], "failed": ["b", "c"]}
+    assert "2 of 3 items failed" in db.get(Job, job.id).error
+    db.close()
@@ -0,0 +1,86 @@
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.llm_cache_entry import LLMCacheEntry
+from app.services.ai_gateway import chat_payload
+from app.services.llm_cache import LLMResponseCache
+
+
+def _cache(**kwargs):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return LLMResponseCache(session_factory=sessionmaker(bind=engine), **kwargs)
+
+
+def test_fingerprint_covers_model_prompts_and_params():
+    base = chat_payload("sys", "Control A.5.1", "gpt-4-turbo", 1024, 0.2, json_mode=True)
+    key = LLMResponseCache.fingerprint(base)
+    assert key == LLMResponseCache.fingerprint(dict(reversed(list(base.items()))))
+    assert key != LLMResponseCache.fingerprint(chat_payload("sys", "Control A.5.2", "gpt-4-turbo", 1024, 0.2, json_mode=True))
+    assert key != LLMResponseCache.fingerprint(chat_payload("sys", "Control A.5.1", "gpt-4o", 1024, 0.2, json_mode=True))
+    assert key != LLMResponseCache.fingerprint(chat_payload("sys", "Control A.5.1", "gpt-4-turbo", 1024, 0.7, json_mode=True))
+
+
+def test_hit_miss_provenance_ttl_and_lru():
+    cache = _cache(ttl_seconds=3600, max_entries=2)
+    p1, p2, p3 = (chat_payload("sys", f"prompt {i}", "m", 10, 0.0) for i in range(3))
+
+    assert cache.get(p1) is None
+    cache.put(p1, "one", purpose="generate_business_text", tenant_id="acme")
+    assert cache.get(p1) == "one"
+
+    db = cache.session_factory()
+    entry = db.get(LLMCacheEntry, cache.fingerprint(p1))
+    assert (entry.purpose, entry.created_by_tenant, entry.model, entry.hit_count) == ("generate_business_text", "acme", "m", 1)
+    db.close()
+
+    # LRU: p1 was used most recently, so p2 goes when p3 arrives
+    cache.put(p2, "two")
+    time.sleep(0.01)
+    cache.get(p1)
+    cache.put(p3, "three")
+    assert cache.get(p2) is None
+    assert cache.get(p1) == "one" and cache.get(p3) == "three"
+
+    # TTL
+    db = cache.session_factory()
+    db.get(LLMCacheEntry, cache.fingerprint(p3)).expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    db.close()
+    assert cache.get(p3) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 4 and stats["misses"] == 3 and stats["evictions"] == 1
+    assert stats["stored_hits_by_purpose"]["generate_business_text"] == 3
+
+
+def test_async_cached_chat_serves_repeats_from_the_cache(monkeypatch):
+    import asyncio
+    from app.config import settings
+    from app.services import ai_gateway as gateway_module
+    from app.services import llm_cache as llm_cache_module
+
+    calls = []
+
+    class Gateway:
+        async def achat(self, payload, tenant_id="default_tenant"):
+            calls.append(tenant_id)
+            return "fresh"
+
+    monkeypatch.setattr(gateway_module, "ai_gateway", Gateway())
+    monkeypatch.setattr(llm_cache_module, "llm_cache", _cache())
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    payload = chat_payload("sys", "Control A.5.1", "m", 10, 0.0)
+
+    async def run():
+        first = await llm_cache_module.acached_chat(payload, "suggest_justification", "acme")
+        second = await llm_cache_module.acached_chat(payload, "suggest_justification", "acme")
+        forced = await llm_cache_module.acached_chat(payload, "suggest_justification", "acme", regenerate=True)
+        return first, second, forced
+
+    assert asyncio.run(run()) == ("fresh", "fresh", "fresh")
+    assert calls == ["acme", "acme"] # the second call was a hit
@@ -0,0 +1,78 @@
+import random
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models.policy import Policy
+from app.models.requirement import RequirementMaster, RequirementStatus
+from app.services.mapping_engine import MappingEngine
+from app.utils.aho_corasick import AhoCorasick
+
+
+def test_aho_corasick_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(200):
+        patterns = list({"".join(rng.choice("ab.") for _ in range(rng.randint(1, 4))) for _ in range(8)})
+        automaton = AhoCorasick()
+        for key, pattern in enumerate(patterns):
+            automaton.add(pattern, key)
+        text = "".join(rng.choice("ab.c") for _ in range(40))
+        expected = sorted((start, key) for key, p in enumerate(patterns)
+                          for start in range(len(text)) if text.startswith(p, start))
+        assert sorted(automaton.iter_matches(text)) == expected
+
+
+def _corpus():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    rng = random.Random(5)
+    ids = [f"B.{i}.{i % 7}" for i in range(60)]
+    for i, control_id in enumerate(ids):
+        db.add(RequirementMaster(id=i + 1, control_id=control_id, control_title=f"Topic {i} oversight",
+                                 requirement_text="...", module_source="M.xlsx"))
+        db.add(RequirementStatus(requirement_id=i + 1, status="GAP"))
+    for p in range(12):
+        mentions = " ".join(rng.sample(ids, 6))
+        db.add(Policy(id=p + 1, name=f"Policy {p}" + (" topic 7 oversight" if p == 9 else ""),
+                      content=f"Intro text. {mentions} end.", mapped_controls='["B.50.1"]' if p == 11 else None))
+    db.commit()
+    return db
+
+
+def _state(db):
+    return {s.requirement_id: (s.status, s.mapped_policy_id, s.mapped_section,
+                               (s.verification_metadata or {}).get("policy_version"))
+            for s in db.query(RequirementStatus).all()}
+
+
+def test_full_scan_records_reason_and_offset():
+    db = _corpus()
+    MappingEngine(db).run_global_scan()
+    policy = db.get(Policy, 1)
+    first_id = policy.content.split()[2]
+    status = db.query(RequirementStatus).join(RequirementMaster).filter(RequirementMaster.control_id == first_id).one()
+    assert status.status == "MET"
+    assert status.mapped_policy_id == 1
+    assert status.mapped_section == f"Mapped via Content Match (ID) (offset {policy.content.lower().index(first_id.lower())})"
+    assert status.verification_metadata["field"] == "content"
+
+
+def test_incremental_remap_matches_full_rescan():
+    full, incremental = _corpus(), _corpus()
+    for db in (full, incremental):
+        MappingEngine(db).remap()
+        # Policy 2 drops its mentions, policy 4 gains some, policy 1 keeps its matches at new
+        # offsets (new version), requirement 3 is renamed
+        db.get(Policy, 2).content = "Rewritten without references."
+        db.get(Policy, 4).content += " B.30.2 B.59.3 B.1.1"
+        db.get(Policy, 1).content = "A longer preamble. " + db.get(Policy, 1).content
+        db.get(Policy, 1).version = "1.1"
+        db.get(RequirementMaster, 3).control_title = "Policy 0"
+        db.commit()
+
+    MappingEngine(full).remap()
+    MappingEngine(incremental).remap(policy_ids=[1, 2, 4], requirement_ids=[3])
+    assert _state(incremental) == _state(full)
@@ -0,0 +1,70 @@
+import json
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
+from app.models.universal_intent import IntentStatus, UniversalIntent
+from app.services.multi_framework_report import MultiFrameworkReportService
+
+
+def _seed(db, intents):
+    for n in range(intents):
+        intent = UniversalIntent(intent_id=f"INT-{n:03d}", description=f"Intent {n}", category="General",
+                                 status=IntentStatus.COMPLETED if n % 2 else IntentStatus.PENDING)
+        db.add(intent)
+        db.flush()
+        if n % 3: # Some intents have no crosswalk rows at all
+            db.add_all([
+                IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="ISO_27001", control_reference=f"A.{n}"),
+                IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="ISO_27001", control_reference=f"A.{n}.1"),
+                IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="SOC2", control_reference=f"CC{n}"),
+            ])
+    db.commit()
+
+
+def _session(intents):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    _seed(db, intents)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return db, statements
+
+
+def test_unified_report_single_query_cached_and_invalidated():
+    db, statements = _session(30)
+
+    report = MultiFrameworkReportService.generate_unified_report(db, "tenant-a")
+    assert len(statements) == 1
+    assert report["summary"] == {"total_intents": 30, "completed_intents": 15, "standards_covered": ["ISO_27001", "SOC2"]}
+    first, second = report["intents"][:2]
+    assert first == {"intent_id": "INT-000", "description": "Intent 0", "category": "General", "status": "PENDING",
+                     "impact": {}, "impact_count": 0}
+    assert second["impact"] == {"ISO_27001": ["A.1", "A.1.1"], "SOC2": ["CC1"]}
+    assert second["impact_count"] == 3
+
+    assert MultiFrameworkReportService.generate_unified_report(db, "tenant-a") is report
+    assert len(statements) == 1
+
+    # Intent status change invalidates the cached report
+    db.query(UniversalIntent).filter(UniversalIntent.intent_id == "INT-000").one().status = IntentStatus.COMPLETED
+    db.commit()
+    refreshed = MultiFrameworkReportService.generate_unified_report(db, "tenant-a")
+    assert refreshed["summary"]["completed_intents"] == 16
+    db.close()
+
+
+def test_streamed_report_matches_full_report():
+    db, _ = _session(7)
+    streamed = list(MultiFrameworkReportService.iter_unified_report(db, "tenant-b", fmt="ndjson"))
+    lines = [json.loads(line) for line in streamed]
+    assert [line["type"] for line in lines] == ["intent"] * 7 + ["summary"]
+
+    report = MultiFrameworkReportService.generate_unified_report(db, "tenant-b") # Cached by the stream
+    assert json.loads("".join(MultiFrameworkReportService.iter_unified_report(db, "tenant-b", fmt="json"))) == report
+    assert [{k: v for k, v in line.items() if k != "type"} for line in lines[:-1]] == report["intents"]
+    db.close()
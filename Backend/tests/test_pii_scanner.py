@@ -0,0 +1,39 @@
+from app.services import ai_service
+from app.services.pii_scanner import scan_text, luhn_valid, iban_valid
+
+
+def test_validated_detectors_and_redaction():
+    text = (
+        "Owner: jane.doe@acme.com\n"
+        "Card 4111 1111 1111 1111 (test card 4111 1111 1111 1112 is not Luhn-valid)\n"
+        "SSN 123-45-6789, IBAN GB82 WEST 1234 5698 7654 32\n"
+    )
+    result = scan_text(text)
+    assert result.kinds == {"email", "credit_card", "ssn", "iban"}
+    assert result.action == "MASK" and not result.ambiguous
+    assert "4111 1111 1111 1112" in result.redacted_text
+    assert "jane.doe@acme.com" not in result.redacted_text
+
+    assert luhn_valid("4111111111111111") and not luhn_valid("4111111111111112")
+    assert iban_valid("GB82 WEST 1234 5698 7654 32") and not iban_valid("GB83 WEST 1234 5698 7654 32")
+
+
+def test_actions_follow_risk_rules():
+    assert scan_text("Passport No: X1234567").action == "REJECT"
+    assert scan_text("Firewall denied 10.0.0.12").action == "TAG"
+    clean = scan_text("All visitors must present a passport at reception.")
+    assert (clean.action, clean.findings, clean.redacted_text) == ("NONE", [], None)
+
+
+def test_clean_text_skips_llm_and_names_escalate(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_service, "client", object())
+    monkeypatch.setattr(ai_service.ai_gateway, "chat", lambda payload, tenant_id: calls.append(payload) or
+                        '{"pii_found": true, "action": "MASK", "reasoning": "name", "sensitive_strings": ["John Smith"]}')
+
+    result = ai_service.detect_and_redact_pii("Backups run nightly and are encrypted.", False)
+    assert (result["action"], result["source"]) == ("NONE", "local_scanner")
+    assert calls == []
+
+    result = ai_service.detect_and_redact_pii("Approved by John Smith", False)
+    assert result["action"] == "MASK" and len(calls) == 1
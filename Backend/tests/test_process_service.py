@@ -0,0 +1,70 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models import Control, Framework
+from app.models.intent_framework_crosswalk import IntentFrameworkCrosswalk
+from app.models.person import Person
+from app.models.process import Process, SubProcess
+from app.models.universal_intent import UniversalIntent
+from app.services.process_service import ProcessService
+
+
+def _seed(db, processes):
+    iso = Framework(name="ISO 27001", code="ISO27001")
+    soc = Framework(name="SOC 2", code="SOC2")
+    owner = Person(email="ada@example.com", full_name="Ada Lovelace")
+    db.add_all([iso, soc, owner])
+    db.flush()
+    for p in range(processes):
+        mapped = [Control(control_id=f"A.{p}.{i}", title=f"Mapped {p}.{i}", framework_id=iso.id,
+                          owner_rel=owner if i == 0 else None) for i in range(3)]
+        other = Control(control_id=f"CC{p}", title="Other framework", framework_id=soc.id)
+        via_intent = Control(control_id=f"B.{p}", title=f"Intent {p}", framework_id=iso.id)
+        process = Process(name=f" Process {p} ", framework_code="ISO27001", sub_processes=[
+            SubProcess(name="Sub 1", controls=mapped[:2] + [other]),
+            SubProcess(name="Sub 2", controls=mapped[1:]), # Shared control listed once
+        ])
+        intent = UniversalIntent(intent_id=f"INT-{p}", description="d", category=f"Process {p}")
+        db.add_all([process, via_intent, intent])
+        db.flush()
+        db.add_all([
+            IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="ISO27001", control_reference=f"B.{p}"),
+            IntentFrameworkCrosswalk(intent_id=intent.id, framework_id="ISO27001", control_reference=f"A.{p}.0"),
+        ])
+    db.add(Process(name="Elsewhere", framework_code="SOC2"))
+    db.commit()
+
+
+def _load(processes):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    _seed(db, processes)
+    db.expunge_all()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    result = ProcessService.get_processes_with_controls(db, "ISO27001")
+    db.close()
+    return result, len(statements)
+
+
+def test_process_graph_shape_and_dedupe():
+    result, _ = _load(2)
+
+    assert [p["name"] for p in result] == [" Process 0 ", " Process 1 "]
+    controls = result[0]["controls"]
+    assert [c["control_id"] for c in controls] == ["A.0.0", "A.0.1", "A.0.2", "B.0"]
+    assert controls[0]["assignee"] == {"name": "Ada Lovelace", "initials": "AL"}
+    assert controls[1]["assignee"] is None
+    assert set(controls[0]) == {"id", "control_id", "title", "description", "status", "framework_id", "assignee"}
+
+
+def test_process_graph_query_count_is_constant():
+    _, small = _load(2)
+    _, large = _load(40)
+
+    assert small == large
+    assert small <= 6
@@ -0,0 +1,66 @@
+import tracemalloc
+
+from openpyxl import load_workbook
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+import app.services.report_generator_v2 as report_module
+from app.database import Base
+from app.models.requirement import RequirementMaster, RequirementStatus
+from app.services.report_generator_v2 import EXCEL_COLUMNS, ReportGeneratorV2
+
+
+def _session(rows):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.bulk_insert_mappings(RequirementMaster, [
+        {"id": i, "domain": "Governance", "control_id": f"B.{i}", "requirement_text": "The organization shall " * 20,
+         "target_control": "B.7.2", "module_source": f"Module_{i % 3}.xlsx"}
+        for i in range(1, rows + 1)
+    ])
+    # Every other requirement has a status row; a third of those are MET
+    db.bulk_insert_mappings(RequirementStatus, [
+        {"requirement_id": i, "status": "MET" if i % 3 == 0 else "PARTIAL", "mapped_section": f"Section {i}"}
+        for i in range(1, rows + 1, 2)
+    ])
+    db.commit()
+    return db
+
+
+def _peak_bytes(rows, tmp_path):
+    db = _session(rows)
+    tracemalloc.start()
+    ReportGeneratorV2(db).generate_compliance_report(workspace_id=1, output_dir=str(tmp_path / str(rows)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def test_report_rows_and_module_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_module, "PDF_DETAIL_MAX_ROWS", 20)
+    db = _session(90)
+    output = ReportGeneratorV2(db).generate_compliance_report(workspace_id=1, output_dir=str(tmp_path))
+
+    sheet = load_workbook(output["excel"], read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == EXCEL_COLUMNS
+    assert len(rows) == 91
+    assert rows[2][4:6] == ("GAP", "Unmapped") # Requirement 2 has no status row
+    assert rows[3][4:6] == ("MET", "Section 3")
+
+    assert sum(s["total"] for s in output["stats"].values()) == 90
+    assert output["stats"]["Module_0.xlsx"] == {"total": 30, "met": 15}
+    with open(output["pdf"], "rb") as f:
+        assert f.read(5) == b"%PDF-"
+
+
+def test_peak_memory_stays_flat_as_rows_grow(tmp_path, monkeypatch):
+    # Small batches / PDF cap so both sizes are past the point where the bounded buffers fill
+    monkeypatch.setattr(report_module, "PDF_DETAIL_MAX_ROWS", 50)
+    monkeypatch.setattr(report_module, "FETCH_BATCH_SIZE", 100)
+    _peak_bytes(200, tmp_path) # Warm-up: fonts, compiled query cache
+    small = _peak_bytes(1000, tmp_path)
+    large = _peak_bytes(4000, tmp_path)
+    assert large < small * 1.5
@@ -0,0 +1,78 @@
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models.cloud_resource import CloudResource
+from app.services.resource_ingest import ensure_cloud_resource_schema, ingest_stream
+from app.utils.encryption import SecurityManager
+
+
+def _resources(n, start=0):
+    return [
+        {
+            "resource_type": "s3_bucket",
+            "resource_id": f"arn:aws:s3:::bucket-{i}",
+            "raw_data": {"is_encrypted": i % 2 == 0, "versioning_enabled": True, "Owner": {"ID": "12345"}},
+        }
+        for i in range(start, start + n)
+    ]
+
+
+def test_batched_ingest_upserts_in_bounded_statements():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(CloudResource(tenant_id="t1", provider="aws", resource_type="s3_bucket",
+                         resource_id="arn:aws:s3:::bucket-3", compliance_metadata="old"))
+    db.add(CloudResource(tenant_id="t2", provider="aws", resource_type="s3_bucket", # Other tenant: untouched
+                         resource_id="arn:aws:s3:::bucket-4", compliance_metadata="other"))
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    resources = _resources(25)
+    resources.append(dict(resources[0], raw_data={"is_encrypted": False})) # Seen again in a later batch: updated
+    stats = ingest_stream(db, "t1", "aws", iter(resources), batch_size=10, workers=3)
+
+    assert (stats.processed, stats.created, stats.updated, stats.batches) == (26, 24, 2, 3)
+    # Per batch: one lookup, at most one bulk update and one bulk upsert (schema inspection aside)
+    verbs = [s.split()[0].upper() for s in statements if "cloud_resources" in s and not s.startswith("PRAGMA")]
+    assert verbs.count("SELECT") == 3
+    assert verbs.count("INSERT") <= 3 and verbs.count("UPDATE") <= 3
+
+    rows = {r.resource_id: r for r in db.query(CloudResource).filter(CloudResource.tenant_id == "t1")}
+    assert len(rows) == 25
+    assert SecurityManager.decrypt_metadata(rows["arn:aws:s3:::bucket-3"].compliance_metadata) == \
+        {"is_encrypted": False, "versioning_enabled": True}
+    assert rows["arn:aws:s3:::bucket-3"].updated_at is not None
+    assert SecurityManager.decrypt_metadata(rows["arn:aws:s3:::bucket-0"].compliance_metadata) == {"is_encrypted": False}
+    assert db.query(CloudResource).filter(CloudResource.tenant_id == "t2").one().compliance_metadata == "other"
+
+    # Re-sync: everything is an update, no duplicates
+    stats = ingest_stream(db, "t1", "aws", _resources(25), batch_size=10)
+    assert (stats.created, stats.updated) == (0, 25)
+    assert db.query(CloudResource).filter(CloudResource.tenant_id == "t1").count() == 25
+    db.close()
+
+
+def test_ingest_without_unique_key_falls_back_to_plain_inserts():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn: # Pre-constraint schema holding a duplicate
+        conn.execute(text(
+            "CREATE TABLE cloud_resources (id INTEGER PRIMARY KEY, tenant_id VARCHAR NOT NULL, provider VARCHAR NOT NULL, "
+            "resource_type VARCHAR NOT NULL, resource_id VARCHAR NOT NULL, compliance_metadata TEXT NOT NULL, "
+            "created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO cloud_resources (tenant_id, provider, resource_type, resource_id, compliance_metadata) "
+            "VALUES ('t1', 'aws', 's3_bucket', 'arn:aws:s3:::bucket-1', 'a'), ('t1', 'aws', 's3_bucket', 'arn:aws:s3:::bucket-1', 'b')"
+        ))
+    assert ensure_cloud_resource_schema(engine) is False
+
+    db = sessionmaker(bind=engine)()
+    stats = ingest_stream(db, "t1", "aws", _resources(3), batch_size=2)
+    assert (stats.created, stats.updated) == (2, 1)
+    payloads = {r.compliance_metadata for r in db.query(CloudResource).filter(CloudResource.resource_id == "arn:aws:s3:::bucket-1")}
+    assert len(payloads) == 1 and "a" not in payloads # Both duplicates updated
+    db.close()
@@ -0,0 +1,82 @@
+import asyncio
+import io
+import json
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.document_version import DocumentVersion
+from app.api import documents
+from app.services import ai_service
+
+
+def _patch(monkeypatch, tmp_path, pii_action="NONE", delay=0.2):
+    state = {"gap_cancelled": False}
+
+    async def fake_pii(text, is_image, ext, image_b64, tenant_id="default_tenant"):
+        await asyncio.sleep(delay / 4 if pii_action == "REJECT" else delay)
+        return {"pii_found": pii_action != "NONE", "action": pii_action, "reasoning": "test"}
+
+    async def fake_gap(*args, **kwargs):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            state["gap_cancelled"] = True
+            raise
+        return {"final_verdict": "PASS", "date_check_passed": True, "summary": "ok"}
+
+    monkeypatch.setattr(ai_service, "detect_and_redact_pii_async", fake_pii)
+    monkeypatch.setattr(ai_service, "analyze_document_gap_async", fake_gap)
+    monkeypatch.setattr(documents, "VERSION_HISTORY_DIR", str(tmp_path))
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    state["sessions"] = sessionmaker(bind=engine)
+    monkeypatch.setattr(documents, "SessionLocal", state["sessions"])
+    return state
+
+
+def test_pii_and_gap_run_concurrently_with_timings(tmp_path, monkeypatch):
+    state = _patch(monkeypatch, tmp_path)
+    result = asyncio.run(documents._review_revision(
+        io.BytesIO(b"Access reviews happen quarterly."), None, "hash", "policy.txt", "A.5.1", "u1", True, "tenant-a"
+    ))
+
+    timings = result["ai_analysis"]["stage_timings_ms"]
+    assert set(timings) == {"extract", "pii_scan", "gap_analysis", "total"}
+    assert timings["total"] < timings["pii_scan"] + timings["gap_analysis"] # the two stages overlapped
+    receipts = list(tmp_path.glob("*.json"))
+    assert json.loads(receipts[0].read_text())["stage_timings_ms"] == timings
+
+    db = state["sessions"]()
+    version = db.query(DocumentVersion).one()
+    assert (version.tenant_id, version.control_id, version.is_witnessed) == ("tenant-a", "A.5.1", True)
+    assert version.ai_receipt["stage_timings_ms"] == timings
+    db.close()
+
+
+def test_pii_reject_cancels_gap_analysis(tmp_path, monkeypatch):
+    state = _patch(monkeypatch, tmp_path, pii_action="REJECT")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(documents._review_revision(
+            io.BytesIO(b"Passport No: X1234567"), None, "hash", "id.txt", "A.5.1", "u1", True
+        ))
+    assert exc.value.status_code == 400
+    assert state["gap_cancelled"]
+
+
+def test_rejected_upload_leaves_no_cached_text(tmp_path, monkeypatch):
+    from app.services import document_extraction
+
+    cache_dir = tmp_path / "extracted_text"
+    cache = document_extraction.DocumentTextCache(str(cache_dir))
+    monkeypatch.setattr(document_extraction, "document_text_cache", cache)
+    _patch(monkeypatch, tmp_path, pii_action="REJECT")
+    with pytest.raises(HTTPException):
+        asyncio.run(documents._review_revision(
+            io.BytesIO(b"Passport No: X1234567"), None, "hash", "id.txt", "A.5.1", "u1", False
+        ))
+    assert not cache_dir.exists() or not any(cache_dir.rglob("*"))
+    assert cache.get("hash", "txt") is None
@@ -0,0 +1,121 @@
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models import Control, Evidence, Framework, Policy
+from app.services.search_index import ensure_search_backfilled, ensure_search_schema, search, search_ids
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    assert ensure_search_schema(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_index_follows_writes_and_is_tenant_scoped():
+    db = _session()
+    fw = Framework(name="ISO", code="ISO27001")
+    db.add(fw)
+    db.flush()
+    access = Control(control_id="A.5.15", title="Access control", framework_id=fw.id, tenant_id="t1",
+                     description="Rules to control physical and logical access shall be established.")
+    crypto = Control(control_id="A.8.24", title="Use of cryptography", framework_id=fw.id, tenant_id="t1",
+                     ai_explanation="Requires encryption of data at rest and key management procedures.")
+    other = Control(control_id="A.8.25", title="Encryption keys", framework_id=fw.id, tenant_id="t2")
+    db.add_all([access, crypto, other])
+    db.flush()
+    db.add(Evidence(title="KMS rotation screenshot", description="Key management evidence", filename="k.png",
+                    file_path="k.png", control_id=crypto.id, tenant_id="t1"))
+    db.add(Policy(name="Cryptography Policy", content="All encryption keys are rotated yearly.", tenant_id="t1"))
+    db.commit()
+
+    # Found by requirement wording (stemmed), not just id/title
+    assert search_ids(db, "control", "encrypted data", ["t1"]) == [crypto.id]
+    assert {h.kind for h in search(db, "key management", ["t1"])} == {"evidence", "control"}
+    assert {h.kind for h in search(db, "encryption", ["t1"])} == {"control", "policy"}
+    assert search_ids(db, "control", "encryption", ["t2"]) == [other.id]
+
+    # Title hits outrank body hits; last word matches as a prefix
+    hits = search(db, "crypto", ["t1"], kinds=["control", "policy"])
+    assert hits[0].title in ("A.8.24 Use of cryptography", "Cryptography Policy")
+
+    # Updates and deletes are reflected after commit; rollbacks are not
+    access.description = "Quantum-safe ciphers."
+    db.commit()
+    assert search_ids(db, "control", "quantum", ["t1"]) == [access.id]
+    assert search_ids(db, "control", "physical", ["t1"]) == []
+
+    db.delete(crypto.evidence_items[0])
+    db.commit()
+    assert search(db, "rotation screenshot", ["t1"]) == []
+
+    access.title = "Temporarily renamed"
+    db.flush()
+    db.rollback()
+    assert search_ids(db, "control", "temporarily", ["t1"]) == []
+
+
+def test_backfill_and_query_syntax_is_literal():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Policy(name="Acceptable Use", content='Users shall not "share" passwords (ever) OR tokens.', tenant_id="t1"))
+    db.commit()
+
+    ensure_search_schema(engine)
+    assert ensure_search_backfilled(db) == 1
+    assert ensure_search_backfilled(db) == 0
+    # FTS operators and quotes in user input are treated as words
+    assert len(search(db, 'share" OR (passwords', ["t1"])) == 1
+    assert search(db, "   ", ["t1"]) == []
+
+
+def test_policy_created_through_the_api_is_searchable(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.database import get_db
+    from app.main import app
+    from app.models.tenant import Tenant
+    from app.models.user import User
+    from app.services import mapping_engine
+    from app.utils.security import create_access_token
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    assert ensure_search_schema(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    # Tenant UUIDs differ from slugs, so neither matches the "default_tenant" policies are stored under
+    db.add_all([Tenant(name="Shared", slug="default_tenant", encryption_key="k"),
+                Tenant(name="Acme", slug="acme", encryption_key="k")])
+    username = f"search_{uuid.uuid4().hex[:8]}"
+    db.add(User(username=username, email=f"{username}@test.com", hashed_password="x", tenant_id="acme"))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(mapping_engine, "SessionLocal", Session) # remap background task
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': username, 'tenant_id': 'acme'})}"}
+        created = client.post("/api/v1/policies/", headers=headers, json={
+            "name": f"Retention Policy {username}", "content": "Backups are retained for ninety days."
+        })
+        assert created.status_code == 200
+
+        hits = client.get("/api/v1/search/", headers=headers, params={"q": "retained ninety", "kinds": "policy"}).json()
+        assert [(h["kind"], h["id"]) for h in hits] == [("policy", created.json()["id"])]
+    finally:
+        app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,67 @@
+import json
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.database import Base
+from app.models.review_task import ReviewTask
+from app.services.task_store import (
+    complete_document_tasks, create_task, import_tasks_json, list_tasks, set_task_status
+)
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_migration_keeps_unique_ids_and_reassigns_duplicates(tmp_path):
+    db = _session()
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps([
+        {"id": "TASK-1001", "title": "A", "status": "PENDING", "created_at": "2025-01-01T10:00:00", "document_id": "doc_a"},
+        {"id": "TASK-1002", "title": "B", "status": "COMPLETED", "outcome": "APPROVED", "type": "REVIEW_VERSION"},
+        {"id": "TASK-1002", "title": "B duplicate", "status": "PENDING"},
+    ]))
+
+    assert import_tasks_json(db, str(path)) == 3
+    assert not path.exists()
+    assert os.path.exists(f"{path}.migrated")
+
+    refs = {t.title: t.task_ref for t in db.query(ReviewTask).all()}
+    assert refs["A"] == "TASK-1001"
+    assert refs["B"] == "TASK-1002"
+    assert refs["B duplicate"] not in ("TASK-1001", "TASK-1002")
+
+    # New tasks are allocated after everything migrated
+    new = create_task(db, title="C", document_id="doc_c")
+    assert new.id > max(ReviewTask.id_from_ref(r) for r in refs.values())
+
+    # Second run is a no-op: the file is gone
+    assert import_tasks_json(db, str(path)) == 0
+
+
+def test_filters_pagination_and_status_updates():
+    db = _session()
+    for i in range(5):
+        create_task(db, title=f"T{i}", control_id="A.5.1" if i % 2 == 0 else "A.8.2",
+                    document_id=f"doc_{i % 2}", assigned_to="Admin")
+
+    total, rows = list_tasks(db, control_id="A.5.1", limit=2)
+    assert total == 3
+    assert [t.title for t in rows] == ["T0", "T2"]
+    total, rows = list_tasks(db, control_id="A.5.1", limit=2, offset=2)
+    assert [t.title for t in rows] == ["T4"]
+
+    assert complete_document_tasks(db, "doc_1") == 2
+    total, _ = list_tasks(db, status="PENDING")
+    assert total == 3
+
+    first = rows[0].task_ref
+    assert set_task_status(db, first, "APPROVED") is True
+    assert db.get(ReviewTask, ReviewTask.id_from_ref(first)).to_dict()["status"] == "APPROVED"
+    assert set_task_status(db, "TASK-99999", "APPROVED") is False
+    assert set_task_status(db, "not-a-task", "APPROVED") is False
@@ -0,0 +1,35 @@
+import json
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+import app.models  # noqa: F401
+from app.services.version_catalog import import_version_directory, list_versions, record_version, parse_version_filename
+
+
+def test_import_existing_directory_and_paginate(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    (tmp_path / "A.5.1_20240101_090000_policy.docx").write_bytes(b"v1")
+    (tmp_path / "A.5.1_20240101_090000_policy.docx.json").write_text(json.dumps({"final_verdict": "PASS", "file_hash": "h1"}))
+    (tmp_path / "A.5.1_20240301_120000_policy_v2.docx").write_bytes(b"v2")
+    (tmp_path / "A.5.1_20240401_080000_secret.pdf.json").write_text(json.dumps({"final_verdict": "FAIL"})) # Confidential: receipt only
+    (tmp_path / "A.8.2_20240102_100000_other.pdf").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_text("not a revision")
+
+    assert import_version_directory(db, str(tmp_path)) == 4
+    assert import_version_directory(db, str(tmp_path)) == 0 # Idempotent
+
+    record_version(db, "tenant-b", "A.5.1", "A.5.1_20240501_080000_b.pdf", {"final_verdict": "PASS"},
+                   version_timestamp=parse_version_filename("A.5.1_20240501_080000_b.pdf")[1])
+
+    total, page = list_versions(db, "tenant-a", "A.5.1", limit=2)
+    assert total == 3 # Legacy rows are shared; tenant-b's upload is not
+    assert [v.filename for v in page] == ["A.5.1_20240401_080000_secret.pdf", "A.5.1_20240301_120000_policy_v2.docx"]
+    assert page[0].is_witnessed and page[0].ai_status == "FAIL"
+
+    _, page = list_versions(db, "tenant-a", "A.5.1", limit=2, offset=2)
+    entry = page[0].to_history_entry()
+    assert (entry["timestamp"], entry["ai_status"], entry["ai_analysis"]["file_hash"]) == ("20240101 090000", "PASS", "h1")
+    db.close()
@@ -0,0 +1,93 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+
+import app.services.zip_stream as zip_stream
+from app.services.zip_stream import ZipSource, stream_zip
+
+
+def test_streams_files_with_manifest_and_skips_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_stream, "CHUNK_SIZE", 64 * 1024)
+    big = os.urandom(600 * 1024)
+    (tmp_path / "big.pdf").write_bytes(big)
+    (tmp_path / "notes.txt").write_text("evidence " * 1000)
+
+    skipped = []
+    chunks = list(stream_zip([
+        ZipSource("Statement_of_Applicability.md", data=b"# SoA"),
+        ZipSource("Annex_A_5/A.5.1/1_big.pdf", path=str(tmp_path / "big.pdf")),
+        ZipSource("Annex_A_5/A.5.1/2_gone.pdf", path=str(tmp_path / "gone.pdf")),
+        ZipSource("Annex_A_8/A.8.2/3_notes.txt", path=str(tmp_path / "notes.txt")),
+    ], manifest_name="Verification_Manifest.json", workers=2, skipped=skipped))
+
+    assert len(chunks) > 5 # Emitted progressively, not as one blob
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [
+            "Statement_of_Applicability.md", "Annex_A_5/A.5.1/1_big.pdf",
+            "Annex_A_8/A.8.2/3_notes.txt", "Verification_Manifest.json"
+        ]
+        assert zf.read("Annex_A_5/A.5.1/1_big.pdf") == big
+        assert zf.getinfo("Annex_A_5/A.5.1/1_big.pdf").compress_type == zipfile.ZIP_STORED
+        manifest = json.loads(zf.read("Verification_Manifest.json"))
+
+    assert skipped == ["Annex_A_5/A.5.1/2_gone.pdf"]
+    assert manifest["Annex_A_5/A.5.1/1_big.pdf"] == hashlib.sha256(big).hexdigest()
+    assert manifest["Statement_of_Applicability.md"] == hashlib.sha256(b"# SoA").hexdigest()
+    assert "Annex_A_5/A.5.1/2_gone.pdf" not in manifest
+
+
+def test_abandoned_stream_stops_reader_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_stream, "CHUNK_SIZE", 1024)
+    sources = []
+    for i in range(6):
+        (tmp_path / f"{i}.bin").write_bytes(os.urandom(64 * 1024))
+        sources.append(ZipSource(f"{i}.bin", path=str(tmp_path / f"{i}.bin")))
+
+    stream = stream_zip(sources, workers=3)
+    next(stream)
+    stream.close() # Client disconnected
+
+    assert not [t for t in threading.enumerate() if t.name.startswith("zip-hash")]
+
+
+def test_auditor_pack_only_contains_the_callers_evidence(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import app.models  # noqa: F401
+    from app.database import Base
+    from app.models import Control, Evidence, Framework
+    from app.models.control import ControlStatus
+    from report_generator import ComplianceReporter
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    fw = Framework(name="Pack FW", code="PACK")
+    db.add(fw)
+    db.flush()
+    for tenant in ("tenant-a", "tenant-b"):
+        control = Control(control_id=f"A.5.{tenant[-1]}", title="Policies", framework_id=fw.id,
+                          status=ControlStatus.IMPLEMENTED, tenant_id=tenant)
+        db.add(control)
+        db.flush()
+        path = tmp_path / f"{tenant}.pdf"
+        path.write_bytes(tenant.encode())
+        db.add(Evidence(title=tenant, filename=f"{tenant}.pdf", file_path=str(path), control_id=control.id, tenant_id=tenant))
+    db.commit()
+
+    reporter = ComplianceReporter(tenant_id="tenant-a", shared_tenant_id="default_tenant", db=db)
+    try:
+        data = b"".join(reporter.iter_auditor_pack())
+    finally:
+        reporter.close()
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        names = zf.namelist()
+        soa = zf.read("Statement_of_Applicability.md").decode()
+    assert any(name.endswith("tenant-a.pdf") for name in names)
+    assert not any("tenant-b" in name for name in names)
+    assert "A.5.a" in soa and "A.5.b" not in soa